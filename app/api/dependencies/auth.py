@@ -2,7 +2,7 @@
 认证依赖注入
 """
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from pydantic import ValidationError
@@ -14,29 +14,62 @@ from app.core.security import decode_token
 from app.db.mongodb import get_collection, USERS_COLLECTION
 from app.models.user import UserResponse
 from app.services.auth import is_token_blacklisted
+from app.services.user_cache import token_identifier, get_cached_user, cache_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
+def get_request_user(request: Request) -> Optional[dict]:
+    """
+    获取当前请求中已加载的认证用户
+    
+    get_current_user 执行后会把用户记录在 request.state 上，
+    同一请求内的其他依赖或处理函数可以直接复用，无需再次查询
+    """
+    return getattr(request.state, "current_user", None)
+
+
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme)):
     """
     获取当前已认证用户
     
     依赖项：验证JWT令牌并返回当前用户
     
+    同一请求内复用已加载的用户；跨请求按(用户ID, jti)短期缓存，
+    缓存命中时不再查询令牌黑名单和用户集合
+    
     若验证失败，抛出认证错误
     """
+    # 请求内复用
+    if getattr(request.state, "current_user_token", None) == token:
+        return request.state.current_user
+    
     try:
-        # 检查令牌是否已被列入黑名单
-        if await is_token_blacklisted(token):
-            raise AuthenticationError(detail="令牌已失效，请重新登录")
-            
         payload = decode_token(token)
         user_id = payload.get("sub")
         if not user_id:
             raise AuthenticationError(detail="无效的认证信息")
-    except (JWTError, ValidationError) as e:
+    except (JWTError, ValidationError, ValueError) as e:
         raise AuthenticationError(detail=f"无效的认证凭据: {str(e)}")
     
+    token_id = token_identifier(token, payload)
+    user = get_cached_user(user_id, token_id)
+    if user is None:
+        user = await _load_user(token, user_id)
+        # 只缓存以用户ID签发的令牌，保证按用户ID失效时能覆盖到
+        if str(user["_id"]) == str(user_id):
+            cache_user(user_id, token_id, user)
+    
+    request.state.current_user = user
+    request.state.current_user_token = token
+    return user
+
+
+async def _load_user(token: str, user_id: str) -> dict:
+    """检查令牌黑名单并从数据库加载用户"""
+    # 检查令牌是否已被列入黑名单
+    if await is_token_blacklisted(token):
+        raise AuthenticationError(detail="令牌已失效，请重新登录")
+    
     # 从数据库获取用户
     users_collection = get_collection("users")
     try:
@@ -55,4 +88,4 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
     if not user.get("is_active", False):
         raise AuthenticationError(detail="用户已被禁用")
     
-    return user 
\ No newline at end of file
+    return user
@@ -13,6 +13,7 @@ from app.models.homepage import (
     SwiperUpdate,
     CardCreate,
     CardUpdate,
+    HomeContentUpdate,
     ContentFilter,
     HomeContentResponse
 )
@@ -112,7 +113,7 @@ async def create_homepage_popular(
 @router.put("/contents/{content_id}", response_model=HomeContentResponse)
 async def update_homepage_content(
     content_id: str,
-    update_data: dict,
+    update_data: HomeContentUpdate,
     current_admin: UserResponse = Depends(get_current_admin)
 ):
     """
@@ -129,7 +130,7 @@ async def update_homepage_content(
         )
     
     # 更新内容
-    updated_content = await update_content(content_id, update_data, str(current_admin.id))
+    updated_content = await update_content(content_id, update_data.dict(exclude_unset=True), str(current_admin.id))
     return updated_content
 
 
@@ -4,11 +4,11 @@
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
-from fastapi import APIRouter, Query, Depends, HTTPException, status
+from fastapi import APIRouter, Query, Depends, HTTPException, Request, Response, status
 
-from app.models.homepage import ContentType, HomeContentResponse
-from app.services.homepage import get_swipers, get_featured_recipes, get_popular_recipes, create_swiper, create_card
-from app.db.mongodb import get_database, get_collection
+from app.models.homepage import HomeContentResponse
+from app.services.homepage import get_swipers, get_featured_recipes, get_popular_recipes, home_feed
+from app.db.mongodb import get_database
 from app.api.dependencies import get_current_user
 from app.core.response import success_response
 from app.core.decorators import api_response
@@ -18,46 +18,19 @@ router = APIRouter()
 
 @router.get("/")
 @api_response
-async def get_home_data():
+async def get_home_data(request: Request):
     """
     获取首页数据
-    """
-    # 直接从数据库查询各种首页内容
-    collection = get_collection("home_contents")
-    
-    # 查询轮播图
-    swipers = await collection.find({"type": ContentType.SWIPER.value}).sort("sort_order", 1).to_list(length=6)
-    
-    # 查询精选推荐
-    featured = await collection.find({"type": ContentType.FEATURED.value}).sort("sort_order", 1).to_list(length=5)
-    
-    # 查询热门内容
-    popular = await collection.find({"type": ContentType.POPULAR.value}).sort("sort_order", 1).to_list(length=5)
-    
-    # 确保数据存在，如果数据库中没有数据，初始化默认数据
-    if not swipers:
-        await initialize_default_swipers()
-        swipers = await collection.find({"type": ContentType.SWIPER.value}).sort("sort_order", 1).to_list(length=6)
     
-    if not featured:
-        await initialize_default_featured()
-        featured = await collection.find({"type": ContentType.FEATURED.value}).sort("sort_order", 1).to_list(length=5)
-    
-    if not popular:
-        await initialize_default_popular()
-        popular = await collection.find({"type": ContentType.POPULAR.value}).sort("sort_order", 1).to_list(length=5)
+    - 返回预先构建好的响应字节，支持 If-None-Match / 304 Not Modified
+    """
+    feed = await home_feed.get()
+    headers = {"ETag": feed.etag, "Cache-Control": "no-cache"}
     
-    # 处理数据格式，MongoDB的_id需要转为id字段
-    for item in swipers + featured + popular:
-        if "_id" in item:
-            item["id"] = str(item.pop("_id"))
+    if feed.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
     
-    return {
-        "welcome": "欢迎使用家宴菜谱系统",
-        "swipers": swipers,
-        "featured": featured,
-        "popular": popular
-    }
+    return Response(content=feed.body, media_type="application/json", headers=headers)
 
 
 @router.get("/swipers")
@@ -228,136 +201,3 @@ async def get_seasonal_ingredients():
         "season": season,
         "ingredients": ingredients.get(season, [])
     }
-
-
-# 辅助函数，初始化默认数据
-async def initialize_default_swipers():
-    """初始化默认轮播图数据"""
-    admin_id = "system_admin"  # 系统管理员ID
-    
-    default_swipers = [
-        {
-            "title": "家常红烧肉",
-            "image_url": "/static/home/swiper0.png",
-            "description": "家常红烧肉，肥而不腻",
-            "tags": [
-                {"text": "家常菜", "theme": "primary"},
-                {"text": "肉类", "theme": "success"}
-            ],
-            "sort_order": 0
-        },
-        {
-            "title": "清蒸鲈鱼",
-            "image_url": "/static/home/swiper1.png",
-            "description": "清蒸鲈鱼，鲜香可口",
-            "tags": [
-                {"text": "海鲜", "theme": "primary"},
-                {"text": "低脂", "theme": "success"}
-            ],
-            "sort_order": 1
-        },
-        {
-            "title": "宫保鸡丁",
-            "image_url": "/static/home/swiper2.png",
-            "description": "宫保鸡丁，麻辣鲜香",
-            "tags": [
-                {"text": "川菜", "theme": "primary"},
-                {"text": "家常菜", "theme": "success"}
-            ],
-            "sort_order": 2
-        }
-    ]
-    
-    # 将默认数据插入数据库
-    for swiper_data in default_swipers:
-        from app.models.homepage import SwiperCreate
-        swiper = SwiperCreate(**swiper_data)
-        await create_swiper(swiper, admin_id)
-
-
-async def initialize_default_featured():
-    """初始化默认精选菜谱数据"""
-    admin_id = "system_admin"  # 系统管理员ID
-    
-    default_featured = [
-        {
-            "title": "家常红烧肉",
-            "image_url": "/static/home/card0.png",
-            "target_id": "default_recipe_1",
-            "target_type": "recipe",
-            "description": "家常红烧肉，肥而不腻",
-            "tags": [
-                {"text": "家常菜", "theme": "primary"},
-                {"text": "肉类", "theme": "success"}
-            ],
-            "sort_order": 0
-        },
-        {
-            "title": "清蒸鲈鱼",
-            "image_url": "/static/home/card1.png",
-            "target_id": "default_recipe_2",
-            "target_type": "recipe",
-            "description": "清蒸鲈鱼，鲜香可口",
-            "tags": [
-                {"text": "海鲜", "theme": "primary"},
-                {"text": "低脂", "theme": "success"}
-            ],
-            "sort_order": 1
-        },
-        {
-            "title": "宫保鸡丁",
-            "image_url": "/static/home/card2.png",
-            "target_id": "default_recipe_3",
-            "target_type": "recipe",
-            "description": "宫保鸡丁，麻辣鲜香",
-            "tags": [
-                {"text": "川菜", "theme": "primary"},
-                {"text": "家常菜", "theme": "success"}
-            ],
-            "sort_order": 2
-        }
-    ]
-    
-    # 将默认数据插入数据库
-    for card_data in default_featured:
-        from app.models.homepage import CardCreate, ContentType
-        card = CardCreate(**card_data)
-        await create_card(card, ContentType.FEATURED, admin_id)
-
-
-async def initialize_default_popular():
-    """初始化默认热门菜谱数据"""
-    admin_id = "system_admin"  # 系统管理员ID
-    
-    default_popular = [
-        {
-            "title": "番茄炒蛋",
-            "image_url": "/static/home/card3.png",
-            "target_id": "default_recipe_4",
-            "target_type": "recipe",
-            "description": "番茄炒蛋，酸甜可口",
-            "tags": [
-                {"text": "快手菜", "theme": "primary"},
-                {"text": "家常菜", "theme": "success"}
-            ],
-            "sort_order": 0
-        },
-        {
-            "title": "水煮鱼片",
-            "image_url": "/static/home/card4.png",
-            "target_id": "default_recipe_5",
-            "target_type": "recipe",
-            "description": "水煮鱼片，麻辣鲜香",
-            "tags": [
-                {"text": "川菜", "theme": "primary"},
-                {"text": "鱼类", "theme": "success"}
-            ],
-            "sort_order": 1
-        }
-    ]
-    
-    # 将默认数据插入数据库
-    for card_data in default_popular:
-        from app.models.homepage import CardCreate, ContentType
-        card = CardCreate(**card_data)
-        await create_card(card, ContentType.POPULAR, admin_id) 
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Response, status
 from typing import List, Optional
 
 from app.api.dependencies import get_current_user
@@ -7,8 +7,10 @@ from app.models.menu_plan import (
     MenuPlanUpdate, 
     MenuPlanResponse, 
     MenuPlanListParams,
+    MenuPlanCard,
     DishAdd
 )
+from app.core.response import MongoJSONResponse
 from app.services.menu_plan import (
     create_menu_plan,
     get_menu_plan_by_id,
@@ -16,6 +18,7 @@ from app.services.menu_plan import (
     add_dish_to_menu,
     get_family_menu_plans
 )
+from app.utils.pagination import set_pagination_headers
 
 router = APIRouter()
 
@@ -132,8 +135,13 @@ async def add_dish_to_menu_plan(
         )
 
 
-@router.get("/by-family/{family_id}", response_model=List[MenuPlanResponse])
+@router.get(
+    "/by-family/{family_id}",
+    response_model=List[MenuPlanResponse],
+    responses={200: {"model": List[MenuPlanCard], "description": "fields 参数不为空时返回菜单计划卡片(摘要视图)"}},
+)
 async def get_family_menu_plan_list(
+    response: Response,
     family_id: str = Path(..., description="家庭ID"),
     params: MenuPlanListParams = Depends(),
     current_user: dict = Depends(get_current_user)
@@ -143,16 +151,24 @@ async def get_family_menu_plan_list(
     
     - 需要授权: Bearer Token
     - **family_id**: 家庭ID
-    - 支持过滤和分页
-    - 返回菜单计划列表
+    - 支持过滤和分页(游标分页: useCursor=true 或传入 cursor)
+    - fields=card 返回菜单计划卡片(摘要视图)，也可以传逗号分隔的字段列表
+    - 返回菜单计划列表，分页信息在响应头 X-Total-Count / X-Next-Cursor 中
     """
     try:
         # 确保使用family_id参数
         params.familyId = family_id
         
-        plans, total = await get_family_menu_plans(params, current_user)
+        plans, total, next_cursor = await get_family_menu_plans(params, current_user)
+        
+        # 摘要视图直接编码投影后的文档，不再经过完整响应模型校验
+        if params.fields:
+            summary_response = MongoJSONResponse(content=plans)
+            set_pagination_headers(summary_response, total, next_cursor)
+            return summary_response
         
-        # 可以在这里处理分页信息，如添加到响应头
+        # 分页信息添加到响应头
+        set_pagination_headers(response, total, next_cursor)
         
         return plans
     except HTTPException:
@@ -164,8 +180,13 @@ async def get_family_menu_plan_list(
         )
 
 
-@router.get("/", response_model=List[MenuPlanResponse])
+@router.get(
+    "/",
+    response_model=List[MenuPlanResponse],
+    responses={200: {"model": List[MenuPlanCard], "description": "fields 参数不为空时返回菜单计划卡片(摘要视图)"}},
+)
 async def get_user_menu_plans(
+    response: Response,
     params: MenuPlanListParams = Depends(),
     current_user: dict = Depends(get_current_user)
 ):
@@ -174,16 +195,24 @@ async def get_user_menu_plans(
     
     - 需要授权: Bearer Token
     - 获取用户所有家庭的菜单计划
-    - 支持过滤和分页
-    - 返回菜单计划列表
+    - 支持过滤和分页(游标分页: useCursor=true 或传入 cursor)
+    - fields=card 返回菜单计划卡片(摘要视图)，也可以传逗号分隔的字段列表
+    - 返回菜单计划列表，分页信息在响应头 X-Total-Count / X-Next-Cursor 中
     """
     try:
         # 确保familyId为None，这将查询用户所有家庭的菜单计划
         params.familyId = None
         
-        plans, total = await get_family_menu_plans(params, current_user)
+        plans, total, next_cursor = await get_family_menu_plans(params, current_user)
+        
+        # 摘要视图直接编码投影后的文档，不再经过完整响应模型校验
+        if params.fields:
+            summary_response = MongoJSONResponse(content=plans)
+            set_pagination_headers(summary_response, total, next_cursor)
+            return summary_response
         
-        # 可以在这里处理分页信息，如添加到响应头
+        # 分页信息添加到响应头
+        set_pagination_headers(response, total, next_cursor)
         
         return plans
     except HTTPException:
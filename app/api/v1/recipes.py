@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Path, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Path, Response, status
 from typing import List, Optional
 import logging
 from pydantic import ValidationError
 
 from app.api.dependencies import get_current_user
-from app.models.recipe import RecipeCreate, RecipeUpdate, RecipeResponse, RecipeSearchParams
+from app.models.recipe import RecipeCreate, RecipeUpdate, RecipeResponse, RecipeSearchParams, RecipeCard
+from app.core.response import MongoJSONResponse
 from app.models.comment import CommentCreate, CommentResponse, CommentListResponse
 from app.services.recipe import (
     create_recipe, 
@@ -13,6 +14,7 @@ from app.services.recipe import (
     favorite_recipe, 
     search_recipes
 )
+from app.utils.pagination import set_pagination_headers
 from app.services.comment import create_comment, get_recipe_comments, delete_comment, like_comment, unlike_comment, reply_comment, get_comment_by_id
 
 router = APIRouter()
@@ -62,8 +64,8 @@ async def get_recipe_detail(
                 detail="菜谱不存在"
             )
         logger.info(f"成功获取菜谱 {recipe_id}: {recipe.get('title', 'unknown')}")
-        # 直接返回字典，不使用Pydantic模型转换
-        return recipe
+        # 直接用orjson编码菜谱文档，不经过Pydantic模型转换和jsonable_encoder
+        return MongoJSONResponse(content=recipe)
     except HTTPException as he:
         logger.error(f"请求处理失败 - HTTP异常: {str(he)}")
         raise
@@ -132,20 +134,37 @@ async def favorite_recipe_toggle(
         )
 
 
-@router.get("/", response_model=List[RecipeResponse])
+@router.get(
+    "/",
+    response_model=List[RecipeResponse],
+    responses={200: {"model": List[RecipeCard], "description": "fields 参数不为空时返回菜谱卡片(摘要视图)"}},
+)
 async def search_community_recipes(
+    response: Response,
     params: RecipeSearchParams = Depends()
 ):
     """
     搜索社区菜谱
     
     - 支持多种筛选条件和排序方式
-    - 返回菜谱列表及分页信息
+    - 支持游标分页: useCursor=true 或传入 cursor
+    - fields=card 返回菜谱卡片(摘要视图)，也可以传逗号分隔的字段列表
+    - 返回菜谱列表，分页信息在响应头 X-Total-Count / X-Next-Cursor 中
     """
     try:
-        recipes, total = await search_recipes(params)
+        recipes, total, next_cursor = await search_recipes(params)
+        
+        # 摘要视图直接编码投影后的文档，不再经过完整响应模型校验
+        if params.fields:
+            summary_response = MongoJSONResponse(content=recipes)
+            set_pagination_headers(summary_response, total, next_cursor)
+            return summary_response
+        
         # 添加分页信息到响应头
+        set_pagination_headers(response, total, next_cursor)
         return recipes
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -12,20 +12,29 @@ from app.models.shopping_list import (
     ShoppingListUpdate,
     ShoppingListItemBatchUpdate,
     ShoppingListGenerateRequest,
-    ShoppingListStatus
+    ShoppingListStatus,
+    ShoppingListCard
 )
+from app.core.response import MongoJSONResponse
+from app.utils.projections import resolve_projection
 from app.models.user import UserResponse
 
 
 router = APIRouter()
 
 
-@router.get("/", response_model=List[ShoppingListResponse], status_code=status.HTTP_200_OK)
+@router.get(
+    "/",
+    response_model=List[ShoppingListResponse],
+    responses={200: {"model": List[ShoppingListCard], "description": "fields 参数不为空时返回购物清单卡片(摘要视图)"}},
+    status_code=status.HTTP_200_OK,
+)
 async def get_shopping_lists(
     status: Optional[ShoppingListStatus] = None,
     family_id: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
     skip: int = Query(0, ge=0),
+    fields: Optional[str] = Query(None, description="摘要视图: card 或逗号分隔的字段列表"),
     current_user: UserResponse = Depends(get_current_user),
     db = Depends(get_db)
 ):
@@ -37,6 +46,7 @@ async def get_shopping_lists(
     - family_id: 筛选指定家庭的购物清单
     - limit: 分页大小
     - skip: 跳过记录数量
+    - fields: card 返回购物清单卡片(摘要视图)，也可以传逗号分隔的字段列表
     """
     query = {}
     
@@ -54,7 +64,15 @@ async def get_shopping_lists(
         query["family_id"] = family_id
     
     collection = get_collection(SHOPPING_LISTS_COLLECTION)
-    cursor = collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
+    projection = resolve_projection("shoppingList", fields)
+    cursor = collection.find(query, projection).sort("created_at", -1).skip(skip).limit(limit)
+    
+    # 摘要视图直接编码投影后的文档，不再经过完整响应模型校验
+    if projection is not None:
+        documents = await cursor.to_list(length=limit)
+        for doc in documents:
+            doc["id"] = str(doc.pop("_id"))
+        return MongoJSONResponse(content=documents)
     
     results = []
     async for doc in cursor:
@@ -30,10 +30,30 @@ class Settings(BaseSettings):
     MONGODB_DB_NAME: str
     MONGODB_MIN_POOL_SIZE: int = 10
     MONGODB_MAX_POOL_SIZE: int = 100
+    # 连接空闲关闭时间与获取连接的最长等待时间(毫秒)
+    MONGODB_MAX_IDLE_TIME_MS: int = 600000
+    MONGODB_WAIT_QUEUE_TIMEOUT_MS: int = 10000
+    # 网络压缩算法(按优先级，未安装对应依赖的会被跳过: zstd需要zstandard，snappy需要python-snappy)
+    MONGODB_COMPRESSORS: str = "zstd,snappy,zlib"
+    # 启动时预热连接池到最小连接数
+    MONGODB_WARMUP: bool = True
+    # 菜谱检索读取从节点时允许的最大复制延迟(秒，不小于90)
+    MONGODB_SEARCH_MAX_STALENESS: int = 120
+    # 启动时按索引注册表创建缺失的索引，并输出索引检查报告
+    MONGODB_ENSURE_INDEXES: bool = True
+    MONGODB_INDEX_REPORT: bool = True
     
     # Redis配置
-    REDIS_URI: Optional[str] = None
+    REDIS_URI: str = "redis://localhost:6379/0"
     REDIS_PASSWORD: Optional[str] = None
+    # 会话数据(令牌黑名单、验证码、登录计数)使用的Redis，未设置时与REDIS_URI相同但使用独立的连接池
+    REDIS_SESSION_URI: Optional[str] = None
+    REDIS_CACHE_MAX_CONNECTIONS: int = 50
+    REDIS_SESSION_MAX_CONNECTIONS: int = 20
+    # 读写及建立连接的超时时间(秒)
+    REDIS_SOCKET_TIMEOUT: float = 2.0
+    # 健康检查间隔(秒)，降级后按此间隔尝试重新连接
+    REDIS_HEALTH_CHECK_INTERVAL: int = 15
     
     # JWT配置
     JWT_SECRET_KEY: str
@@ -44,6 +64,14 @@ class Settings(BaseSettings):
     # 微信小程序配置
     WECHAT_MINI_APP_ID: str
     WECHAT_MINI_APP_SECRET: str
+    # 微信接口地址(测试时可指向本地桩服务)
+    WECHAT_API_BASE_URL: str = "https://api.weixin.qq.com"
+    # 请求超时(秒)、连接池大小、网络错误时的最大尝试次数
+    WECHAT_HTTP_TIMEOUT: float = 5.0
+    WECHAT_HTTP_MAX_CONNECTIONS: int = 20
+    WECHAT_HTTP_RETRIES: int = 3
+    # access_token 提前刷新的时间(秒)
+    WECHAT_TOKEN_REFRESH_MARGIN: int = 300
     
     # SMTP邮件配置
     SMTP_SERVER: str = "smtp.example.com"
@@ -51,6 +79,23 @@ class Settings(BaseSettings):
     SMTP_USER: str = "noreply@example.com"
     SMTP_PASSWORD: str = ""
     SMTP_TLS: bool = True
+    SMTP_TIMEOUT: int = 10
+    
+    # 邮件发送队列配置
+    # smtp / file(写入MAIL_FILE_DIR) / memory(测试用)，未设置时开发环境且没有SMTP密码使用file
+    MAIL_TRANSPORT: Optional[str] = None
+    MAIL_FILE_DIR: str = "logs/dev_emails"
+    MAIL_QUEUE_SIZE: int = 1000
+    # 每批通过同一SMTP连接发送的邮件数
+    MAIL_BATCH_SIZE: int = 20
+    # 最大尝试次数及重试退避时间(秒)
+    MAIL_MAX_ATTEMPTS: int = 5
+    MAIL_RETRY_BASE_DELAY: float = 2.0
+    MAIL_RETRY_MAX_DELAY: float = 300.0
+    # SMTP连接空闲关闭时间(秒)
+    MAIL_SMTP_IDLE_TIMEOUT: int = 60
+    # 应用关闭时等待队列发送完毕的最长时间(秒)
+    MAIL_SHUTDOWN_TIMEOUT: int = 10
     
     # 文件存储配置
     UPLOAD_DIR: Path = Path("static/uploads")
@@ -73,6 +118,62 @@ class Settings(BaseSettings):
     COS_REGION: Optional[str] = None
     COS_BUCKET: Optional[str] = None
     
+    # 菜谱检索配置
+    # mongo: MongoDB文本索引, memory: 进程内倒排索引(测试用)
+    SEARCH_BACKEND: str = "mongo"
+    # 启动时为尚未建立检索索引的菜谱补建索引
+    SEARCH_REBUILD_ON_STARTUP: bool = True
+    
+    # 分页配置
+    # 游标分页时总数缓存的有效期(秒)，0表示每次精确计数
+    PAGINATION_COUNT_CACHE_TTL: int = 60
+    
+    # 认证用户缓存配置(按用户ID+令牌jti缓存)
+    AUTH_USER_CACHE_SIZE: int = 10000
+    AUTH_USER_CACHE_TTL: int = 30
+    
+    # 令牌吊销配置(本地布隆过滤器 + Redis黑名单)
+    TOKEN_REVOCATION_BLOOM_CAPACITY: int = 100000
+    TOKEN_REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    # 从Redis重建布隆过滤器的间隔(秒)
+    TOKEN_REVOCATION_SYNC_INTERVAL: int = 300
+    
+    # 首页数据物化缓存过期时间(秒)
+    HOME_FEED_TTL: int = 300
+    
+    # 首页内容上下线调度重新加载间隔(秒)
+    CONTENT_SCHEDULE_RELOAD_INTERVAL: int = 300
+    
+    # 菜谱详情缓存配置(进程内LRU + 可选的Redis缓存)
+    RECIPE_CACHE_SIZE: int = 1000
+    RECIPE_CACHE_TTL: int = 30
+    RECIPE_CACHE_REDIS: bool = False
+    RECIPE_CACHE_REDIS_TTL: int = 600
+    
+    # 菜谱浏览次数写回配置(memory: 进程内存, redis: Redis哈希)
+    VIEW_COUNTER_BACKEND: str = "memory"
+    VIEW_COUNTER_FLUSH_INTERVAL: int = 10
+    
+    # 菜谱评分统计校准间隔(秒)，0表示不启动后台校准
+    RATING_RECONCILE_INTERVAL: int = 3600
+    
+    # 评论作者信息缓存配置
+    COMMENT_AUTHOR_CACHE_SIZE: int = 5000
+    COMMENT_AUTHOR_CACHE_TTL: int = 120
+    
+    # 家庭成员关系缓存配置
+    FAMILY_MEMBERSHIP_CACHE_SIZE: int = 20000
+    FAMILY_MEMBERSHIP_CACHE_TTL: int = 60
+    # 启动时尚未完成回填(migrations集合中没有完成标记)则从families集合回填成员关系
+    FAMILY_MEMBERSHIP_BACKFILL: bool = True
+    
+    # RBAC权限缓存配置
+    RBAC_PERMISSION_CACHE_SIZE: int = 10000
+    RBAC_PERMISSION_CACHE_TTL: int = 60
+    # 是否启用Redis二级缓存(多进程部署时共享编译结果)
+    RBAC_PERMISSION_CACHE_REDIS: bool = False
+    RBAC_PERMISSION_CACHE_REDIS_TTL: int = 300
+    
     # Celery配置
     CELERY_BROKER_URL: Optional[str] = None
     CELERY_RESULT_BACKEND: Optional[str] = None
@@ -86,6 +187,17 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_DEFAULT: str = "200/minute"
     
+    # 密码哈希配置
+    # bcrypt成本参数，与已保存哈希不一致时登录成功后透明升级
+    PASSWORD_BCRYPT_ROUNDS: int = 12
+    # 专用线程池大小与最大排队数
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    # 每个账号在窗口期(秒)内允许的密码登录尝试次数
+    LOGIN_MAX_ATTEMPTS: int = 10
+    LOGIN_THROTTLE_WINDOW: int = 300
+    LOGIN_THROTTLE_CACHE_SIZE: int = 10000
+    
     @field_validator("UPLOAD_DIR", "LOG_DIR")
     def validate_paths(cls, v: Union[str, Path]) -> Path:
         # 确保路径存在
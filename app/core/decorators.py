@@ -7,8 +7,6 @@ import inspect
 from typing import Any, Callable, Dict, TypeVar, cast
 
 from fastapi import Response
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
 
 from app.core.response import ApiJSONResponse
 
@@ -34,15 +32,8 @@ def api_response(func: F) -> F:
         if isinstance(result, Response):
             return result
         
-        # 如果已经是标准格式，则直接转换为JSONResponse返回
-        if isinstance(result, dict) and all(key in result for key in ["code", "data", "msg"]):
-            return JSONResponse(content=result)
-        
-        # 如果是Pydantic模型，则转换为dict
-        if isinstance(result, BaseModel):
-            result = result.dict()
-        
-        # 返回标准格式
+        # 返回标准格式(已经是标准格式的内容原样编码)
+        # Pydantic模型、ObjectId等由orjson在编码时直接处理，不再预先转换
         return ApiJSONResponse(content=result)
     
     return cast(F, wrapper) 
\ No newline at end of file
@@ -2,10 +2,12 @@
 标准API响应处理模块
 根据@api.mdc规范，返回统一格式的响应
 """
+from decimal import Decimal
 from typing import Any, Dict, List, Optional, Union
-import json
-from datetime import datetime, date
 
+import orjson
+from bson import ObjectId
+from bson.decimal128 import Decimal128
 from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 
@@ -20,12 +22,33 @@ class ApiResponse(BaseModel):
         arbitrary_types_allowed = True
 
 
-# 自定义JSON编码器，处理datetime等特殊类型
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, (datetime, date)):
-            return obj.isoformat()
-        return super().default(obj)
+# orjson序列化选项(允许非字符串字典键)
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS
+
+
+def orjson_default(obj: Any) -> Any:
+    """
+    orjson无法原生序列化的类型转换
+    
+    datetime、date、UUID等由orjson原生处理，这里只处理MongoDB和Pydantic类型，
+    在C层编码过程中按需调用，不需要预先递归遍历文档
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps_json(content: Any) -> bytes:
+    """使用orjson将内容编码为JSON字节"""
+    return orjson.dumps(content, default=orjson_default, option=ORJSON_OPTIONS)
 
 
 def standard_response(
@@ -132,14 +155,108 @@ def not_found_response(msg: str = "资源不存在") -> Dict[str, Any]:
     return error_response(msg=msg, code=404)
 
 
-class ApiJSONResponse(JSONResponse):
+def is_standard_response(content: Any) -> bool:
+    """判断内容是否已经是标准响应格式 {code, data, msg}"""
+    return isinstance(content, dict) and "code" in content and "data" in content and "msg" in content
+
+
+class MongoJSONResponse(JSONResponse):
+    """
+    基于orjson的JSON响应类(应用默认响应类)
+    
+    作为默认响应类时只负责最终编码: 路由返回普通对象时FastAPI仍会先调用jsonable_encoder，
+    其中的ObjectId、Decimal128不会被转换。需要直接编码MongoDB原始文档(跳过jsonable_encoder)的路由
+    应当显式返回 MongoJSONResponse(content=...)，此时ObjectId、datetime、Decimal128由orjson直接处理
+    """
+    
+    def render(self, content: Any) -> bytes:
+        return dumps_json(content)
+
+
+class EnvelopeJSONResponse(MongoJSONResponse):
+    """
+    标准格式JSON响应类
+    
+    在序列化时一次性包装为 {code, data, msg} 并用orjson直接编码为字节，
+    不再由中间件解析响应体后重新包装、重新编码
+    
+    - 已经是标准格式的内容原样编码
+    - 2xx状态码包装为成功响应，其他状态码包装为错误响应(msg取自detail)
+    """
+    
+    def __init__(
+        self,
+        content: Any = None,
+        status_code: int = 200,
+        headers: Optional[Dict[str, str]] = None,
+        media_type: Optional[str] = None,
+        background: Optional[Any] = None,
+        code: Optional[int] = None,
+        msg: Optional[str] = None,
+    ) -> None:
+        self.code = code
+        self.msg = msg
+        super().__init__(
+            content=content,
+            status_code=status_code,
+            headers=headers,
+            media_type=media_type,
+            background=background,
+        )
+    
+    def envelope(self, content: Any) -> Dict[str, Any]:
+        """
+        包装为标准响应格式
+        
+        Args:
+            content: 原始内容
+            
+        Returns:
+            Dict[str, Any]: 标准格式的响应内容
+        """
+        if isinstance(content, ApiResponse):
+            return content.model_dump()
+        
+        if is_standard_response(content):
+            return content
+        
+        if 200 <= self.status_code < 300:
+            return standard_response(
+                data=content,
+                code=0 if self.code is None else self.code,
+                msg="success" if self.msg is None else self.msg
+            )
+        
+        msg = self.msg
+        if msg is None:
+            msg = content["detail"] if isinstance(content, dict) and "detail" in content else "请求失败"
+        return standard_response(
+            data=None,
+            code=self.status_code if self.code is None else self.code,
+            msg=msg
+        )
+    
+    def render(self, content: Any) -> bytes:
+        """
+        包装并编码响应内容
+        
+        Args:
+            content: 要渲染的内容
+            
+        Returns:
+            bytes: 编码后的JSON字节
+        """
+        return dumps_json(self.envelope(content))
+
+
+class ApiJSONResponse(EnvelopeJSONResponse):
     """标准API JSON响应类"""
     def __init__(
         self,
         content: Any = None,
         status_code: int = 200,
-        code: int = 0,
-        msg: str = "success",
+        code: Optional[int] = None,
+        msg: Optional[str] = None,
         headers: Optional[Dict[str, str]] = None,
         media_type: Optional[str] = None,
         background: Optional[Any] = None,
@@ -150,46 +267,18 @@ class ApiJSONResponse(JSONResponse):
         Args:
             content: 原始内容
             status_code: HTTP状态码
-            code: API状态码
-            msg: 消息
+            code: API状态码，默认按HTTP状态码推断(2xx为0，其他为HTTP状态码)
+            msg: 消息，默认成功时为"success"，失败时取自detail
             headers: HTTP头
             media_type: 媒体类型
             background: 后台任务
         """
-        # 如果content已经是标准响应格式，则直接使用
-        if isinstance(content, dict) and all(key in content for key in ["code", "data", "msg"]):
-            standardized_content = content
-        else:
-            # 否则转换为标准响应格式
-            standardized_content = {
-                "code": code,
-                "data": content,
-                "msg": msg
-            }
-            
         super().__init__(
-            content=standardized_content,
+            content=content,
             status_code=status_code,
             headers=headers,
             media_type=media_type,
             background=background,
+            code=code,
+            msg=msg,
         )
-    
-    def render(self, content: Any) -> bytes:
-        """
-        使用自定义JSON编码器来渲染响应内容
-        
-        Args:
-            content: 要渲染的内容
-            
-        Returns:
-            bytes: 编码后的JSON字节
-        """
-        return json.dumps(
-            content,
-            ensure_ascii=False,
-            allow_nan=True,
-            indent=None,
-            separators=(",", ":"),
-            cls=CustomJSONEncoder,
-        ).encode("utf-8") 
\ No newline at end of file
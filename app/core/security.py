@@ -1,3 +1,4 @@
+import uuid
 from datetime import datetime, timedelta
 from typing import Any, Dict, Optional, Union
 
@@ -13,21 +14,27 @@ from app.core.exceptions import AuthenticationError
 from app.db.mongodb import get_collection
 from app.models.user import TokenData, UserResponse
 
-# 密码上下文
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# 密码上下文(成本参数与配置不一致的哈希会被标记为需要升级)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.PASSWORD_BCRYPT_ROUNDS
+)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_PREFIX}/auth/login")
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    验证密码
+    验证密码(同步执行，异步代码中请使用 password_hasher.verify)
     """
     return pwd_context.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
-    生成密码哈希
+    生成密码哈希(同步执行，异步代码中请使用 password_hasher.hash)
     """
     return pwd_context.hash(password)
 
@@ -43,7 +50,7 @@ def create_access_token(subject: Union[str, Any], expires_delta: Optional[timede
             minutes=settings.JWT_ACCESS_TOKEN_EXPIRE_MINUTES
         )
     
-    to_encode = {"exp": expire, "sub": str(subject)}
+    to_encode = {"exp": expire, "sub": str(subject), "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(
         to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM
     )
@@ -59,7 +66,7 @@ def create_refresh_token(subject: Union[str, Any], expires_delta: Optional[timed
     else:
         expire = datetime.utcnow() + timedelta(days=settings.JWT_REFRESH_TOKEN_EXPIRE_DAYS)
     
-    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh"}
+    to_encode = {"exp": expire, "sub": str(subject), "type": "refresh", "jti": uuid.uuid4().hex}
     encoded_jwt = jwt.encode(to_encode, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
     return encoded_jwt
 
@@ -134,6 +141,7 @@ async def authenticate_user(username: str, password: str) -> Union[Dict[str, Any
     user = await get_user(username)
     if not user:
         return False
-    if not verify_password(password, user["passwordHash"]):
+    from app.services.password_hasher import password_hasher
+    if not await password_hasher.verify(password, user["passwordHash"]):
         return False
     return user 
\ No newline at end of file
@@ -0,0 +1,347 @@
+"""
+MongoDB索引注册表
+集中声明各集合的索引和需要走索引的热点查询:
+- ensure_indexes: 按注册表创建缺失的索引(已存在相同键的索引时跳过，可重复执行)
+- index_report: 对比声明的索引与数据库中已有的索引，并对热点查询执行 explain()，
+  标记出仍然使用全集合扫描(COLLSCAN)的查询
+
+应用启动时由 lifespan 调用，也可以单独执行:
+    python -m app.db.indexes            创建索引并输出报告
+    python -m app.db.indexes --report   只输出报告
+"""
+import argparse
+import asyncio
+import json
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING
+
+from app.db import mongodb
+from app.db.mongodb import (
+    get_collection,
+    USERS_COLLECTION,
+    FAMILIES_COLLECTION,
+    FAMILY_MEMBERSHIPS_COLLECTION,
+    RECIPES_COLLECTION,
+    MENU_PLANS_COLLECTION,
+    SHOPPING_LISTS_COLLECTION,
+    COMMENTS_COLLECTION,
+    FAVORITES_COLLECTION,
+    USER_ROLES_COLLECTION,
+)
+
+logger = logging.getLogger(__name__)
+
+# 不参与对比的索引(主键索引)
+_UNMANAGED_INDEX_NAMES = {"_id_"}
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """索引声明"""
+    collection: str
+    keys: Tuple[Tuple[str, int], ...]
+    name: str
+    unique: bool = False
+    # 部分索引条件(只为满足条件的文档建立索引)
+    partial: Optional[Dict[str, Any]] = None
+
+    def options(self) -> Dict[str, Any]:
+        """create_index 的参数"""
+        options: Dict[str, Any] = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.partial:
+            options["partialFilterExpression"] = self.partial
+        return options
+
+
+@dataclass(frozen=True)
+class HotQuery:
+    """需要走索引的热点查询(filter/sort 与业务代码中的查询形状一致，取值仅作示例)"""
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    sort: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def _non_empty_string(field_name: str) -> Dict[str, Any]:
+    """
+    只索引非空字符串值的部分索引条件
+
+    字段缺失或为null的文档不进入索引；等值查询(字符串)可以被查询优化器判定为满足该条件
+    """
+    return {field_name: {"$gt": ""}}
+
+
+# 索引声明
+INDEXES: List[IndexSpec] = [
+    # 用户登录与注册查重
+    IndexSpec(USERS_COLLECTION, (("openid", ASCENDING),), "user_openid", partial=_non_empty_string("openid")),
+    IndexSpec(USERS_COLLECTION, (("phone", ASCENDING),), "user_phone", partial=_non_empty_string("phone")),
+    IndexSpec(USERS_COLLECTION, (("username", ASCENDING),), "user_username", partial=_non_empty_string("username")),
+    IndexSpec(USERS_COLLECTION, (("email", ASCENDING),), "user_email", partial=_non_empty_string("email")),
+    # 家庭成员与邀请码
+    IndexSpec(FAMILIES_COLLECTION, (("members.userId", ASCENDING),), "family_member_user"),
+    IndexSpec(FAMILIES_COLLECTION, (("invitations.code", ASCENDING),), "family_invitation_code"),
+    # 家庭成员关系
+    IndexSpec(
+        FAMILY_MEMBERSHIPS_COLLECTION,
+        (("familyId", ASCENDING), ("userId", ASCENDING)),
+        "family_user_unique",
+        unique=True
+    ),
+    IndexSpec(FAMILY_MEMBERSHIPS_COLLECTION, (("userId", ASCENDING),), "user_families"),
+    # 公开菜谱列表(分页按 createdAt + _id 排序)
+    IndexSpec(
+        RECIPES_COLLECTION,
+        (("isPublic", ASCENDING), ("status", ASCENDING), ("createdAt", DESCENDING), ("_id", DESCENDING)),
+        "recipe_public_status_created"
+    ),
+    # 收藏状态批量查询
+    IndexSpec(FAVORITES_COLLECTION, (("userId", ASCENDING), ("recipeId", ASCENDING)), "favorite_user_recipe"),
+    # 菜谱评论列表
+    IndexSpec(COMMENTS_COLLECTION, (("recipe_id", ASCENDING), ("created_at", DESCENDING)), "comment_recipe_created"),
+    # 家庭购物清单与菜单计划列表(服务层分页按 date + _id 排序)
+    IndexSpec(
+        SHOPPING_LISTS_COLLECTION,
+        (("familyId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)),
+        "shopping_list_family_date"
+    ),
+    # GET /shopping-lists 使用 snake_case 字段: 按 family_id 筛选、按 created_at 倒序分页，
+    # 同时限定 shared_with/creator_id 为当前用户($or)。
+    # 指定家庭时由 (family_id, created_at) 定位并直接按索引顺序返回，$or 条件在索引命中的少量文档上过滤；
+    # 不指定家庭时 $or 的两个分支各自走 (字段, created_at) 索引，再按 created_at 归并排序(SORT_MERGE)
+    IndexSpec(
+        SHOPPING_LISTS_COLLECTION,
+        (("family_id", ASCENDING), ("created_at", DESCENDING)),
+        "shopping_list_family_created"
+    ),
+    IndexSpec(
+        SHOPPING_LISTS_COLLECTION,
+        (("creator_id", ASCENDING), ("created_at", DESCENDING)),
+        "shopping_list_creator_created"
+    ),
+    IndexSpec(
+        SHOPPING_LISTS_COLLECTION,
+        (("shared_with", ASCENDING), ("created_at", DESCENDING)),
+        "shopping_list_shared_created"
+    ),
+    IndexSpec(
+        MENU_PLANS_COLLECTION,
+        (("familyId", ASCENDING), ("date", DESCENDING), ("_id", DESCENDING)),
+        "menu_plan_family_date"
+    ),
+    # 用户角色
+    IndexSpec(USER_ROLES_COLLECTION, (("user_id", ASCENDING), ("is_active", ASCENDING)), "user_role_active"),
+]
+
+# 热点查询
+HOT_QUERIES: List[HotQuery] = [
+    HotQuery("user_by_openid", USERS_COLLECTION, {"openid": "openid"}),
+    HotQuery("user_by_phone", USERS_COLLECTION, {"phone": "13800000000"}),
+    HotQuery("user_by_username", USERS_COLLECTION, {"username": "username"}),
+    HotQuery("user_by_email", USERS_COLLECTION, {"email": "user@example.com"}),
+    HotQuery("families_by_member", FAMILIES_COLLECTION, {"members.userId": "user_id"}),
+    HotQuery("family_by_invitation", FAMILIES_COLLECTION, {"invitations.code": "code"}),
+    HotQuery("membership", FAMILY_MEMBERSHIPS_COLLECTION, {"familyId": "family_id", "userId": "user_id"}),
+    HotQuery("memberships_by_user", FAMILY_MEMBERSHIPS_COLLECTION, {"userId": "user_id"}),
+    HotQuery(
+        "public_recipes",
+        RECIPES_COLLECTION,
+        {"isPublic": True, "status": "published"},
+        [("createdAt", DESCENDING), ("_id", DESCENDING)]
+    ),
+    HotQuery("favorites_of_page", FAVORITES_COLLECTION, {"userId": "user_id", "recipeId": {"$in": ["recipe_id"]}}),
+    HotQuery("recipe_comments", COMMENTS_COLLECTION, {"recipe_id": "recipe_id"}, [("created_at", DESCENDING)]),
+    HotQuery(
+        "family_shopping_lists",
+        SHOPPING_LISTS_COLLECTION,
+        {"familyId": "family_id"},
+        [("date", DESCENDING), ("_id", DESCENDING)]
+    ),
+    # GET /shopping-lists (app/api/v1/shopping_lists.py)
+    HotQuery(
+        "user_shopping_lists",
+        SHOPPING_LISTS_COLLECTION,
+        {"$or": [{"shared_with": "user_id"}, {"creator_id": "user_id"}]},
+        [("created_at", DESCENDING)]
+    ),
+    HotQuery(
+        "user_family_shopping_lists",
+        SHOPPING_LISTS_COLLECTION,
+        {"$or": [{"shared_with": "user_id"}, {"creator_id": "user_id"}], "family_id": "family_id"},
+        [("created_at", DESCENDING)]
+    ),
+    HotQuery(
+        "family_menu_plans",
+        MENU_PLANS_COLLECTION,
+        {"familyId": "family_id"},
+        [("date", DESCENDING), ("_id", DESCENDING)]
+    ),
+    HotQuery("active_user_roles", USER_ROLES_COLLECTION, {"user_id": "user_id", "is_active": True}),
+]
+
+
+def _normalize_keys(keys: Any) -> Tuple[Tuple[str, Any], ...]:
+    """统一索引键的表示(数据库返回的方向可能是浮点数)"""
+    return tuple(
+        (name, int(direction) if isinstance(direction, (int, float)) else direction)
+        for name, direction in keys
+    )
+
+
+def _is_unmanaged(name: str, info: Dict[str, Any]) -> bool:
+    if name in _UNMANAGED_INDEX_NAMES:
+        return True
+    # 文本索引由菜谱检索后端管理
+    return any(key == "_fts" for key, _ in info.get("key", []))
+
+
+def _plan_stages(plan: Any) -> List[str]:
+    """递归收集执行计划中的所有阶段名称"""
+    stages: List[str] = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(_plan_stages(item))
+    return stages
+
+
+def _collections() -> List[str]:
+    return list(dict.fromkeys(spec.collection for spec in INDEXES))
+
+
+async def _existing_indexes(collection_name: str) -> Dict[str, Dict[str, Any]]:
+    return await get_collection(collection_name).index_information()
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """
+    按注册表创建缺失的索引
+
+    已存在相同键的索引(无论名称)时跳过；单个索引创建失败(如已有数据违反唯一约束)
+    只记录错误，不影响其他索引
+
+    Returns:
+        {"created": 新建的索引名称, "failed": 创建失败的索引名称}
+    """
+    result: Dict[str, List[str]] = {"created": [], "failed": []}
+    if mongodb.database is None:
+        logger.warning("MongoDB连接未建立，跳过创建索引")
+        return result
+
+    for collection_name in _collections():
+        existing_keys = {
+            _normalize_keys(info["key"])
+            for info in (await _existing_indexes(collection_name)).values()
+        }
+        collection = get_collection(collection_name)
+        for spec in INDEXES:
+            if spec.collection != collection_name or _normalize_keys(spec.keys) in existing_keys:
+                continue
+            try:
+                await collection.create_index(list(spec.keys), **spec.options())
+                result["created"].append(f"{collection_name}.{spec.name}")
+                logger.info(f"已创建索引 {collection_name}.{spec.name}")
+            except Exception as e:
+                result["failed"].append(f"{collection_name}.{spec.name}")
+                logger.error(f"创建索引 {collection_name}.{spec.name} 失败: {str(e)}")
+    return result
+
+
+async def _explain_stages(query: HotQuery) -> List[str]:
+    cursor = get_collection(query.collection).find(query.filter)
+    if query.sort:
+        cursor = cursor.sort(query.sort)
+    explain = await cursor.limit(1).explain()
+    return _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+
+
+async def index_report() -> Dict[str, Any]:
+    """
+    对比声明的索引与数据库中已有的索引，并检查热点查询的执行计划
+
+    Returns:
+        报告字典:
+        - missing: 声明了但数据库中不存在的索引
+        - mismatched: 键相同但名称或选项(unique/部分索引条件)不一致的索引
+        - undeclared: 数据库中存在但没有声明的索引
+        - collscans: 执行计划中包含全集合扫描的热点查询
+    """
+    report: Dict[str, Any] = {"missing": [], "mismatched": [], "undeclared": [], "collscans": []}
+    if mongodb.database is None:
+        logger.warning("MongoDB连接未建立，跳过索引检查")
+        return report
+
+    for collection_name in _collections():
+        existing = await _existing_indexes(collection_name)
+        by_keys = {_normalize_keys(info["key"]): (name, info) for name, info in existing.items()}
+        declared_keys = set()
+
+        for spec in INDEXES:
+            if spec.collection != collection_name:
+                continue
+            keys = _normalize_keys(spec.keys)
+            declared_keys.add(keys)
+            if keys not in by_keys:
+                report["missing"].append(f"{collection_name}.{spec.name}")
+                continue
+            name, info = by_keys[keys]
+            if (
+                name != spec.name
+                or bool(info.get("unique")) != spec.unique
+                or info.get("partialFilterExpression") != spec.partial
+            ):
+                report["mismatched"].append(f"{collection_name}.{spec.name} (现有: {name})")
+
+        for keys, (name, info) in by_keys.items():
+            if keys not in declared_keys and not _is_unmanaged(name, info):
+                report["undeclared"].append(f"{collection_name}.{name}")
+
+    for query in HOT_QUERIES:
+        try:
+            stages = await _explain_stages(query)
+        except Exception as e:
+            logger.warning(f"获取热点查询 {query.name} 的执行计划失败: {str(e)}")
+            continue
+        if "COLLSCAN" in stages:
+            report["collscans"].append(query.name)
+
+    for key, label in (
+        ("missing", "缺失的索引"),
+        ("mismatched", "与声明不一致的索引"),
+        ("undeclared", "未声明的索引"),
+        ("collscans", "使用全集合扫描的热点查询"),
+    ):
+        if report[key]:
+            logger.warning(f"{label}: {', '.join(report[key])}")
+    if not report["missing"] and not report["collscans"]:
+        logger.info("索引检查通过: 声明的索引均已存在，热点查询均使用索引")
+    return report
+
+
+async def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description="创建MongoDB索引并输出索引检查报告")
+    parser.add_argument("--report", action="store_true", help="只输出报告，不创建索引")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    await mongodb.connect_to_mongo()
+    try:
+        if not args.report:
+            await ensure_indexes()
+        print(json.dumps(await index_report(), ensure_ascii=False, indent=2))
+    finally:
+        await mongodb.close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
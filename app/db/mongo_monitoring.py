@@ -0,0 +1,105 @@
+"""
+MongoDB连接池监控
+通过 pymongo 连接池事件统计连接数、使用中的连接数以及获取连接的等待时间
+
+Motor 在线程池中执行 pymongo 操作，同一次获取连接的开始/完成事件在同一线程中触发，
+因此开始时间保存在线程局部变量中
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict
+
+from pymongo import monitoring
+
+
+def _percentile(samples: Deque[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(len(ordered) * percent), len(ordered) - 1)
+    return ordered[index]
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """连接池事件统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # 最近的获取连接等待时间(秒)
+        self._wait_times: Deque[float] = deque(maxlen=2000)
+        self.connections = 0
+        self.in_use = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.max_wait = 0.0
+        self.pool_clears = 0
+
+    def _finish_checkout(self) -> float:
+        started = getattr(self._local, "checkout_started", None)
+        self._local.checkout_started = None
+        return time.perf_counter() - started if started is not None else 0.0
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections -= 1
+
+    def connection_check_out_started(self, event):
+        self._local.checkout_started = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._finish_checkout()
+        with self._lock:
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        wait = self._finish_checkout()
+        with self._lock:
+            self.in_use += 1
+            self.checkouts += 1
+            self.max_wait = max(self.max_wait, wait)
+            self._wait_times.append(wait)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.in_use -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """连接池统计(等待时间单位为毫秒)"""
+        with self._lock:
+            wait_times = deque(self._wait_times)
+            return {
+                "connections": self.connections,
+                "in_use": self.in_use,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "wait_ms_p50": round(_percentile(wait_times, 0.5) * 1000, 2),
+                "wait_ms_p95": round(_percentile(wait_times, 0.95) * 1000, 2),
+                "wait_ms_max": round(self.max_wait * 1000, 2),
+            }
+
+
+# 全局连接池统计实例
+pool_metrics = PoolMetrics()
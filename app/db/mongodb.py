@@ -1,14 +1,37 @@
+import asyncio
+import importlib.util
 import logging
-from typing import Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase, AsyncIOMotorCollection
+from pymongo import WriteConcern
 from pymongo.errors import ConnectionFailure, OperationFailure
+from pymongo.read_preferences import SecondaryPreferred
 
 from app.core.config import settings
+from app.db.mongo_monitoring import pool_metrics
 
 # 全局变量
 mongo_client: Optional[AsyncIOMotorClient] = None
 database: Optional[AsyncIOMotorDatabase] = None
+# (集合名称, 配置名称) -> 应用了读写配置的集合对象
+_profiled_collections: Dict[Tuple[str, str], AsyncIOMotorCollection] = {}
+
+# 压缩算法 -> 需要的模块(zlib为标准库)
+_COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy", "zlib": "zlib"}
+
+
+def _available_compressors() -> List[str]:
+    """按配置顺序返回已安装依赖的网络压缩算法"""
+    compressors = []
+    for name in settings.MONGODB_COMPRESSORS.split(","):
+        name = name.strip()
+        module = _COMPRESSOR_MODULES.get(name)
+        if module and importlib.util.find_spec(module) is not None:
+            compressors.append(name)
+        elif name:
+            logging.warning(f"MongoDB网络压缩算法 {name} 不可用，已跳过")
+    return compressors
 
 
 async def connect_to_mongo() -> None:
@@ -18,12 +41,18 @@ async def connect_to_mongo() -> None:
     global mongo_client, database
     try:
         # 创建MongoDB客户端
-        mongo_client = AsyncIOMotorClient(
-            settings.MONGODB_URI,
-            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
-            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
-            serverSelectionTimeoutMS=5000  # 降低超时时间，避免长时间等待
-        )
+        options: Dict[str, Any] = {
+            "minPoolSize": settings.MONGODB_MIN_POOL_SIZE,
+            "maxPoolSize": settings.MONGODB_MAX_POOL_SIZE,
+            "maxIdleTimeMS": settings.MONGODB_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": settings.MONGODB_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": 5000,  # 降低超时时间，避免长时间等待
+            "event_listeners": [pool_metrics],
+        }
+        compressors = _available_compressors()
+        if compressors:
+            options["compressors"] = ",".join(compressors)
+        mongo_client = AsyncIOMotorClient(settings.MONGODB_URI, **options)
         
         # 验证连接
         await mongo_client.admin.command("ping")
@@ -31,7 +60,12 @@ async def connect_to_mongo() -> None:
         # 获取数据库
         database = mongo_client[settings.MONGODB_DB_NAME]
         
-        logging.info(f"成功连接到MongoDB: {settings.MONGODB_URI}, 数据库: {settings.MONGODB_DB_NAME}")
+        _profiled_collections.clear()
+        
+        logging.info(
+            f"成功连接到MongoDB: {settings.MONGODB_URI}, 数据库: {settings.MONGODB_DB_NAME}, "
+            f"网络压缩: {','.join(compressors) or '无'}"
+        )
     except Exception as e:
         logging.error(f"MongoDB连接失败: {str(e)}")
         # 清理资源
@@ -52,9 +86,30 @@ async def close_mongo_connection() -> None:
         mongo_client.close()
         mongo_client = None
         database = None
+        _profiled_collections.clear()
         logging.info("MongoDB连接已关闭")
 
 
+async def warm_up_pool() -> int:
+    """
+    预热连接池(应用启动时调用)
+
+    并发执行 minPoolSize 个 ping，使连接池在接收请求前建立好最小数量的连接，
+    避免第一批请求等待建立连接(含TLS握手和认证)
+
+    Returns:
+        预热后连接池中的连接数
+    """
+    if mongo_client is None or settings.MONGODB_MIN_POOL_SIZE <= 0:
+        return 0
+    await asyncio.gather(*[
+        mongo_client.admin.command("ping") for _ in range(settings.MONGODB_MIN_POOL_SIZE)
+    ])
+    connections = pool_metrics.stats()["connections"]
+    logging.info(f"MongoDB连接池预热完成，当前连接数: {connections}")
+    return connections
+
+
 def get_database() -> AsyncIOMotorDatabase:
     """
     获取数据库实例
@@ -74,12 +129,25 @@ def get_database() -> AsyncIOMotorDatabase:
     return database
 
 
-def get_collection(collection_name: str) -> AsyncIOMotorCollection:
+def get_collection(collection_name: str, profile: Optional[str] = None) -> AsyncIOMotorCollection:
     """
     获取指定集合
+
+    Args:
+        collection_name: 集合名称
+        profile: 读写配置名称(见 COLLECTION_PROFILES)，默认使用该集合的默认配置
     """
     db = get_database()
-    return db[collection_name]
+    profile = profile or COLLECTION_DEFAULT_PROFILES.get(collection_name)
+    if database is None or not profile:
+        return db[collection_name]
+
+    key = (collection_name, profile)
+    collection = _profiled_collections.get(key)
+    if collection is None:
+        collection = db[collection_name].with_options(**COLLECTION_PROFILES[profile])
+        _profiled_collections[key] = collection
+    return collection
 
 
 # 模拟集合类，用于在数据库连接失败时提供降级服务
@@ -128,7 +196,29 @@ class MockCollection:
 # 预定义集合名称常量
 USERS_COLLECTION = "users"
 FAMILIES_COLLECTION = "families"
+FAMILY_MEMBERSHIPS_COLLECTION = "family_memberships"
 RECIPES_COLLECTION = "recipes"
 MENU_PLANS_COLLECTION = "menu_plans"
 SHOPPING_LISTS_COLLECTION = "shopping_lists"
-INGREDIENTS_COLLECTION = "ingredients" 
\ No newline at end of file
+INGREDIENTS_COLLECTION = "ingredients"
+COMMENTS_COLLECTION = "comments"
+FAVORITES_COLLECTION = "favorites"
+USER_ROLES_COLLECTION = "user_roles"
+MIGRATIONS_COLLECTION = "migrations"
+
+
+# 集合读写配置
+COLLECTION_PROFILES: Dict[str, Dict[str, Any]] = {
+    # 用户、成员关系等权限相关数据: 写入多数节点确认后返回
+    "strict": {"write_concern": WriteConcern(w="majority", wtimeout=5000)},
+    # 浏览次数等计数: 主节点确认即可，不等待日志落盘和复制
+    "relaxed": {"write_concern": WriteConcern(w=1, j=False)},
+    # 菜谱检索: 优先读取从节点，允许有限的复制延迟
+    "search": {"read_preference": SecondaryPreferred(max_staleness=settings.MONGODB_SEARCH_MAX_STALENESS)},
+}
+
+# 集合默认使用的读写配置(未列出的集合使用客户端默认配置)
+COLLECTION_DEFAULT_PROFILES: Dict[str, str] = {
+    USERS_COLLECTION: "strict",
+    FAMILY_MEMBERSHIPS_COLLECTION: "strict",
+}
@@ -1,79 +1,280 @@
+"""
+Redis连接管理
+- 连接地址、密码、连接池大小均来自配置
+- 按用途使用两个连接池: cache(各类缓存、计数) 与 session(令牌黑名单、验证码、登录计数等会话数据)，
+  两者可以指向不同的Redis实例，缓存流量不会占满会话数据的连接
+- 后台任务定期PING检查连接，连接失败时进入降级模式，恢复后自动切回真实连接
+- 降级期间 get_redis 返回 DegradedRedis: get 返回None，set/delete 被忽略，其他命令抛出 ConnectionError
+- 提供批量读写的管道辅助函数
+"""
+import asyncio
 import logging
-from typing import Optional
-from redis.asyncio import Redis, from_url
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+from redis.asyncio import ConnectionPool, Redis
+from redis.exceptions import ConnectionError as RedisConnectionError
 
 from app.core.config import settings
 
-# 全局Redis连接实例
-_redis_client: Optional[Redis] = None
+logger = logging.getLogger(__name__)
+
+# 连接池用途
+REDIS_CACHE = "cache"
+REDIS_SESSION = "session"
+
+
+class DegradedRedis:
+    """Redis不可用时的降级实现"""
+
+    def __init__(self, role: str):
+        self._role = role
+
+    async def get(self, name):
+        logger.debug(f"Redis({self._role})不可用，忽略读取 {name}")
+        return None
+
+    async def set(self, name, value, ex=None, **kwargs):
+        logger.warning(f"Redis({self._role})不可用，忽略写入 {name}")
+        return True
+
+    async def delete(self, *names):
+        logger.warning(f"Redis({self._role})不可用，忽略删除 {names}")
+        return len(names)
+
+    async def ping(self):
+        return False
+
+    async def close(self):
+        return True
+
+    def __getattr__(self, name: str):
+        def unavailable(*args, **kwargs):
+            raise RedisConnectionError(f"Redis({self._role})不可用")
+        return unavailable
+
+
+class RedisManager:
+    """Redis连接池与健康状态管理"""
+
+    def __init__(self):
+        self._clients: Dict[str, Redis] = {}
+        self._degraded: Dict[str, DegradedRedis] = {}
+        self._healthy: Dict[str, bool] = {}
+        self._checked_at: Dict[str, float] = {}
+        self._lock = asyncio.Lock()
+        self._health_task: Optional[asyncio.Task] = None
+        # 统计
+        self.failures = 0
+        self.recoveries = 0
+
+    @staticmethod
+    def _pool_settings(role: str) -> Dict[str, Any]:
+        if role == REDIS_SESSION:
+            return {
+                "url": settings.REDIS_SESSION_URI or settings.REDIS_URI,
+                "max_connections": settings.REDIS_SESSION_MAX_CONNECTIONS,
+            }
+        return {"url": settings.REDIS_URI, "max_connections": settings.REDIS_CACHE_MAX_CONNECTIONS}
+
+    def _create_client(self, role: str) -> Redis:
+        options = self._pool_settings(role)
+        pool = ConnectionPool.from_url(
+            options["url"],
+            password=settings.REDIS_PASSWORD,
+            max_connections=options["max_connections"],
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+            decode_responses=False  # 保留原始字节序列
+        )
+        return Redis(connection_pool=pool)
+
+    async def _check(self, role: str) -> bool:
+        """PING检查连接并更新健康状态"""
+        self._checked_at[role] = time.monotonic()
+        try:
+            await self._clients[role].ping()
+            healthy = True
+        except Exception as e:
+            healthy = False
+            if self._healthy.get(role, True):
+                logger.error(f"Redis({role})连接失败，进入降级模式: {str(e)}")
+        previous = self._healthy.get(role)
+        if healthy and previous is False:
+            self.recoveries += 1
+            logger.info(f"Redis({role})连接已恢复")
+        if not healthy and previous is not False:
+            self.failures += 1
+        self._healthy[role] = healthy
+        return healthy
+
+    async def _connect(self, role: str) -> None:
+        async with self._lock:
+            if role in self._clients:
+                return
+            self._clients[role] = self._create_client(role)
+            self._degraded[role] = DegradedRedis(role)
+            if await self._check(role):
+                logger.info(f"Redis({role})连接成功")
+
+    async def get(self, role: str = REDIS_CACHE) -> Any:
+        """
+        获取指定用途的Redis客户端
+
+        Args:
+            role: 连接池用途(REDIS_CACHE / REDIS_SESSION)
+
+        Returns:
+            Redis客户端，连接不可用时返回降级实现
+        """
+        if role not in self._clients:
+            await self._connect(role)
+        if not self._healthy.get(role):
+            # 健康检查任务运行时由其负责恢复；否则按检查间隔在请求中尝试重新连接
+            if self._health_task is None and self._check_due(role):
+                async with self._lock:
+                    # 等待锁期间其他请求可能已经完成检查
+                    if self._check_due(role):
+                        await self._check(role)
+            if not self._healthy.get(role):
+                return self._degraded[role]
+        return self._clients[role]
+
+    def _check_due(self, role: str) -> bool:
+        return time.monotonic() - self._checked_at.get(role, 0.0) >= settings.REDIS_HEALTH_CHECK_INTERVAL
+
+    def use_client(self, client: Any, role: Optional[str] = None) -> None:
+        """替换客户端(测试时使用本地Redis或fakeredis)，不指定用途时替换全部"""
+        for name in [role] if role else [REDIS_CACHE, REDIS_SESSION]:
+            self._clients[name] = client
+            self._degraded[name] = DegradedRedis(name)
+            self._healthy[name] = True
 
+    async def _health_loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.REDIS_HEALTH_CHECK_INTERVAL)
+            for role in list(self._clients):
+                await self._check(role)
 
-async def get_redis() -> Redis:
+    async def start(self) -> None:
+        """建立连接并启动健康检查(应用启动时调用)"""
+        for role in (REDIS_CACHE, REDIS_SESSION):
+            await self._connect(role)
+        if self._health_task is None and settings.REDIS_HEALTH_CHECK_INTERVAL > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def close(self) -> None:
+        """停止健康检查并断开全部连接池(应用关闭时调用)"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._health_task = None
+
+        closed = set()
+        for client in self._clients.values():
+            if id(client) in closed:
+                continue
+            closed.add(id(client))
+            try:
+                await client.close()
+                if getattr(client, "connection_pool", None) is not None:
+                    await client.connection_pool.disconnect()
+            except Exception as e:
+                logger.warning(f"关闭Redis连接时出错: {str(e)}")
+        self._clients.clear()
+        self._degraded.clear()
+        self._healthy.clear()
+        self._checked_at.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """连接状态统计"""
+        pools = {}
+        for role, client in self._clients.items():
+            pool = getattr(client, "connection_pool", None)
+            pools[role] = {
+                "healthy": self._healthy.get(role, False),
+                "max_connections": getattr(pool, "max_connections", None),
+                "in_use": len(getattr(pool, "_in_use_connections", ())),
+                "idle": len(getattr(pool, "_available_connections", ())),
+            }
+        return {"pools": pools, "failures": self.failures, "recoveries": self.recoveries}
+
+
+# 全局Redis连接管理实例
+redis_manager = RedisManager()
+
+
+async def get_redis(role: str = REDIS_CACHE) -> Redis:
     """
     获取Redis连接实例
+
+    Args:
+        role: 连接池用途，默认为缓存连接池
     """
-    global _redis_client
-    
-    if _redis_client is None:
-        try:
-            # 从配置文件获取Redis连接信息
-            host = "192.168.1.18"
-            port = 6379
-            database = 2
-            password = "ZXyue@_341@"
-            
-            redis_uri = f"redis://{host}:{port}/{database}"
-            
-            logging.info(f"正在连接到Redis: {redis_uri}")
-            _redis_client = from_url(
-                redis_uri,
-                password=password,
-                encoding="utf-8", 
-                decode_responses=False  # 保留原始字节序列
-            )
-            # 尝试ping确认连接正常
-            await _redis_client.ping()
-            logging.info("Redis连接成功!")
-        except Exception as e:
-            logging.error(f"Redis连接失败: {str(e)}")
-            # 使用标准Redis库，而不是尝试模拟
-            # 只是记录错误，让应用继续运行
-            # 短信验证码功能可能不可用
-            from redis.asyncio import Redis as AsyncRedis
-            class MockRedis(AsyncRedis):
-                """简单的Redis模拟实现，用于在Redis服务不可用时提供基本功能"""
-                async def get(self, name):
-                    logging.warning(f"模拟Redis: 尝试获取键 {name}")
-                    return None
-                
-                async def set(self, name, value, ex=None):
-                    logging.warning(f"模拟Redis: 尝试设置键 {name} 为 {value}, 过期时间: {ex}")
-                    return True
-                
-                async def delete(self, *names):
-                    logging.warning(f"模拟Redis: 尝试删除键 {names}")
-                    return len(names)
-                
-                async def ping(self):
-                    return True
-                
-                async def close(self):
-                    return True
-            
-            logging.warning("使用模拟的Redis实例!")
-            _redis_client = MockRedis()
-    
-    return _redis_client
+    return await redis_manager.get(role)
 
 
 async def close_redis_connection():
     """
     关闭Redis连接
     """
-    global _redis_client
-    
-    if _redis_client is not None:
-        logging.info("关闭Redis连接...")
-        await _redis_client.close()
-        _redis_client = None
-        logging.info("Redis连接已关闭!") 
\ No newline at end of file
+    logger.info("关闭Redis连接...")
+    await redis_manager.close()
+    logger.info("Redis连接已关闭!")
+
+
+async def pipeline_get(keys: Iterable[str], role: str = REDIS_CACHE) -> List[Optional[bytes]]:
+    """
+    通过一次往返批量读取多个键
+
+    Returns:
+        与keys一一对应的值，不存在时为None
+    """
+    keys = list(keys)
+    if not keys:
+        return []
+    redis = await get_redis(role)
+    return list(await redis.mget(keys))
+
+
+async def pipeline_set(items: Mapping[str, Any], ex: Optional[int] = None, role: str = REDIS_CACHE) -> None:
+    """通过一次往返批量写入多个键(可以统一设置过期时间)"""
+    if not items:
+        return
+    redis = await get_redis(role)
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, value in items.items():
+            pipe.set(key, value, ex=ex)
+        await pipe.execute()
+
+
+async def pipeline_delete(keys: Iterable[str], role: str = REDIS_CACHE) -> int:
+    """批量删除多个键"""
+    keys = list(keys)
+    if not keys:
+        return 0
+    redis = await get_redis(role)
+    return await redis.delete(*keys)
+
+
+async def incr_with_expiry(key: str, ttl: int, role: str = REDIS_CACHE) -> int:
+    """
+    计数加一，首次创建时设置过期时间
+
+    计数与剩余过期时间在同一次往返中读取，只有键尚未设置过期时间时才需要再发送一次EXPIRE
+
+    Returns:
+        加一后的计数
+    """
+    redis = await get_redis(role)
+    async with redis.pipeline(transaction=False) as pipe:
+        pipe.incr(key)
+        pipe.ttl(key)
+        count, remaining = await pipe.execute()
+    if remaining < 0:
+        await redis.expire(key, ttl)
+    return count
@@ -11,8 +11,21 @@ from app.api.v1 import auth, users, families, recipes, menu_plans, shopping_list
 from app.api.v1 import rbac
 from app.api.v1.admin import homepage as admin_homepage
 from app.core.config import settings
-from app.db.mongodb import connect_to_mongo, close_mongo_connection
-from app.db.redis import get_redis, close_redis_connection
+from app.core.response import MongoJSONResponse
+from app.db.mongodb import connect_to_mongo, close_mongo_connection, warm_up_pool
+from app.db.mongo_monitoring import pool_metrics
+from app.db.indexes import ensure_indexes, index_report
+from app.db.redis import redis_manager, close_redis_connection
+from app.services.recipe_search import get_search_backend, ensure_search_index
+from app.services.family_membership import ensure_memberships
+from app.services.token_revocation import token_revocation
+from app.services.recipe_rating import rating_reconciler
+from app.services.view_counter import view_counter
+from app.services.recipe_cache import recipe_cache
+from app.services.homepage import home_feed, content_scheduler
+from app.utils.wechat import wechat_client
+from app.services.mail_queue import mail_queue
+from app.services.password_hasher import password_hasher
 # 导入自定义中间件和异常处理
 from app.core.exception_handlers import register_exception_handlers
 
@@ -29,15 +42,70 @@ async def lifespan(app: FastAPI):
         logging.error(f"MongoDB连接失败: {str(e)}")
         logging.warning("应用将以有限功能模式启动，API可能无法正常工作")
     
+    # 预热MongoDB连接池
+    if settings.MONGODB_WARMUP:
+        try:
+            await warm_up_pool()
+        except Exception as e:
+            logging.error(f"MongoDB连接池预热失败: {str(e)}")
+    
+    # 创建菜谱检索索引，并为尚未建立索引的菜谱补建索引
+    try:
+        await get_search_backend().ensure_indexes()
+        if settings.SEARCH_REBUILD_ON_STARTUP:
+            await ensure_search_index()
+    except Exception as e:
+        logging.error(f"创建菜谱检索索引失败: {str(e)}")
+    
+    # 按索引注册表创建缺失的索引，并检查热点查询是否走索引
+    try:
+        if settings.MONGODB_ENSURE_INDEXES:
+            await ensure_indexes()
+        if settings.MONGODB_INDEX_REPORT:
+            await index_report()
+    except Exception as e:
+        logging.error(f"创建或检查数据库索引失败: {str(e)}")
+    
+    # 首次上线时回填家庭成员关系
+    if settings.FAMILY_MEMBERSHIP_BACKFILL:
+        try:
+            await ensure_memberships()
+        except Exception as e:
+            logging.error(f"回填家庭成员关系失败: {str(e)}")
+    
     # 尝试连接Redis
     try:
-        await get_redis()
+        await redis_manager.start()
     except Exception as e:
         logging.error(f"Redis初始化失败: {str(e)}")
         logging.warning("短信验证码和缓存功能可能无法正常工作")
     
+    # 启动令牌吊销列表同步
+    await token_revocation.start()
+    
+    # 启动菜谱评分统计校准
+    await rating_reconciler.start()
+    
+    # 启动菜谱浏览次数定期写回
+    await view_counter.start()
+    
+    # 启动邮件发送队列
+    await mail_queue.start()
+    
     yield  # 应用运行中
     
+    # 写回剩余的菜谱浏览次数(需在关闭MongoDB连接之前)
+    try:
+        await view_counter.stop()
+    except Exception as e:
+        logging.error(f"写回菜谱浏览次数时出错: {str(e)}")
+    
+    # 发送队列中剩余的邮件
+    try:
+        await mail_queue.stop()
+    except Exception as e:
+        logging.error(f"停止邮件发送队列时出错: {str(e)}")
+    
     # 关闭事件: 断开数据库连接
     try:
         logging.info("关闭MongoDB连接...")
@@ -46,6 +114,21 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logging.error(f"关闭MongoDB连接时出错: {str(e)}")
     
+    # 停止令牌吊销列表同步
+    await token_revocation.stop()
+    
+    # 停止菜谱评分统计校准
+    await rating_reconciler.stop()
+    
+    # 关闭密码哈希线程池
+    password_hasher.shutdown()
+    
+    # 关闭微信接口HTTP客户端
+    try:
+        await wechat_client.close()
+    except Exception as e:
+        logging.error(f"关闭微信接口客户端时出错: {str(e)}")
+    
     # 关闭Redis连接
     try:
         await close_redis_connection()
@@ -59,6 +142,8 @@ app = FastAPI(
     description="家宴菜谱微信小程序后台服务API",
     version=settings.APP_VERSION,
     lifespan=lifespan,
+    # 默认响应类只替换最终的JSON编码，路由返回普通对象时仍会先经过jsonable_encoder
+    default_response_class=MongoJSONResponse,
     docs_url="/docs" if settings.DEBUG else None,
     redoc_url="/redoc" if settings.DEBUG else None,
 )
@@ -113,6 +198,23 @@ async def health_check():
     return success_response(data={"status": "healthy", "version": settings.APP_VERSION})
 
 
+# 运行指标路由
+@app.get("/metrics", tags=["健康检查"])
+async def metrics():
+    from app.core.response import success_response
+    return success_response(data={
+        "view_counter": await view_counter.metrics(),
+        "recipe_cache": recipe_cache.stats(),
+        "home_feed": home_feed.stats(),
+        "content_scheduler": content_scheduler.stats(),
+        "wechat": wechat_client.stats(),
+        "mail_queue": mail_queue.stats(),
+        "password_hasher": password_hasher.stats(),
+        "redis": redis_manager.stats(),
+        "mongodb": pool_metrics.stats()
+    })
+
+
 # 根路由
 @app.get("/", tags=["根"])
 async def root():
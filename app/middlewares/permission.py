@@ -4,14 +4,14 @@
 """
 
 import logging
-from typing import List, Optional, Callable, Any
+from typing import Dict, FrozenSet, List, Optional, Callable, Any
 from functools import wraps
 
 from fastapi import HTTPException, status, Depends, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from app.core.jwt import verify_token
-from app.services.rbac_service import UserRoleService
+from app.services.rbac_service import UserRoleService, permission_resolver
 from app.core.response import unauthorized_response
 
 logger = logging.getLogger(__name__)
@@ -21,16 +21,84 @@ security = HTTPBearer()
 
 
 class PermissionChecker:
-    """权限检查器"""
+    """
+    权限检查器
+    
+    同一请求内用户的权限集合只解析一次，结果缓存在 request.state 上，
+    同一路由上的多个装饰器和 PermissionDependency 共享该结果
+    """
     
     def __init__(self):
         self.user_role_service = UserRoleService()
     
+    async def get_permission_set(
+        self,
+        user_id: str,
+        request: Optional[Request] = None
+    ) -> FrozenSet[str]:
+        """
+        获取用户权限代码集合，传入request时在请求范围内复用
+        
+        Args:
+            user_id: 用户ID
+            request: 当前请求（可选）
+        
+        Returns:
+            FrozenSet[str]: 权限代码集合
+        """
+        state = request.state if request is not None else None
+        memo: Optional[Dict[str, FrozenSet[str]]] = getattr(state, "permission_sets", None)
+        if state is not None and memo is None:
+            memo = {}
+            state.permission_sets = memo
+            state.permission_db_hits = 0
+        
+        if memo is not None and user_id in memo:
+            return memo[user_id]
+        
+        permissions, hit_db = await permission_resolver.resolve(user_id)
+        
+        if state is not None:
+            memo[user_id] = permissions
+            if hit_db:
+                state.permission_db_hits += 1
+                if state.permission_db_hits > 1:
+                    logger.warning(
+                        f"请求 {request.url.path} 中权限解析访问数据库 {state.permission_db_hits} 次"
+                    )
+        
+        return permissions
+    
+    async def check_permissions(
+        self,
+        user_id: str,
+        permission_codes: List[str],
+        request: Optional[Request] = None
+    ) -> Dict[str, bool]:
+        """
+        批量检查权限，只解析一次权限集合
+        
+        Args:
+            user_id: 用户ID
+            permission_codes: 权限代码列表
+            request: 当前请求（可选）
+        
+        Returns:
+            Dict[str, bool]: {权限代码: 是否拥有}
+        """
+        try:
+            permissions = await self.get_permission_set(user_id, request)
+        except Exception as e:
+            logger.error(f"权限检查失败: {str(e)}")
+            return {code: False for code in permission_codes}
+        return {code: code in permissions for code in permission_codes}
+    
     async def check_permission(
         self,
         user_id: str,
         permission_code: str,
-        resource_id: Optional[str] = None
+        resource_id: Optional[str] = None,
+        request: Optional[Request] = None
     ) -> bool:
         """
         检查用户是否有指定权限
@@ -39,34 +107,27 @@ class PermissionChecker:
             user_id: 用户ID
             permission_code: 权限代码
             resource_id: 资源ID（可选，用于资源级权限控制）
+            request: 当前请求（可选，用于请求内复用权限集合）
         
         Returns:
             bool: 是否有权限
         """
-        try:
-            # 检查用户权限
-            has_permission = await self.user_role_service.check_user_permission(
-                user_id, permission_code
-            )
-            
-            if not has_permission:
-                logger.warning(f"用户 {user_id} 没有权限 {permission_code}")
-                return False
-            
-            # TODO: 如果需要资源级权限控制，可以在这里添加额外的检查逻辑
-            # 例如：检查用户是否有权限访问特定的资源实例
-            
-            return True
-            
-        except Exception as e:
-            logger.error(f"权限检查失败: {str(e)}")
+        results = await self.check_permissions(user_id, [permission_code], request)
+        if not results[permission_code]:
+            logger.warning(f"用户 {user_id} 没有权限 {permission_code}")
             return False
+        
+        # TODO: 如果需要资源级权限控制，可以在这里添加额外的检查逻辑
+        # 例如：检查用户是否有权限访问特定的资源实例
+        
+        return True
     
     async def check_multiple_permissions(
         self,
         user_id: str,
         permission_codes: List[str],
-        require_all: bool = True
+        require_all: bool = True,
+        request: Optional[Request] = None
     ) -> bool:
         """
         检查用户是否有多个权限
@@ -75,24 +136,35 @@ class PermissionChecker:
             user_id: 用户ID
             permission_codes: 权限代码列表
             require_all: 是否需要所有权限（True）还是任一权限（False）
+            request: 当前请求（可选，用于请求内复用权限集合）
         
         Returns:
             bool: 是否有权限
         """
-        try:
-            results = []
-            for permission_code in permission_codes:
-                has_permission = await self.check_permission(user_id, permission_code)
-                results.append(has_permission)
-            
-            if require_all:
-                return all(results)
-            else:
-                return any(results)
-                
-        except Exception as e:
-            logger.error(f"多权限检查失败: {str(e)}")
-            return False
+        results = await self.check_permissions(user_id, permission_codes, request)
+        if require_all:
+            return all(results.values())
+        return any(results.values())
+
+
+def get_permission_db_hits(request: Request) -> int:
+    """
+    获取当前请求中权限解析访问数据库的次数
+    
+    命中缓存或复用请求内结果时不计数，正常情况下应不超过1
+    """
+    return getattr(request.state, "permission_db_hits", 0)
+
+
+def _find_request(args: tuple, kwargs: dict) -> Optional[Request]:
+    """从被装饰函数的参数中查找Request对象"""
+    request = kwargs.get('request')
+    if isinstance(request, Request):
+        return request
+    for arg in list(args) + list(kwargs.values()):
+        if isinstance(arg, Request):
+            return arg
+    return None
 
 
 # 全局权限检查器实例
@@ -170,7 +242,7 @@ def require_permission(permission_code: str):
             
             # 检查权限
             has_permission = await permission_checker.check_permission(
-                user_id, permission_code
+                user_id, permission_code, request=_find_request(args, kwargs)
             )
             
             if not has_permission:
@@ -220,7 +292,7 @@ def require_any_permission(permission_codes: List[str]):
             
             # 检查是否有任一权限
             has_permission = await permission_checker.check_multiple_permissions(
-                user_id, permission_codes, require_all=False
+                user_id, permission_codes, require_all=False, request=_find_request(args, kwargs)
             )
             
             if not has_permission:
@@ -270,7 +342,7 @@ def require_all_permissions(permission_codes: List[str]):
             
             # 检查是否有所有权限
             has_permission = await permission_checker.check_multiple_permissions(
-                user_id, permission_codes, require_all=True
+                user_id, permission_codes, require_all=True, request=_find_request(args, kwargs)
             )
             
             if not has_permission:
@@ -291,11 +363,12 @@ class PermissionDependency:
     def __init__(self, permission_code: str):
         self.permission_code = permission_code
     
-    async def __call__(self, current_user: dict = Depends(get_current_user)):
+    async def __call__(self, request: Request, current_user: dict = Depends(get_current_user)):
         """
         检查权限的依赖函数
         
         Args:
+            request: 当前请求（权限集合在请求内复用）
             current_user: 当前用户信息
         
         Returns:
@@ -313,7 +386,7 @@ class PermissionDependency:
         
         # 检查权限
         has_permission = await permission_checker.check_permission(
-            user_id, self.permission_code
+            user_id, self.permission_code, request=request
         )
         
         if not has_permission:
@@ -139,6 +139,21 @@ class CardUpdate(BaseModel):
     end_time: Optional[datetime] = None
 
 
+# 首页内容通用更新模型(管理员更新任意类型的内容)
+class HomeContentUpdate(BaseModel):
+    title: Optional[str] = None
+    image_url: Optional[str] = None
+    target_id: Optional[str] = None
+    target_type: Optional[str] = None
+    target_url: Optional[str] = None
+    description: Optional[str] = None
+    tags: Optional[List[Tag]] = None
+    sort_order: Optional[int] = None
+    status: Optional[ContentStatus] = None
+    start_time: Optional[datetime] = None
+    end_time: Optional[datetime] = None
+
+
 # 查询参数模型
 class ContentFilter(BaseModel):
     type: Optional[ContentType] = None
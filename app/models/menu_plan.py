@@ -112,10 +112,31 @@ class MenuPlanResponse(BaseModel):
     confirmedAt: Optional[datetime] = None
 
 
+class MenuPlanCard(BaseModel):
+    """菜单计划卡片(列表摘要视图 menuPlan.card)"""
+    id: str
+    name: str
+    familyId: str
+    creatorId: Optional[str] = None
+    date: datetime
+    status: MenuPlanStatus
+    guestCount: Optional[int] = None
+    shoppingListId: Optional[str] = None
+    dishCount: int = 0
+    createdAt: Optional[datetime] = None
+    updatedAt: Optional[datetime] = None
+
+
 class MenuPlanListParams(BaseModel):
     familyId: Optional[str] = None
     startDate: Optional[datetime] = None
     endDate: Optional[datetime] = None
     status: Optional[List[MenuPlanStatus]] = None
     page: int = 1
-    pageSize: int = 10 
\ No newline at end of file
+    pageSize: int = 10
+    # 游标分页: useCursor为True或传入cursor时按nextCursor翻页，忽略page
+    cursor: Optional[str] = None
+    useCursor: bool = False
+    includeTotal: bool = True  # 游标模式下是否返回(缓存的)总数
+    # 摘要视图: card 或逗号分隔的字段列表，不传返回完整菜单计划
+    fields: Optional[str] = None
\ No newline at end of file
@@ -51,6 +51,7 @@ class RecipeStats(BaseModel):
     commentCount: int = 0
     cookCount: int = 0
     ratingAvg: float = 0.0
+    ratingSum: float = 0.0
     ratingCount: int = 0
 
 
@@ -150,6 +151,26 @@ class RecipeResponse(BaseModel):
     updatedAt: datetime
 
 
+class RecipeCard(BaseModel):
+    """菜谱卡片(列表摘要视图 recipe.card)"""
+    id: str
+    title: str
+    coverImage: Optional[str] = None
+    description: Optional[str] = None
+    tags: List[str] = []
+    category: Optional[str] = None
+    cuisine: Optional[str] = None
+    difficulty: Optional[int] = None
+    totalTime: Optional[int] = None
+    servings: Optional[int] = None
+    creator: Optional[RecipeCreator] = None
+    isPublic: Optional[bool] = None
+    status: Optional[str] = None
+    stats: RecipeStats = RecipeStats()
+    createdAt: Optional[datetime] = None
+    is_favorite: Optional[bool] = None  # 由 apply_favorite_flags 设置
+
+
 class RecipeSearchParams(BaseModel):
     keyword: Optional[str] = None
     tags: Optional[List[str]] = None
@@ -161,5 +182,11 @@ class RecipeSearchParams(BaseModel):
     creatorId: Optional[str] = None
     page: int = 1
     pageSize: int = 10
-    sortBy: str = "createdAt"  # createdAt, popularity, rating
-    sortDirection: str = "desc"  # asc, desc 
\ No newline at end of file
+    sortBy: str = "createdAt"  # createdAt, popularity, rating, relevance(仅关键词检索)
+    sortDirection: str = "desc"  # asc, desc
+    # 游标分页: useCursor为True或传入cursor时按nextCursor翻页，忽略page
+    cursor: Optional[str] = None
+    useCursor: bool = False
+    includeTotal: bool = True  # 游标模式下是否返回(缓存的)总数
+    # 摘要视图: card 或逗号分隔的字段列表，不传返回完整菜谱
+    fields: Optional[str] = None 
\ No newline at end of file
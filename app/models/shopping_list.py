@@ -116,4 +116,33 @@ class ShoppingListGenerateRequest(BaseModel):
     """从菜单计划生成购物清单的请求模型"""
     name: str
     plan_ids: List[str]
-    family_id: Optional[str] = None 
\ No newline at end of file
+    family_id: Optional[str] = None 
+
+
+class ShoppingListCard(BaseModel):
+    """购物清单卡片(列表摘要视图 shoppingList.card)"""
+    id: str
+    name: str
+    status: Optional[ShoppingListStatus] = None
+    family_id: Optional[str] = None
+    creator_id: Optional[str] = None
+    itemCount: int = 0
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class ShoppingListListParams(BaseModel):
+    """购物清单列表查询参数"""
+    familyId: Optional[str] = None
+    startDate: Optional[datetime] = None
+    endDate: Optional[datetime] = None
+    status: Optional[List[ShoppingListStatus]] = None
+    page: int = 1
+    pageSize: int = 10
+    # 游标分页: useCursor为True或传入cursor时按nextCursor翻页，忽略page
+    cursor: Optional[str] = None
+    useCursor: bool = False
+    includeTotal: bool = True  # 游标模式下是否返回(缓存的)总数
+    # 摘要视图: card 或逗号分隔的字段列表，不传返回完整购物清单
+    fields: Optional[str] = None
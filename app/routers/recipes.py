@@ -13,6 +13,7 @@ from app.models.recipe import (RecipeCreate, RecipeCreator, RecipeModel,
                            RecipeResponse, RecipeSearchParams, RecipeUpdate)
 from app.models.user import UserModel
 from app.models.comment import (CommentCreate, CommentResponse, CommentsListResponse)
+from app.services.favorite import apply_favorite_flags
 
 router = APIRouter(
     prefix="/recipes",
@@ -102,6 +103,11 @@ async def get_recipe(
         recipe["stats"]["viewCount"] += 1
     
     recipe["id"] = str(recipe.pop("_id"))
+    
+    # 收藏记录保存在用户文档的favorites数组中，无需额外查询
+    favorite_ids = set(getattr(current_user, "favorites", None) or []) if current_user else set()
+    apply_favorite_flags([recipe], favorite_ids)
+    
     return recipe
 
 
@@ -270,6 +276,10 @@ async def search_recipes(
         recipe["id"] = str(recipe.pop("_id"))
         recipes.append(recipe)
     
+    # 收藏记录保存在用户文档的favorites数组中，整页一次性标注
+    favorite_ids = set(getattr(current_user, "favorites", None) or []) if current_user else set()
+    apply_favorite_flags(recipes, favorite_ids)
+    
     return recipes
 
 
@@ -1,10 +1,15 @@
 from datetime import datetime
 from typing import Dict, Any, Tuple
 
-from app.core.exceptions import AuthenticationError
+from app.core.config import settings
+from app.core.exceptions import AuthenticationError, RateLimitExceededError, ServiceUnavailableError
 from app.core.security import create_access_token, create_refresh_token
 from app.models.user import UserProfile, UserStats, Gender,Token
-from app.services.user import get_user_by_openid, create_user, update_user_last_login, get_user_by_phone, get_user_by_account, get_user_by_email, get_user_by_username
+from app.services.token_revocation import token_revocation
+from app.services.login_throttle import login_throttle
+from app.services.password_hasher import password_hasher
+from app.services.user_cache import token_identifier
+from app.services.user import get_user_by_openid, create_user, update_user_last_login, update_password_hash, get_user_by_phone, get_user_by_account, get_user_by_email, get_user_by_username
 from app.utils.wechat import code2session
 from app.utils.email import send_email
 
@@ -21,7 +26,7 @@ async def wechat_login(code: str, user_info: Dict[str, Any] = None) -> Tuple[Dic
         Tuple[用户信息, 认证令牌, session_key]
     """
     # 使用code获取微信openid和session_key
-    wx_session = code2session(code)
+    wx_session = await code2session(code)
     
     if "openid" not in wx_session:
         raise AuthenticationError(detail="微信登录失败: 无法获取openid")
@@ -133,18 +138,25 @@ async def password_login(account: str, password: str) -> Token:
     返回:
         认证令牌
     """
-    from app.core.security import verify_password
-    
     try:
+        # 按账号限制尝试次数(在计算密码哈希之前)
+        await login_throttle.hit(account)
+        
         # 查询用户
         user = await get_user_by_account(account)
         
         if not user:
             raise AuthenticationError(detail="用户不存在")
         
-        # 验证密码
-        if not user.get("password_hash") or not verify_password(password, user["password_hash"]):
+        # 验证密码(在专用线程池中计算)
+        valid, new_hash = await password_hasher.verify_and_update(password, user.get("password_hash"))
+        if not valid:
             raise AuthenticationError(detail="密码错误")
+        await login_throttle.reset(account)
+        
+        # 哈希参数已调整时透明升级保存的哈希
+        if new_hash:
+            await update_password_hash(user["_id"], user["password_hash"], new_hash)
         
         # 检查用户状态
         if not user.get("is_active", False):
@@ -162,7 +174,7 @@ async def password_login(account: str, password: str) -> Token:
             refresh_token=refresh_token,
             token_type="bearer"
         )
-    except AuthenticationError:
+    except (AuthenticationError, RateLimitExceededError, ServiceUnavailableError):
         raise
     except Exception as e:
         raise AuthenticationError(detail=f"账号密码登录失败: {str(e)}")
@@ -181,14 +193,14 @@ async def send_sms_code(phone_number: str) -> Dict[str, Any]:
     # 短信验证码模拟实现
     # 在实际生产环境中，需要对接SMS服务提供商API
     try:
-        from app.db.redis import get_redis
+        from app.db.redis import get_redis, REDIS_SESSION
         import random
         
         # 生成6位随机验证码
         code = ''.join([str(random.randint(0, 9)) for _ in range(6)])
         
         # 存储验证码到Redis，过期时间5分钟
-        redis = await get_redis()
+        redis = await get_redis(REDIS_SESSION)
         await redis.set(f"sms:code:{phone_number}", code, ex=300)
         
         # 模拟发送短信
@@ -212,10 +224,10 @@ async def verify_sms_code(phone_number: str, code: str) -> Token:
         认证令牌
     """
     try:
-        from app.db.redis import get_redis
+        from app.db.redis import get_redis, REDIS_SESSION
         
         # 从Redis获取验证码
-        redis = await get_redis()
+        redis = await get_redis(REDIS_SESSION)
         stored_code = await redis.get(f"sms:code:{phone_number}")
         
         if not stored_code:
@@ -281,7 +293,6 @@ async def logout(token: str) -> Dict[str, Any]:
         登出结果
     """
     try:
-        from app.db.redis import get_redis
         from app.core.security import decode_token
         
         # 解码令牌以获取过期时间
@@ -289,16 +300,13 @@ async def logout(token: str) -> Dict[str, Any]:
         exp = payload.get("exp", 0)
         jti = payload.get("jti", "")  # 如果令牌中有唯一标识符
         
-        # 计算剩余有效时间（秒）
-        now = datetime.utcnow().timestamp()
-        ttl = max(int(exp - now), 0)
-        
-        # 获取Redis连接
-        redis = await get_redis()
-        
-        # 将令牌加入黑名单，保存到令牌过期时间
-        blacklist_key = f"token:blacklist:{token}" if not jti else f"token:blacklist:{jti}"
-        await redis.set(blacklist_key, "1", ex=ttl)
+        # 将令牌加入黑名单，保存到令牌过期时间，并通知所有进程
+        revocation_key = jti or token
+        await token_revocation.revoke(
+            revocation_key,
+            expires_at=float(exp),
+            token_id=token_identifier(token, payload)
+        )
         
         return {"success": True, "message": "登出成功"}
     except Exception as e:
@@ -316,7 +324,6 @@ async def is_token_blacklisted(token: str) -> bool:
         如果令牌在黑名单中返回True，否则返回False
     """
     try:
-        from app.db.redis import get_redis
         from app.core.security import decode_token
         
         # 获取令牌唯一标识符（如果有）
@@ -327,14 +334,8 @@ async def is_token_blacklisted(token: str) -> bool:
             # 如果令牌解码失败，认为令牌无效
             return True
         
-        # 获取Redis连接
-        redis = await get_redis()
-        
-        # 检查完整令牌或JTI是否在黑名单中
-        blacklist_key = f"token:blacklist:{token}" if not jti else f"token:blacklist:{jti}"
-        result = await redis.get(blacklist_key)
-        
-        return result is not None
+        # 先查本地布隆过滤器，命中时才查询Redis确认完整令牌或JTI是否在黑名单中
+        return await token_revocation.is_revoked(jti or token)
     except Exception as e:
         # 如果发生错误，为安全起见，返回True
         print(f"检查令牌黑名单失败: {str(e)}")
@@ -353,7 +354,7 @@ async def send_password_reset_email(email: str) -> Dict[str, Any]:
     """
     try:
         from app.core.security import generate_password_reset_token
-        from app.utils.email import send_email
+        from app.utils.email import send_email, render_email_template
         import logging
         
         logger = logging.getLogger(__name__)
@@ -375,50 +376,15 @@ async def send_password_reset_email(email: str) -> Dict[str, Any]:
         subject = "【家宴菜谱】密码重置请求"
         
         # 使用HTML格式的邮件内容，提供更好的用户体验
-        body = f"""
-        <html>
-        <head>
-            <style>
-                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                .header {{ background-color: #f8f9fa; padding: 10px; text-align: center; }}
-                .content {{ padding: 20px 0; }}
-                .button {{ display: inline-block; background-color: #4CAF50; color: white; padding: 12px 24px; 
-                          text-decoration: none; border-radius: 4px; }}
-                .footer {{ margin-top: 20px; font-size: 12px; color: #777; text-align: center; }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h2>密码重置请求</h2>
-                </div>
-                <div class="content">
-                    <p>您好，</p>
-                    <p>我们收到了您的密码重置请求。请点击下面的按钮重置您的密码：</p>
-                    <p style="text-align: center;">
-                        <a href="{reset_link}" class="button">重置密码</a>
-                    </p>
-                    <p>或者，您可以复制以下链接到浏览器地址栏：</p>
-                    <p>{reset_link}</p>
-                    <p>此链接将在24小时后失效。如果您没有请求重置密码，请忽略此邮件。</p>
-                </div>
-                <div class="footer">
-                    <p>此致，</p>
-                    <p>家宴菜谱团队</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        
-        # 发送邮件
+        body = render_email_template("password_reset", reset_link=reset_link)
+        
+        # 放入邮件发送队列，不等待SMTP发送完成
         send_result = await send_email(to_email=email, subject=subject, body=body, is_html=True)
         
         if send_result:
-            logger.info(f"密码重置邮件发送成功: {email}")
+            logger.info(f"密码重置邮件已加入发送队列: {email}")
         else:
-            logger.error(f"密码重置邮件发送失败: {email}")
+            logger.error(f"密码重置邮件加入发送队列失败: {email}")
         
         return {"success": send_result, "message": "密码重置邮件已发送" if send_result else "邮件发送失败"}
     except Exception as e:
@@ -438,7 +404,7 @@ async def reset_password(token: str, new_password: str) -> Dict[str, Any]:
         重置结果
     """
     try:
-        from app.core.security import verify_password_reset_token, get_password_hash
+        from app.core.security import verify_password_reset_token
         from app.services.user import get_user_by_email, update_user
         import logging
         import re
@@ -471,7 +437,7 @@ async def reset_password(token: str, new_password: str) -> Dict[str, Any]:
             raise ValueError("用户不存在")
         
         # 哈希新密码
-        password_hash = get_password_hash(new_password)
+        password_hash = await password_hasher.hash(new_password)
         
         # 更新用户密码
         update_data = {
@@ -486,43 +452,17 @@ async def reset_password(token: str, new_password: str) -> Dict[str, Any]:
             
             # 发送密码更改通知邮件
             try:
-                from app.utils.email import send_email
+                from app.utils.email import send_email, render_email_template
                 
                 subject = "【家宴菜谱】密码已更改"
-                body = f"""
-                <html>
-                <head>
-                    <style>
-                        body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                        .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                        .header {{ background-color: #f8f9fa; padding: 10px; text-align: center; }}
-                        .content {{ padding: 20px 0; }}
-                        .footer {{ margin-top: 20px; font-size: 12px; color: #777; text-align: center; }}
-                    </style>
-                </head>
-                <body>
-                    <div class="container">
-                        <div class="header">
-                            <h2>密码已更改</h2>
-                        </div>
-                        <div class="content">
-                            <p>您好，</p>
-                            <p>您的家宴菜谱账号密码已成功重置。</p>
-                            <p>此操作是在 {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')} (UTC) 完成的。</p>
-                            <p>如果这不是您本人操作，请立即联系我们的客服团队。</p>
-                        </div>
-                        <div class="footer">
-                            <p>此致，</p>
-                            <p>家宴菜谱团队</p>
-                        </div>
-                    </div>
-                </body>
-                </html>
-                """
+                body = render_email_template(
+                    "password_changed",
+                    changed_at=datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+                )
                 
-                # 异步发送通知邮件，不影响密码重置流程
+                # 放入邮件发送队列，不影响密码重置流程
                 await send_email(to_email=email, subject=subject, body=body, is_html=True)
-                logger.info(f"已发送密码更改通知邮件到: {email}")
+                logger.info(f"已将密码更改通知邮件加入发送队列: {email}")
             except Exception as email_error:
                 # 只记录日志，不影响密码重置流程
                 logger.warning(f"发送密码更改通知邮件失败: {str(email_error)}")
@@ -550,7 +490,6 @@ async def register_user(register_data) -> Token:
         认证令牌
     """
     try:
-        from app.core.security import get_password_hash
         from app.services.user import get_user_by_username, get_user_by_email, get_user_by_phone, create_user
         import re
         
@@ -597,9 +536,10 @@ async def register_user(register_data) -> Token:
         
         # 创建用户
         now = datetime.utcnow()
+        password_hash = await password_hasher.hash(register_data.password)
         user_data = {
             "username": register_data.username,
-            "password_hash": get_password_hash(register_data.password),
+            "password_hash": password_hash,
             "email": register_data.email,
             "phone": register_data.phone,
             "profile": {
@@ -6,6 +6,8 @@ from bson import ObjectId
 
 from app.db.mongodb import get_collection, RECIPES_COLLECTION
 from app.models.comment import CommentCreate, CommentResponse, UserBrief
+from app.services.recipe_rating import add_rating, remove_rating
+from app.services.comment_authors import get_authors, get_author, cache_author, UNKNOWN_AUTHOR_NAME
 
 # 集合常量
 COMMENTS_COLLECTION = "comments"
@@ -26,7 +28,6 @@ async def create_comment(recipe_id: str, comment_data: CommentCreate, current_us
         新创建的评论
     """
     # 获取集合
-    recipes_collection = get_collection(RECIPES_COLLECTION)
     comments_collection = get_collection(COMMENTS_COLLECTION)
     
     try:
@@ -38,9 +39,8 @@ async def create_comment(recipe_id: str, comment_data: CommentCreate, current_us
             detail="无效的菜谱ID"
         )
     
-    # 检查菜谱是否存在
-    recipe = await recipes_collection.find_one({"_id": recipe_object_id})
-    if not recipe:
+    # 原子地累加菜谱的评论数和评分(同时检查菜谱是否存在，无需先读取菜谱)
+    if not await add_rating(recipe_object_id, comment_data.rating):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="菜谱不存在"
@@ -63,32 +63,8 @@ async def create_comment(recipe_id: str, comment_data: CommentCreate, current_us
     # 插入评论到数据库
     await comments_collection.insert_one(new_comment)
     
-    # 更新菜谱的评论计数和平均评分
-    current_rating = recipe.get("stats", {}).get("ratingAvg", 0)
-    current_count = recipe.get("stats", {}).get("ratingCount", 0)
-    
-    # 计算新的平均评分
-    new_count = current_count + 1
-    new_rating = ((current_rating * current_count) + comment_data.rating) / new_count
-    
-    await recipes_collection.update_one(
-        {"_id": recipe_object_id},
-        {
-            "$inc": {"stats.commentCount": 1},
-            "$set": {
-                "stats.ratingAvg": new_rating,
-                "stats.ratingCount": new_count,
-                "updated_at": now
-            }
-        }
-    )
-    
-    # 构建响应
-    user_brief = UserBrief(
-        id=str(current_user["_id"]),
-        name=current_user["profile"]["nickname"],
-        avatar=current_user["profile"].get("avatar")
-    )
+    # 构建响应(同时填充作者缓存)
+    user_brief = cache_author(current_user)
     
     return CommentResponse(
         id=new_comment["_id"],
@@ -122,7 +98,6 @@ async def get_recipe_comments(
     # 获取集合
     recipes_collection = get_collection(RECIPES_COLLECTION)
     comments_collection = get_collection(COMMENTS_COLLECTION)
-    users_collection = get_collection(USERS_COLLECTION)
     
     try:
         # 转换菜谱ID为ObjectId
@@ -134,7 +109,7 @@ async def get_recipe_comments(
         )
     
     # 检查菜谱是否存在
-    recipe = await recipes_collection.find_one({"_id": recipe_object_id})
+    recipe = await recipes_collection.find_one({"_id": recipe_object_id}, {"_id": 1})
     if not recipe:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -153,22 +128,18 @@ async def get_recipe_comments(
     # 应用分页并按时间倒序排序
     cursor = cursor.sort("created_at", -1).skip(skip).limit(limit)
     
+    comments = await cursor.to_list(length=limit)
+    
+    # 一次批量加载本页所有评论作者
+    authors = await get_authors(comment["user_id"] for comment in comments if comment.get("user_id"))
+    
     # 获取评论列表
     comments_list = []
-    async for comment in cursor:
+    for comment in comments:
         try:
-            # 转换用户ID为ObjectId
-            user_object_id = ObjectId(comment["user_id"])
-            # 获取评论用户信息
-            user = await users_collection.find_one({"_id": user_object_id})
+            user_brief = authors.get(str(comment.get("user_id")))
             
-            if user:
-                user_brief = UserBrief(
-                    id=str(user["_id"]),
-                    name=user["profile"]["nickname"],
-                    avatar=user["profile"].get("avatar")
-                )
-                
+            if user_brief:
                 comment_response = CommentResponse(
                     id=str(comment["_id"]),
                     user=user_brief,
@@ -196,7 +167,12 @@ async def delete_comment(recipe_id: str, comment_id: str, current_user: dict) ->
     if str(comment["user_id"]) != str(current_user["_id"]) and not current_user.get("is_admin", False):
         raise HTTPException(status_code=403, detail="无权删除该评论")
     result = await comments_collection.delete_one({"_id": comment_id})
-    return result.deleted_count == 1
+    if result.deleted_count != 1:
+        return False
+    # 顶层评论计入了菜谱评分，删除时原子地扣除
+    if not comment.get("parent_id") and comment.get("rating") is not None and ObjectId.is_valid(recipe_id):
+        await remove_rating(ObjectId(recipe_id), comment["rating"])
+    return True
 
 async def like_comment(comment_id: str, user_id: str) -> bool:
     likes_collection = get_collection(LIKES_COLLECTION)
@@ -243,12 +219,8 @@ async def reply_comment(recipe_id: str, parent_id: str, comment_data: CommentCre
         "updated_at": now
     }
     await comments_collection.insert_one(new_comment)
-    # 构建响应
-    user_brief = UserBrief(
-        id=str(current_user["_id"]),
-        name=current_user["profile"]["nickname"],
-        avatar=current_user["profile"].get("avatar")
-    )
+    # 构建响应(同时填充作者缓存)
+    user_brief = cache_author(current_user)
     return CommentResponse(
         id=new_comment["_id"],
         user=user_brief,
@@ -263,19 +235,12 @@ async def reply_comment(recipe_id: str, parent_id: str, comment_data: CommentCre
 
 async def get_comment_by_id(recipe_id: str, comment_id: str) -> Optional[CommentResponse]:
     comments_collection = get_collection(COMMENTS_COLLECTION)
-    users_collection = get_collection(USERS_COLLECTION)
     comment = await comments_collection.find_one({"_id": comment_id, "recipe_id": recipe_id})
     if not comment:
         return None
-    user = await users_collection.find_one({"_id": ObjectId(comment["user_id"])})
-    if user:
-        user_brief = UserBrief(
-            id=str(user["_id"]),
-            name=user["profile"]["nickname"],
-            avatar=user["profile"].get("avatar")
-        )
-    else:
-        user_brief = UserBrief(id=comment["user_id"], name="未知用户", avatar=None)
+    user_brief = await get_author(comment["user_id"])
+    if not user_brief:
+        user_brief = UserBrief(id=comment["user_id"], name=UNKNOWN_AUTHOR_NAME, avatar=None)
     return CommentResponse(
         id=comment["_id"],
         user=user_brief,
@@ -0,0 +1,107 @@
+"""
+评论作者信息加载
+评论列表中的作者信息(昵称、头像)按页批量加载:
+收集本页去重后的 user_id，未命中缓存的部分用一次带投影的 $in 查询获取，
+同一作者在缓存有效期内不再访问数据库
+"""
+import logging
+from typing import Any, Dict, Iterable, Optional
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.mongodb import get_collection, USERS_COLLECTION
+from app.models.comment import UserBrief
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 作者信息只需要的用户字段
+AUTHOR_PROJECTION = {
+    "profile.nickname": 1,
+    "profile.avatar": 1,
+}
+
+# 用户不存在时的展示名称
+UNKNOWN_AUTHOR_NAME = "未知用户"
+
+# 缓存中表示"用户不存在"的占位值(None表示未缓存)
+_MISSING: Dict[str, Any] = {}
+
+# user_id -> {"name", "avatar"}
+_author_cache = TTLCache(
+    maxsize=settings.COMMENT_AUTHOR_CACHE_SIZE,
+    ttl=settings.COMMENT_AUTHOR_CACHE_TTL
+)
+
+
+def _author_entry(user: Dict[str, Any]) -> Dict[str, Any]:
+    profile = user.get("profile") or {}
+    return {"name": profile.get("nickname"), "avatar": profile.get("avatar")}
+
+
+def cache_author(user: Dict[str, Any]) -> UserBrief:
+    """
+    用已加载的用户文档填充作者缓存(发表评论时使用当前用户，无需再查询)
+
+    Args:
+        user: 用户文档
+
+    Returns:
+        作者简要信息
+    """
+    entry = _author_entry(user)
+    _author_cache.set(str(user["_id"]), entry)
+    return UserBrief(id=str(user["_id"]), **entry)
+
+
+def invalidate_author(user_id: Any) -> None:
+    """失效作者缓存(用户资料更新或删除时调用)"""
+    _author_cache.delete(str(user_id))
+
+
+async def get_authors(user_ids: Iterable[str]) -> Dict[str, UserBrief]:
+    """
+    批量获取评论作者信息
+
+    Args:
+        user_ids: 用户ID(可重复)
+
+    Returns:
+        {用户ID: 作者简要信息}，不存在的用户不包含在结果中
+    """
+    authors: Dict[str, Dict[str, Any]] = {}
+    missing = []
+    for user_id in dict.fromkeys(str(user_id) for user_id in user_ids):
+        entry = _author_cache.get(user_id)
+        if entry is None:
+            missing.append(user_id)
+        elif entry:
+            authors[user_id] = entry
+
+    object_ids = [ObjectId(user_id) for user_id in missing if ObjectId.is_valid(user_id)]
+    if object_ids:
+        users_collection = get_collection(USERS_COLLECTION)
+        cursor = users_collection.find({"_id": {"$in": object_ids}}, AUTHOR_PROJECTION)
+        async for user in cursor:
+            authors[str(user["_id"])] = _author_entry(user)
+
+    for user_id in missing:
+        _author_cache.set(user_id, authors.get(user_id, _MISSING))
+
+    return {
+        user_id: UserBrief(id=user_id, **entry)
+        for user_id, entry in authors.items()
+        if entry.get("name") is not None
+    }
+
+
+async def get_author(user_id: str) -> Optional[UserBrief]:
+    """获取单个评论作者信息，用户不存在时返回None"""
+    authors = await get_authors([user_id])
+    return authors.get(str(user_id))
+
+
+def author_cache_stats() -> Dict[str, int]:
+    """作者缓存命中统计"""
+    return _author_cache.stats()
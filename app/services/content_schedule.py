@@ -0,0 +1,163 @@
+"""
+首页内容上下线调度
+首页内容(轮播图、卡片)可以设置 start_time/end_time 有效期。
+调度器把全部首页内容加载到内存，计算当前生效的内容和下一次上下线的时间点:
+- 读取时若已到达下一个时间点，在内存中重新计算生效内容(精确到时间点，不访问数据库)
+- 管理员新增、修改、删除内容后重新从数据库加载
+- 其他进程的修改依靠定期重新加载(CONTENT_SCHEDULE_RELOAD_INTERVAL)收敛
+
+生效规则与原查询一致: 未设置开始时间或结束时间的内容始终生效，
+两者都设置时在 start_time <= 当前时间 <= end_time 期间生效
+(以字符串保存的时间按ISO格式解析，无法解析的时间视为未设置值)
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+from app.db.mongodb import get_collection
+
+logger = logging.getLogger(__name__)
+
+# 结束时间之后的第一个时间点(end_time 当刻仍然生效)
+_AFTER = timedelta(microseconds=1)
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """把时间值转换为不带时区的UTC时间，无法识别时返回None"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            logger.warning(f"无法解析首页内容时间: {value}")
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def is_visible(content: Dict[str, Any], now: datetime) -> bool:
+    """判断内容在指定时间是否生效"""
+    start_time = _as_datetime(content.get("start_time"))
+    end_time = _as_datetime(content.get("end_time"))
+    if "start_time" not in content or "end_time" not in content:
+        return True
+    if start_time is None or end_time is None:
+        return False
+    return start_time <= now <= end_time
+
+
+def next_transition(content: Dict[str, Any], now: datetime) -> Optional[datetime]:
+    """计算内容在当前时间之后的下一次上线或下线时间，没有时返回None"""
+    start_time = _as_datetime(content.get("start_time"))
+    end_time = _as_datetime(content.get("end_time"))
+    if start_time is None or end_time is None:
+        return None
+    if now < start_time:
+        return start_time
+    if now <= end_time:
+        return end_time + _AFTER
+    return None
+
+
+class ContentScheduler:
+    """首页内容调度器"""
+
+    def __init__(self, collection_name: str):
+        self._collection_name = collection_name
+        # 按 sort_order 排序的全部内容
+        self._contents: Optional[List[Dict[str, Any]]] = None
+        self._active: List[Dict[str, Any]] = []
+        self._next_transition: Optional[datetime] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        # 统计
+        self.reloads = 0
+        self.recomputes = 0
+
+    def _needs_reload(self) -> bool:
+        return (
+            self._contents is None
+            or time.monotonic() - self._loaded_at >= settings.CONTENT_SCHEDULE_RELOAD_INTERVAL
+        )
+
+    async def _reload(self) -> None:
+        collection = get_collection(self._collection_name)
+        contents = await collection.find({}).sort("sort_order", 1).to_list(length=None)
+        self._contents = contents
+        self._loaded_at = time.monotonic()
+        self.reloads += 1
+        self._recompute(datetime.utcnow())
+        logger.debug(f"首页内容调度已重新加载，共 {len(contents)} 条内容")
+
+    def _recompute(self, now: datetime) -> None:
+        """根据当前时间重新计算生效内容和下一个时间点"""
+        active = []
+        upcoming = None
+        for content in self._contents or []:
+            if is_visible(content, now):
+                active.append(content)
+            transition = next_transition(content, now)
+            if transition is not None and (upcoming is None or transition < upcoming):
+                upcoming = transition
+        self._active = active
+        self._next_transition = upcoming
+        self.recomputes += 1
+
+    async def active_contents(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """
+        获取当前生效的全部内容(按 sort_order 排序)
+
+        Args:
+            now: 当前时间(UTC)，默认取系统时间
+
+        Returns:
+            生效内容列表
+        """
+        if self._needs_reload():
+            async with self._lock:
+                if self._needs_reload():
+                    await self._reload()
+
+        now = now or datetime.utcnow()
+        if self._next_transition is not None and now >= self._next_transition:
+            self._recompute(now)
+        return self._active
+
+    async def list(
+        self,
+        content_type: Optional[str] = None,
+        status: Optional[str] = None,
+        skip: int = 0,
+        limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """
+        按类型和状态筛选当前生效的内容
+
+        Returns:
+            内容列表(每项为副本，调用方可以修改)
+        """
+        contents = [
+            content for content in await self.active_contents()
+            if (not content_type or content.get("type") == content_type)
+            and (not status or content.get("status") == status)
+        ]
+        return [dict(content) for content in contents[skip:skip + limit]]
+
+    def invalidate(self) -> None:
+        """标记需要重新加载(首页内容变更后调用)"""
+        self._contents = None
+
+    def stats(self) -> Dict[str, Any]:
+        """调度器统计"""
+        return {
+            "contents": len(self._contents or []),
+            "active": len(self._active),
+            "next_transition": self._next_transition.isoformat() if self._next_transition else None,
+            "reloads": self.reloads,
+            "recomputes": self.recomputes,
+        }
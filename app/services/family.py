@@ -14,6 +14,27 @@ from app.models.family import (
     FamilyInvitationCreate,
     FamilyMemberRole
 )
+from app.services.family_membership import (
+    add_membership,
+    update_membership_role,
+    remove_membership,
+    remove_family_memberships,
+    get_member_role,
+    is_member,
+    count_members,
+    families_of
+)
+
+
+# 可以管理家庭(更新信息、添加成员、创建邀请)的成员角色
+FAMILY_MANAGER_ROLES = [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN]
+
+
+def _can_manage_member(current_role: Optional[str], member_role: Optional[str]) -> bool:
+    """管理员可以管理普通成员，所有者还可以管理管理员"""
+    return (current_role in FAMILY_MANAGER_ROLES and 
+            (member_role == FamilyMemberRole.MEMBER or 
+             (member_role == FamilyMemberRole.ADMIN and current_role == FamilyMemberRole.OWNER)))
 
 
 async def create_family(family_data: FamilyCreate, current_user: dict) -> dict:
@@ -53,6 +74,7 @@ async def create_family(family_data: FamilyCreate, current_user: dict) -> dict:
     
     # 插入家庭文档
     result = await db.families.insert_one(family_doc)
+    await add_membership(result.inserted_id, current_user["_id"], FamilyMemberRole.OWNER, creator.joinedAt)
     
     # 获取创建的家庭
     created_family = await db.families.find_one({"_id": result.inserted_id})
@@ -83,22 +105,16 @@ async def get_family_by_id(family_id: str, current_user: dict) -> Optional[dict]
         # ID格式无效
         return None
     
+    # 检查访问权限(仅家庭成员可以访问)，通过成员关系索引判断，非成员不读取家庭文档
+    if not await is_member(current_user["_id"], family_id) and "admin" not in current_user.get("roles", []):
+        return None
+    
     # 查询家庭
     family = await db.families.find_one({"_id": family_object_id})
     
     if not family:
         return None
     
-    # 检查访问权限(仅家庭成员可以访问)
-    is_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_member = True
-            break
-    
-    if not is_member and "admin" not in current_user.get("roles", []):
-        return None
-    
     # 转换_id为字符串
     family["id"] = str(family.pop("_id"))
     
@@ -126,22 +142,9 @@ async def update_family(family_id: str, family_data: FamilyUpdate, current_user:
         # ID格式无效
         return None
     
-    # 查询家庭
-    family = await db.families.find_one({"_id": family_object_id})
-    
-    if not family:
-        return None
-    
-    # 检查更新权限(只有创建者和管理员可以更新)
-    has_permission = False
-    if str(family["creator"]) == str(current_user["_id"]):
-        has_permission = True
-    else:
-        for member in family.get("members", []):
-            if (str(member.get("userId")) == str(current_user["_id"]) and 
-                member.get("role") in [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN]):
-                has_permission = True
-                break
+    # 检查更新权限(只有创建者和管理员可以更新，创建者即所有者)
+    current_role = await get_member_role(current_user["_id"], family_id)
+    has_permission = current_role in FAMILY_MANAGER_ROLES
     
     if not has_permission and "admin" not in current_user.get("roles", []):
         return None
@@ -166,11 +169,14 @@ async def update_family(family_id: str, family_data: FamilyUpdate, current_user:
     update_doc["updatedAt"] = datetime.now()
     
     # 执行更新
-    await db.families.update_one(
+    result = await db.families.update_one(
         {"_id": family_object_id},
         {"$set": update_doc}
     )
     
+    if result.matched_count == 0:
+        return None
+    
     # 获取更新后的家庭
     updated_family = await db.families.find_one({"_id": family_object_id})
     
@@ -201,33 +207,19 @@ async def add_family_member(family_id: str, member_data: FamilyMemberAdd, curren
         # ID格式无效
         return None
     
-    # 查询家庭
-    family = await db.families.find_one({"_id": family_object_id})
-    
-    if not family:
-        return None
-    
-    # 检查权限(只有创建者和管理员可以添加成员)
-    has_permission = False
-    if str(family["creator"]) == str(current_user["_id"]):
-        has_permission = True
-    else:
-        for member in family.get("members", []):
-            if (str(member.get("userId")) == str(current_user["_id"]) and 
-                member.get("role") in [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN]):
-                has_permission = True
-                break
+    # 检查权限(只有创建者和管理员可以添加成员，创建者即所有者)
+    current_role = await get_member_role(current_user["_id"], family_id)
+    has_permission = current_role in FAMILY_MANAGER_ROLES
     
     if not has_permission and "admin" not in current_user.get("roles", []):
         return None
     
     # 检查用户是否已是家庭成员
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(member_data.userId):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="用户已是家庭成员"
-            )
+    if await is_member(member_data.userId, family_id):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="用户已是家庭成员"
+        )
     
     # 创建新成员
     new_member = FamilyMember(
@@ -239,7 +231,7 @@ async def add_family_member(family_id: str, member_data: FamilyMemberAdd, curren
     )
     
     # 添加成员到家庭
-    await db.families.update_one(
+    result = await db.families.update_one(
         {"_id": family_object_id},
         {
             "$push": {"members": new_member.dict()},
@@ -247,6 +239,11 @@ async def add_family_member(family_id: str, member_data: FamilyMemberAdd, curren
         }
     )
     
+    if result.matched_count == 0:
+        return None
+    
+    await add_membership(family_id, new_member.userId, new_member.role, new_member.joinedAt)
+    
     # 获取更新后的家庭
     updated_family = await db.families.find_one({"_id": family_object_id})
     
@@ -283,17 +280,15 @@ async def update_family_member(
         # ID格式无效
         return None
     
-    # 查询家庭
-    family = await db.families.find_one({"_id": family_object_id})
-    
-    if not family:
-        return None
+    # 获取当前用户和目标成员的角色
+    current_role = await get_member_role(current_user["_id"], family_id)
+    member_role = await get_member_role(member_id, family_id)
     
     # 检查权限
     has_permission = False
     is_self_update = str(member_id) == str(current_user["_id"])
     
-    if str(family["creator"]) == str(current_user["_id"]):
+    if current_role == FamilyMemberRole.OWNER:
         # 创建者可以更新任何成员
         has_permission = True
     elif is_self_update:
@@ -304,54 +299,40 @@ async def update_family_member(
         has_permission = True
     else:
         # 管理员可以更新普通成员
-        current_role = None
-        member_role = None
-        
-        # 获取当前用户和目标成员的角色
-        for member in family.get("members", []):
-            if str(member.get("userId")) == str(current_user["_id"]):
-                current_role = member.get("role")
-            elif str(member.get("userId")) == str(member_id):
-                member_role = member.get("role")
-        
-        if (current_role in [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN] and 
-            (member_role == FamilyMemberRole.MEMBER or 
-             (member_role == FamilyMemberRole.ADMIN and current_role == FamilyMemberRole.OWNER))):
-            has_permission = True
+        has_permission = _can_manage_member(current_role, member_role)
     
     if not has_permission and "admin" not in current_user.get("roles", []):
         return None
     
-    # 查找成员在列表中的索引
-    member_index = None
-    for i, member in enumerate(family.get("members", [])):
-        if str(member.get("userId")) == str(member_id):
-            member_index = i
-            break
-    
-    if member_index is None:
+    if member_role is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="成员不存在"
         )
     
-    # 构建更新操作
+    # 构建更新操作(通过位置操作符定位成员，无需读取members数组)
     update_operations = {}
     update_fields = member_data.dict(exclude_unset=True)
     
     for field, value in update_fields.items():
         if value is not None:
-            update_operations[f"members.{member_index}.{field}"] = value
+            update_operations[f"members.$.{field}"] = value
     
     # 添加更新时间
     update_operations["updatedAt"] = datetime.now()
     
     # 执行更新
-    await db.families.update_one(
-        {"_id": family_object_id},
+    result = await db.families.update_one(
+        {"_id": family_object_id, "members.userId": str(member_id)},
         {"$set": update_operations}
     )
     
+    if result.matched_count == 0:
+        return None
+    
+    if member_data.role is not None and member_data.role != member_role:
+        await update_membership_role(family_id, member_id, member_data.role)
+    
     # 获取更新后的家庭
     updated_family = await db.families.find_one({"_id": family_object_id})
     
@@ -382,17 +363,14 @@ async def remove_family_member(family_id: str, member_id: str, current_user: dic
         # ID格式无效
         return None
     
-    # 查询家庭
-    family = await db.families.find_one({"_id": family_object_id})
-    
-    if not family:
-        return None
+    # 获取当前用户的角色
+    current_role = await get_member_role(current_user["_id"], family_id)
     
     # 检查权限
     has_permission = False
     is_self_remove = str(member_id) == str(current_user["_id"])
     
-    if str(family["creator"]) == str(current_user["_id"]):
+    if current_role == FamilyMemberRole.OWNER:
         # 创建者可以移除任何成员(除了自己)
         if not is_self_remove:
             has_permission = True
@@ -401,28 +379,16 @@ async def remove_family_member(family_id: str, member_id: str, current_user: dic
         has_permission = True
     else:
         # 管理员可以移除普通成员
-        current_role = None
-        member_role = None
-        
-        # 获取当前用户和目标成员的角色
-        for member in family.get("members", []):
-            if str(member.get("userId")) == str(current_user["_id"]):
-                current_role = member.get("role")
-            elif str(member.get("userId")) == str(member_id):
-                member_role = member.get("role")
-        
-        if (current_role in [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN] and 
-            (member_role == FamilyMemberRole.MEMBER or 
-             (member_role == FamilyMemberRole.ADMIN and current_role == FamilyMemberRole.OWNER))):
-            has_permission = True
+        member_role = await get_member_role(member_id, family_id)
+        has_permission = _can_manage_member(current_role, member_role)
     
     if not has_permission and "admin" not in current_user.get("roles", []):
         return None
     
     # 检查是否是创建者试图退出
-    if is_self_remove and str(family["creator"]) == str(current_user["_id"]):
+    if is_self_remove and current_role == FamilyMemberRole.OWNER:
         # 如果家庭还有其他成员，需要转移所有权
-        if len(family.get("members", [])) > 1:
+        if await count_members(family_id) > 1:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="创建者在退出前需要转移家庭所有权"
@@ -430,10 +396,11 @@ async def remove_family_member(family_id: str, member_id: str, current_user: dic
         # 如果家庭只有创建者一人，则可以删除整个家庭
         else:
             await db.families.delete_one({"_id": family_object_id})
+            await remove_family_memberships(family_id)
             return {"message": "家庭已删除"}
     
     # 移除成员
-    await db.families.update_one(
+    result = await db.families.update_one(
         {"_id": family_object_id},
         {
             "$pull": {"members": {"userId": member_id}},
@@ -441,6 +408,11 @@ async def remove_family_member(family_id: str, member_id: str, current_user: dic
         }
     )
     
+    if result.matched_count == 0:
+        return None
+    
+    await remove_membership(family_id, member_id)
+    
     # 获取更新后的家庭
     updated_family = await db.families.find_one({"_id": family_object_id})
     
@@ -471,22 +443,9 @@ async def create_family_invitation(family_id: str, invitation_data: FamilyInvita
         # ID格式无效
         return None
     
-    # 查询家庭
-    family = await db.families.find_one({"_id": family_object_id})
-    
-    if not family:
-        return None
-    
-    # 检查权限(只有创建者和管理员可以创建邀请)
-    has_permission = False
-    if str(family["creator"]) == str(current_user["_id"]):
-        has_permission = True
-    else:
-        for member in family.get("members", []):
-            if (str(member.get("userId")) == str(current_user["_id"]) and 
-                member.get("role") in [FamilyMemberRole.OWNER, FamilyMemberRole.ADMIN]):
-                has_permission = True
-                break
+    # 检查权限(只有创建者和管理员可以创建邀请，创建者即所有者)
+    current_role = await get_member_role(current_user["_id"], family_id)
+    has_permission = current_role in FAMILY_MANAGER_ROLES
     
     if not has_permission and "admin" not in current_user.get("roles", []):
         return None
@@ -498,7 +457,7 @@ async def create_family_invitation(family_id: str, invitation_data: FamilyInvita
     )
     
     # 添加邀请到家庭
-    await db.families.update_one(
+    result = await db.families.update_one(
         {"_id": family_object_id},
         {
             "$push": {"invitations": invitation.dict()},
@@ -506,6 +465,9 @@ async def create_family_invitation(family_id: str, invitation_data: FamilyInvita
         }
     )
     
+    if result.matched_count == 0:
+        return None
+    
     # 构建邀请链接
     invitation_url = f"/families/join?code={invitation.code}"
     
@@ -530,7 +492,7 @@ async def join_family_with_invitation(invitation_code: str, current_user: dict)
     db = await get_database()
     
     # 查询包含此邀请码的家庭
-    family = await db.families.find_one({"invitations.code": invitation_code})
+    family = await db.families.find_one({"invitations.code": invitation_code}, {"invitations": 1})
     
     if not family:
         raise HTTPException(
@@ -568,12 +530,11 @@ async def join_family_with_invitation(invitation_code: str, current_user: dict)
         )
     
     # 检查用户是否已是家庭成员
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="您已是该家庭成员"
-            )
+    if await is_member(current_user["_id"], family["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="您已是该家庭成员"
+        )
     
     # 创建新成员
     new_member = FamilyMember(
@@ -604,6 +565,7 @@ async def join_family_with_invitation(invitation_code: str, current_user: dict)
             "$set": {"updatedAt": datetime.now()}
         }
     )
+    await add_membership(family["_id"], new_member.userId, new_member.role, new_member.joinedAt)
     
     # 获取更新后的家庭
     updated_family = await db.families.find_one({"_id": family["_id"]})
@@ -626,8 +588,12 @@ async def get_user_families(current_user: dict) -> List[dict]:
     """
     db = await get_database()
     
-    # 查询用户所属的家庭
-    cursor = db.families.find({"members.userId": str(current_user["_id"])})
+    # 通过成员关系索引获取家庭ID，再按主键批量查询
+    family_ids = [ObjectId(family_id) for family_id in await families_of(current_user["_id"]) if ObjectId.is_valid(family_id)]
+    if not family_ids:
+        return []
+    
+    cursor = db.families.find({"_id": {"$in": family_ids}})
     
     # 获取结果
     families = await cursor.to_list(length=100)
@@ -0,0 +1,301 @@
+"""
+家庭成员关系索引
+在 family_memberships 集合中按 (familyId, userId) 冗余保存家庭成员关系，
+权限检查只需一次索引查询，不再读取整个家庭文档并遍历 members 数组
+
+成员关系由 create_family / add_family_member / update_family_member /
+remove_family_member / join_family_with_invitation 维护，并在进程内短期缓存
+
+已有数据需要回填一次(应用启动时发现尚未完成回填会自动执行)，也可以单独执行:
+    python -m app.services.family_membership
+回填全部完成后才在 migrations 集合中写入完成标记；标记写入之前，
+查不到成员关系时回退到 families.members.userId 查询
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+from fastapi import HTTPException, status
+
+from app.core.config import settings
+from app.db.mongodb import (
+    get_collection,
+    connect_to_mongo,
+    close_mongo_connection,
+    FAMILIES_COLLECTION,
+    FAMILY_MEMBERSHIPS_COLLECTION,
+    MIGRATIONS_COLLECTION,
+)
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 缓存中表示"不是成员"的占位值(None表示未缓存)
+_NOT_MEMBER: Dict[str, Any] = {}
+
+# (familyId, userId) -> 成员关系
+_membership_cache = TTLCache(
+    maxsize=settings.FAMILY_MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.FAMILY_MEMBERSHIP_CACHE_TTL
+)
+# userId -> 家庭ID列表
+_families_cache = TTLCache(
+    maxsize=settings.FAMILY_MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.FAMILY_MEMBERSHIP_CACHE_TTL
+)
+
+
+# migrations 集合中的回填完成标记
+BACKFILL_MARKER_ID = "family_memberships_backfill"
+
+# 成员关系是否已从families集合回填(回填之前查不到记录时回退到members数组)
+_backfilled = False
+
+
+def _invalidate(family_id: str, user_id: str) -> None:
+    _membership_cache.delete((family_id, user_id))
+    _families_cache.delete(user_id)
+
+
+async def add_membership(family_id: Any, user_id: Any, role: Any, joined_at: Optional[datetime] = None) -> None:
+    """
+    写入(或更新)成员关系
+
+    Args:
+        family_id: 家庭ID
+        user_id: 用户ID
+        role: 成员角色
+        joined_at: 加入时间
+    """
+    family_id, user_id = str(family_id), str(user_id)
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    await collection.update_one(
+        {"familyId": family_id, "userId": user_id},
+        {
+            "$set": {"role": getattr(role, "value", role)},
+            "$setOnInsert": {"joinedAt": joined_at or datetime.now()}
+        },
+        upsert=True
+    )
+    _invalidate(family_id, user_id)
+
+
+async def update_membership_role(family_id: Any, user_id: Any, role: Any) -> None:
+    """更新成员角色"""
+    family_id, user_id = str(family_id), str(user_id)
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    await collection.update_one(
+        {"familyId": family_id, "userId": user_id},
+        {"$set": {"role": getattr(role, "value", role)}}
+    )
+    _invalidate(family_id, user_id)
+
+
+async def remove_membership(family_id: Any, user_id: Any) -> None:
+    """删除成员关系"""
+    family_id, user_id = str(family_id), str(user_id)
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    await collection.delete_one({"familyId": family_id, "userId": user_id})
+    _invalidate(family_id, user_id)
+
+
+async def remove_family_memberships(family_id: Any) -> None:
+    """删除家庭的全部成员关系(家庭被删除时调用)"""
+    family_id = str(family_id)
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    members = await collection.find({"familyId": family_id}, {"userId": 1, "_id": 0}).to_list(length=None)
+    await collection.delete_many({"familyId": family_id})
+    for member in members:
+        _invalidate(family_id, member["userId"])
+
+
+async def get_membership(user_id: Any, family_id: Any) -> Optional[Dict[str, Any]]:
+    """
+    获取用户在家庭中的成员关系(带缓存)
+
+    Args:
+        user_id: 用户ID
+        family_id: 家庭ID
+
+    Returns:
+        {"familyId", "userId", "role", "joinedAt"}，不是成员时返回None
+    """
+    family_id, user_id = str(family_id), str(user_id)
+    cached = _membership_cache.get((family_id, user_id))
+    if cached is not None:
+        return cached or None
+
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    membership = await collection.find_one(
+        {"familyId": family_id, "userId": user_id},
+        {"_id": 0}
+    )
+    if membership is None and not _backfilled:
+        membership = await _legacy_membership(user_id, family_id)
+    _membership_cache.set((family_id, user_id), membership or _NOT_MEMBER)
+    return membership
+
+
+async def _legacy_membership(user_id: str, family_id: str) -> Optional[Dict[str, Any]]:
+    """从families集合的members数组读取成员关系(成员关系回填之前使用)"""
+    if not ObjectId.is_valid(family_id):
+        return None
+    families_collection = get_collection(FAMILIES_COLLECTION)
+    family = await families_collection.find_one(
+        {"_id": ObjectId(family_id), "members.userId": user_id},
+        {"members.$": 1}
+    )
+    if not family:
+        return None
+    member = family["members"][0]
+    return {
+        "familyId": family_id,
+        "userId": user_id,
+        "role": member.get("role"),
+        "joinedAt": member.get("joinedAt"),
+    }
+
+
+async def is_member(user_id: Any, family_id: Any) -> bool:
+    """判断用户是否是家庭成员"""
+    return await get_membership(user_id, family_id) is not None
+
+
+async def get_member_role(user_id: Any, family_id: Any) -> Optional[str]:
+    """获取用户在家庭中的角色，不是成员时返回None"""
+    membership = await get_membership(user_id, family_id)
+    return membership.get("role") if membership else None
+
+
+async def count_members(family_id: Any) -> int:
+    """统计家庭成员数量"""
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    return await collection.count_documents({"familyId": str(family_id)})
+
+
+async def families_of(user_id: Any) -> List[str]:
+    """
+    获取用户所属的全部家庭ID(带缓存)
+
+    Args:
+        user_id: 用户ID
+
+    Returns:
+        家庭ID列表
+    """
+    user_id = str(user_id)
+    cached = _families_cache.get(user_id)
+    if cached is not None:
+        return list(cached)
+
+    collection = get_collection(FAMILY_MEMBERSHIPS_COLLECTION)
+    memberships = await collection.find({"userId": user_id}, {"familyId": 1, "_id": 0}).to_list(length=None)
+    family_ids = [membership["familyId"] for membership in memberships]
+    if not family_ids and not _backfilled:
+        families_collection = get_collection(FAMILIES_COLLECTION)
+        families = await families_collection.find({"members.userId": user_id}, {"_id": 1}).to_list(length=None)
+        family_ids = [str(family["_id"]) for family in families]
+    _families_cache.set(user_id, tuple(family_ids))
+    return family_ids
+
+
+async def family_exists(family_id: Any) -> bool:
+    """判断家庭是否存在(只做计数，不读取文档)"""
+    if not ObjectId.is_valid(str(family_id)):
+        return False
+    families_collection = get_collection(FAMILIES_COLLECTION)
+    return await families_collection.count_documents({"_id": ObjectId(str(family_id))}, limit=1) > 0
+
+
+async def require_family_member(family_id: Any, current_user: dict, allow_admin: bool = False) -> None:
+    """
+    校验当前用户是家庭成员
+
+    Args:
+        family_id: 家庭ID
+        current_user: 当前用户信息
+        allow_admin: 系统管理员是否可以跳过成员检查
+
+    Raises:
+        HTTPException: 家庭不存在(404)或用户不是家庭成员(403)
+    """
+    if await is_member(current_user["_id"], family_id):
+        return
+
+    if not await family_exists(family_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="家庭不存在"
+        )
+
+    if allow_admin and "admin" in current_user.get("roles", []):
+        return
+
+    raise HTTPException(
+        status_code=status.HTTP_403_FORBIDDEN,
+        detail="用户不是该家庭成员"
+    )
+
+
+async def rebuild_memberships(batch_size: int = 500) -> int:
+    """
+    根据families集合的members数组重建成员关系索引(用于首次上线或数据修复)
+
+    Returns:
+        写入的成员关系数量
+    """
+    families_collection = get_collection(FAMILIES_COLLECTION)
+    count = 0
+    cursor = families_collection.find({}, {"members": 1}).batch_size(batch_size)
+    async for family in cursor:
+        for member in family.get("members", []):
+            if not member.get("userId"):
+                continue
+            await add_membership(family["_id"], member["userId"], member.get("role"), member.get("joinedAt"))
+            count += 1
+
+    # 全部家庭处理完成后才写入完成标记(中途失败时下次启动会重新回填)
+    migrations_collection = get_collection(MIGRATIONS_COLLECTION)
+    await migrations_collection.update_one(
+        {"_id": BACKFILL_MARKER_ID},
+        {"$set": {"completedAt": datetime.now(), "count": count}},
+        upsert=True
+    )
+
+    global _backfilled
+    _backfilled = True
+    logger.info(f"家庭成员关系索引重建完成，共 {count} 条")
+    return count
+
+
+async def ensure_memberships() -> None:
+    """
+    尚未写入回填完成标记时从families集合回填成员关系(可重复执行，应用启动时调用)
+
+    多个进程同时启动时可能各自回填一次，写入是幂等的；
+    每个进程在自己确认标记存在(或自己回填完成)之前都保持回退查询
+    """
+    global _backfilled
+    migrations_collection = get_collection(MIGRATIONS_COLLECTION)
+    if await migrations_collection.count_documents({"_id": BACKFILL_MARKER_ID}, limit=1) > 0:
+        _backfilled = True
+        return
+
+    logger.info("家庭成员关系尚未完成回填，开始从families集合回填")
+    await rebuild_memberships()
+
+
+async def main():
+    """命令行入口: 从families集合重建全部成员关系"""
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo()
+    try:
+        await rebuild_memberships()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,96 @@
+"""
+菜谱收藏状态解析服务
+批量解析用户对一组菜谱的收藏状态，避免列表页按条目逐个查询favorites集合
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.db.mongodb import get_collection
+
+logger = logging.getLogger(__name__)
+
+# 收藏集合名称
+FAVORITES_COLLECTION = "favorites"
+
+
+async def get_favorite_recipe_ids(user_id: str, recipe_ids: Iterable[str]) -> Set[str]:
+    """
+    批量获取用户已收藏的菜谱ID集合
+
+    对整页菜谱只发起一次 $in 查询，并且只投影recipeId字段
+
+    Args:
+        user_id: 用户ID
+        recipe_ids: 待检查的菜谱ID列表
+
+    Returns:
+        已收藏的菜谱ID集合
+    """
+    candidate_ids = list({str(recipe_id) for recipe_id in recipe_ids if recipe_id})
+    if not user_id or not candidate_ids:
+        return set()
+
+    favorites_collection = get_collection(FAVORITES_COLLECTION)
+    try:
+        cursor = favorites_collection.find(
+            {"userId": str(user_id), "recipeId": {"$in": candidate_ids}},
+            {"recipeId": 1, "_id": 0}
+        )
+        favorites = await cursor.to_list(length=len(candidate_ids))
+    except Exception as e:
+        logger.error(f"批量查询收藏状态失败: {str(e)}")
+        return set()
+
+    return {favorite["recipeId"] for favorite in favorites if favorite.get("recipeId")}
+
+
+def apply_favorite_flags(
+    recipes: List[Dict[str, Any]],
+    favorite_ids: Set[str],
+    id_field: str = "id"
+) -> List[Dict[str, Any]]:
+    """
+    根据已收藏ID集合为菜谱列表设置is_favorite标记
+
+    Args:
+        recipes: 菜谱列表(已将_id转换为字符串ID)
+        favorite_ids: 已收藏的菜谱ID集合
+        id_field: 菜谱ID字段名
+
+    Returns:
+        设置了is_favorite的菜谱列表
+    """
+    for recipe in recipes:
+        recipe["is_favorite"] = str(recipe.get(id_field)) in favorite_ids
+    return recipes
+
+
+async def annotate_favorites(
+    recipes: List[Dict[str, Any]],
+    current_user: Optional[dict] = None,
+    id_field: str = "id"
+) -> List[Dict[str, Any]]:
+    """
+    为菜谱列表批量标注当前用户的收藏状态
+
+    未登录用户直接全部标记为未收藏，不访问数据库
+
+    Args:
+        recipes: 菜谱列表(已将_id转换为字符串ID)
+        current_user: 当前用户信息(可选)
+        id_field: 菜谱ID字段名
+
+    Returns:
+        设置了is_favorite的菜谱列表
+    """
+    if not recipes:
+        return recipes
+
+    favorite_ids: Set[str] = set()
+    if current_user:
+        favorite_ids = await get_favorite_recipe_ids(
+            str(current_user["_id"]),
+            (recipe.get(id_field) for recipe in recipes)
+        )
+
+    return apply_favorite_flags(recipes, favorite_ids, id_field)
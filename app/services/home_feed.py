@@ -0,0 +1,111 @@
+"""
+首页数据物化
+首页数据只在管理员编辑首页内容时变化，整体构建一次后保存为编码好的响应字节和ETag:
+- 请求直接返回缓存的字节，客户端带 If-None-Match 且ETag一致时返回304
+- 管理员新增、修改、删除首页内容后重新构建
+- 其他进程的修改依靠过期时间(HOME_FEED_TTL)收敛
+"""
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Optional
+
+from app.core.config import settings
+from app.core.response import ApiJSONResponse
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class FeedSnapshot:
+    """一次构建的首页数据"""
+    body: bytes
+    etag: str
+    version: int
+    built_at: float
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """判断请求头 If-None-Match 是否与当前ETag一致"""
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*":
+                return True
+            if tag.startswith("W/"):
+                tag = tag[2:]
+            if tag == self.etag:
+                return True
+        return False
+
+
+class HomeFeed:
+    """
+    首页数据物化缓存
+
+    builder 返回首页数据(dict)，编码为标准响应格式 {code, data, msg} 的JSON字节
+    """
+
+    def __init__(self, builder: Callable[[], Awaitable[Any]]):
+        self._builder = builder
+        self._snapshot: Optional[FeedSnapshot] = None
+        self._version = 0
+        self._lock = asyncio.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def _is_fresh(self, snapshot: Optional[FeedSnapshot]) -> bool:
+        return (
+            snapshot is not None
+            and snapshot.version == self._version
+            and time.monotonic() - snapshot.built_at < settings.HOME_FEED_TTL
+        )
+
+    async def get(self) -> FeedSnapshot:
+        """获取首页数据，缓存失效时重新构建(并发请求只构建一次)"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            self.hits += 1
+            return snapshot
+
+        async with self._lock:
+            snapshot = self._snapshot
+            if self._is_fresh(snapshot):
+                self.hits += 1
+                return snapshot
+
+            version = self._version
+            data = await self._builder()
+            body = ApiJSONResponse(content=data).body
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            snapshot = FeedSnapshot(body=body, etag=etag, version=version, built_at=time.monotonic())
+            self._snapshot = snapshot
+            self.builds += 1
+            logger.debug(f"首页数据已重新构建，ETag: {etag}")
+            return snapshot
+
+    async def refresh(self) -> None:
+        """
+        使当前数据失效并重新构建(首页内容变更后调用)
+
+        构建过程中(如初始化默认数据)触发的变更只标记失效，由下一次读取重新构建
+        """
+        self._version += 1
+        if self._lock.locked():
+            return
+        try:
+            await self.get()
+        except Exception as e:
+            # 构建失败时保持失效状态，由下一次读取重试
+            logger.warning(f"重新构建首页数据失败: {str(e)}")
+
+    def stats(self) -> dict:
+        """首页数据缓存统计"""
+        return {
+            "builds": self.builds,
+            "hits": self.hits,
+            "version": self._version,
+            "etag": self._snapshot.etag if self._snapshot else None,
+        }
@@ -8,6 +8,8 @@ from bson import ObjectId
 
 from app.core.exceptions import NotFoundError, DatabaseError
 from app.db.mongodb import get_collection
+from app.services.home_feed import HomeFeed
+from app.services.content_schedule import ContentScheduler
 from app.models.homepage import (
     ContentType, 
     ContentStatus, 
@@ -22,6 +24,9 @@ from app.models.homepage import (
 # 首页内容集合名称
 HOME_CONTENT_COLLECTION = "home_contents"
 
+# 首页内容上下线调度器
+content_scheduler = ContentScheduler(HOME_CONTENT_COLLECTION)
+
 
 async def get_content_by_id(content_id: str) -> Optional[Dict[str, Any]]:
     """
@@ -62,6 +67,7 @@ async def create_content(content_data: Dict[str, Any], creator_id: str) -> Dict[
         
         # 插入数据库
         result = await content_collection.insert_one(content_data)
+        await _content_changed()
         created_content = await get_content_by_id(result.inserted_id)
         return created_content
     except Exception as e:
@@ -89,6 +95,7 @@ async def update_content(content_id: str, update_data: Dict[str, Any], updater_i
             {"_id": content_id},
             {"$set": update_data}
         )
+        await _content_changed()
         
         # 返回更新后的内容
         updated_content = await get_content_by_id(content_id)
@@ -113,6 +120,7 @@ async def delete_content(content_id: str) -> bool:
         
         # 执行删除
         result = await content_collection.delete_one({"_id": content_id})
+        await _content_changed()
         return result.deleted_count > 0
     except NotFoundError:
         raise
@@ -130,34 +138,8 @@ async def list_contents(
     获取首页内容列表
     """
     try:
-        content_collection = get_collection(HOME_CONTENT_COLLECTION)
-        
-        # 构建查询条件
-        query = {}
-        if content_type:
-            query["type"] = content_type
-        if status:
-            query["status"] = status
-        
-        # 添加时间过滤
-        now = datetime.utcnow()
-        query.update({
-            "$or": [
-                # 没有设置开始时间或结束时间
-                {"start_time": {"$exists": False}},
-                {"end_time": {"$exists": False}},
-                # 在有效期内
-                {"$and": [
-                    {"start_time": {"$lte": now}},
-                    {"end_time": {"$gte": now}}
-                ]}
-            ]
-        })
-        
-        # 查询数据并排序
-        cursor = content_collection.find(query).sort("sort_order", 1).skip(skip).limit(limit)
-        contents = await cursor.to_list(length=limit)
-        return contents
+        # 从调度器的内存生效集合中读取，按有效期上下线精确到时间点
+        return await content_scheduler.list(content_type, status, skip, limit)
     except Exception as e:
         raise DatabaseError(detail=f"获取首页内容列表失败: {str(e)}")
 
@@ -219,4 +201,184 @@ async def create_card(card_data: CardCreate, card_type: ContentType, creator_id:
     """
     content_data = card_data.dict()
     content_data["type"] = card_type.value
-    return await create_content(content_data, creator_id) 
\ No newline at end of file
+    return await create_content(content_data, creator_id)
+
+
+async def build_home_payload() -> Dict[str, Any]:
+    """
+    构建首页数据(轮播图、精选推荐、热门内容)，数据库中没有数据时初始化默认数据
+    """
+    content_collection = get_collection(HOME_CONTENT_COLLECTION)
+    
+    async def load(content_type: ContentType, length: int) -> List[Dict[str, Any]]:
+        cursor = content_collection.find({"type": content_type.value}).sort("sort_order", 1)
+        return await cursor.to_list(length=length)
+    
+    # 查询轮播图、精选推荐和热门内容
+    swipers = await load(ContentType.SWIPER, 6)
+    featured = await load(ContentType.FEATURED, 5)
+    popular = await load(ContentType.POPULAR, 5)
+    
+    # 确保数据存在，如果数据库中没有数据，初始化默认数据
+    if not swipers:
+        await initialize_default_swipers()
+        swipers = await load(ContentType.SWIPER, 6)
+    
+    if not featured:
+        await initialize_default_featured()
+        featured = await load(ContentType.FEATURED, 5)
+    
+    if not popular:
+        await initialize_default_popular()
+        popular = await load(ContentType.POPULAR, 5)
+    
+    # 处理数据格式，MongoDB的_id需要转为id字段
+    for item in swipers + featured + popular:
+        if "_id" in item:
+            item["id"] = str(item.pop("_id"))
+    
+    return {
+        "welcome": "欢迎使用家宴菜谱系统",
+        "swipers": swipers,
+        "featured": featured,
+        "popular": popular
+    }
+
+
+# 首页数据物化缓存，首页内容增删改后重新构建
+home_feed = HomeFeed(build_home_payload)
+
+
+async def _content_changed() -> None:
+    """首页内容变更后重新构建首页数据并重新加载上下线调度"""
+    content_scheduler.invalidate()
+    await home_feed.refresh()
+
+
+async def initialize_default_swipers():
+    """初始化默认轮播图数据"""
+    admin_id = "system_admin"  # 系统管理员ID
+    
+    default_swipers = [
+        {
+            "title": "家常红烧肉",
+            "image_url": "/static/home/swiper0.png",
+            "description": "家常红烧肉，肥而不腻",
+            "tags": [
+                {"text": "家常菜", "theme": "primary"},
+                {"text": "肉类", "theme": "success"}
+            ],
+            "sort_order": 0
+        },
+        {
+            "title": "清蒸鲈鱼",
+            "image_url": "/static/home/swiper1.png",
+            "description": "清蒸鲈鱼，鲜香可口",
+            "tags": [
+                {"text": "海鲜", "theme": "primary"},
+                {"text": "低脂", "theme": "success"}
+            ],
+            "sort_order": 1
+        },
+        {
+            "title": "宫保鸡丁",
+            "image_url": "/static/home/swiper2.png",
+            "description": "宫保鸡丁，麻辣鲜香",
+            "tags": [
+                {"text": "川菜", "theme": "primary"},
+                {"text": "家常菜", "theme": "success"}
+            ],
+            "sort_order": 2
+        }
+    ]
+    
+    # 将默认数据插入数据库
+    for swiper_data in default_swipers:
+        swiper = SwiperCreate(**swiper_data)
+        await create_swiper(swiper, admin_id)
+
+
+async def initialize_default_featured():
+    """初始化默认精选菜谱数据"""
+    admin_id = "system_admin"  # 系统管理员ID
+    
+    default_featured = [
+        {
+            "title": "家常红烧肉",
+            "image_url": "/static/home/card0.png",
+            "target_id": "default_recipe_1",
+            "target_type": "recipe",
+            "description": "家常红烧肉，肥而不腻",
+            "tags": [
+                {"text": "家常菜", "theme": "primary"},
+                {"text": "肉类", "theme": "success"}
+            ],
+            "sort_order": 0
+        },
+        {
+            "title": "清蒸鲈鱼",
+            "image_url": "/static/home/card1.png",
+            "target_id": "default_recipe_2",
+            "target_type": "recipe",
+            "description": "清蒸鲈鱼，鲜香可口",
+            "tags": [
+                {"text": "海鲜", "theme": "primary"},
+                {"text": "低脂", "theme": "success"}
+            ],
+            "sort_order": 1
+        },
+        {
+            "title": "宫保鸡丁",
+            "image_url": "/static/home/card2.png",
+            "target_id": "default_recipe_3",
+            "target_type": "recipe",
+            "description": "宫保鸡丁，麻辣鲜香",
+            "tags": [
+                {"text": "川菜", "theme": "primary"},
+                {"text": "家常菜", "theme": "success"}
+            ],
+            "sort_order": 2
+        }
+    ]
+    
+    # 将默认数据插入数据库
+    for card_data in default_featured:
+        card = CardCreate(**card_data)
+        await create_card(card, ContentType.FEATURED, admin_id)
+
+
+async def initialize_default_popular():
+    """初始化默认热门菜谱数据"""
+    admin_id = "system_admin"  # 系统管理员ID
+    
+    default_popular = [
+        {
+            "title": "番茄炒蛋",
+            "image_url": "/static/home/card3.png",
+            "target_id": "default_recipe_4",
+            "target_type": "recipe",
+            "description": "番茄炒蛋，酸甜可口",
+            "tags": [
+                {"text": "快手菜", "theme": "primary"},
+                {"text": "家常菜", "theme": "success"}
+            ],
+            "sort_order": 0
+        },
+        {
+            "title": "水煮鱼片",
+            "image_url": "/static/home/card4.png",
+            "target_id": "default_recipe_5",
+            "target_type": "recipe",
+            "description": "水煮鱼片，麻辣鲜香",
+            "tags": [
+                {"text": "川菜", "theme": "primary"},
+                {"text": "鱼类", "theme": "success"}
+            ],
+            "sort_order": 1
+        }
+    ]
+    
+    # 将默认数据插入数据库
+    for card_data in default_popular:
+        card = CardCreate(**card_data)
+        await create_card(card, ContentType.POPULAR, admin_id) 
\ No newline at end of file
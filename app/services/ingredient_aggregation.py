@@ -0,0 +1,231 @@
+"""
+食材汇总引擎
+生成购物清单时统一合并各菜品的食材:
+- 食材名称归一化(去空白、小写、同义词映射)，如"番茄"与"西红柿"合并
+- 单位换算到基准单位(质量: 克, 体积: 毫升)，如"500g猪肉"与"1斤猪肉"合并为1000g
+- 无法换算的单位(个、根、片等)按原单位分别合并
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# 质量单位 -> 克
+MASS_UNITS: Dict[str, float] = {
+    "g": 1, "克": 1, "gram": 1, "grams": 1,
+    "kg": 1000, "千克": 1000, "公斤": 1000,
+    "斤": 500,
+    "两": 50,
+    "mg": 0.001, "毫克": 0.001,
+}
+
+# 体积单位 -> 毫升
+VOLUME_UNITS: Dict[str, float] = {
+    "ml": 1, "毫升": 1,
+    "l": 1000, "升": 1000,
+    "勺": 15, "汤匙": 15, "大勺": 15, "tbsp": 15,
+    "小勺": 5, "茶匙": 5, "tsp": 5,
+    "杯": 240, "cup": 240, "cups": 240,
+}
+
+# 维度 -> (基准单位, 进位单位, 进位倍数)
+DIMENSIONS: Dict[str, Tuple[str, str, float]] = {
+    "mass": ("g", "kg", 1000),
+    "volume": ("ml", "L", 1000),
+}
+
+# 标准名称 -> 同义词
+INGREDIENT_SYNONYMS: Dict[str, List[str]] = {
+    "西红柿": ["番茄", "tomato", "tomatoes"],
+    "土豆": ["马铃薯", "洋芋", "potato", "potatoes"],
+    "红薯": ["地瓜", "番薯", "sweet potato"],
+    "鸡蛋": ["egg", "eggs"],
+    "猪肉": ["pork"],
+    "牛肉": ["beef"],
+    "鸡肉": ["chicken"],
+    "香菜": ["芫荽", "coriander", "cilantro"],
+    "玉米": ["苞米", "包谷", "corn"],
+    "白糖": ["砂糖", "白砂糖", "sugar"],
+    "盐": ["食盐", "精盐", "salt"],
+    "生姜": ["姜", "ginger"],
+    "大蒜": ["蒜", "蒜头", "garlic"],
+    "洋葱": ["onion"],
+    "胡萝卜": ["红萝卜", "carrot", "carrots"],
+}
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def _build_synonym_index() -> Dict[str, str]:
+    index = {}
+    for canonical, synonyms in INGREDIENT_SYNONYMS.items():
+        index[normalize_key(canonical)] = canonical
+        for synonym in synonyms:
+            index[normalize_key(synonym)] = canonical
+    return index
+
+
+def normalize_key(text: Optional[str]) -> str:
+    """名称或单位归一化为比较键(去空白、小写)"""
+    return _WHITESPACE_RE.sub("", text or "").lower()
+
+
+def normalize_name(name: Optional[str]) -> Tuple[str, str]:
+    """
+    归一化食材名称
+
+    Returns:
+        (比较键, 展示名称)，同义词返回标准名称
+    """
+    key = normalize_key(name)
+    canonical = _SYNONYM_INDEX.get(key)
+    if canonical:
+        return normalize_key(canonical), canonical
+    return key, (name or "").strip()
+
+
+def normalize_unit(unit: Optional[str]) -> Tuple[str, float]:
+    """
+    将单位换算为所属维度的基准单位
+
+    Returns:
+        (维度或原单位键, 换算系数)；无法换算时维度为归一化后的原单位，系数为1
+    """
+    key = normalize_key(unit)
+    if key in MASS_UNITS:
+        return "mass", MASS_UNITS[key]
+    if key in VOLUME_UNITS:
+        return "volume", VOLUME_UNITS[key]
+    return key, 1
+
+
+@dataclass
+class AggregatedIngredient:
+    """汇总后的食材"""
+    name: str
+    dimension: str
+    unit: Optional[str]
+    amount: Optional[float] = None
+    category: Optional[str] = None
+    notes: List[str] = field(default_factory=list)
+    recipe_ids: List[str] = field(default_factory=list)
+    plan_ids: List[str] = field(default_factory=list)
+
+    def display(self) -> Tuple[Optional[float], Optional[str]]:
+        """返回展示用的(数量, 单位)，基准单位数量较大时进位(如g -> kg)"""
+        if self.dimension not in DIMENSIONS:
+            return self.amount, self.unit
+        base_unit, larger_unit, factor = DIMENSIONS[self.dimension]
+        if self.amount is not None and self.amount >= factor:
+            return self.amount / factor, larger_unit
+        return self.amount, base_unit
+
+
+class IngredientAggregator:
+    """
+    食材汇总器
+
+    按(归一化名称, 单位维度)单次遍历累加，add的复杂度为O(1)
+    """
+
+    def __init__(self):
+        self._items: Dict[Tuple[str, str], AggregatedIngredient] = {}
+
+    def add(
+        self,
+        name: Optional[str],
+        amount: Optional[float],
+        unit: Optional[str],
+        category: Optional[str] = None,
+        note: Optional[str] = None,
+        recipe_id: Optional[str] = None,
+        plan_id: Optional[str] = None
+    ) -> None:
+        """加入一条食材"""
+        name_key, display_name = normalize_name(name)
+        if not name_key:
+            return
+
+        dimension, factor = normalize_unit(unit)
+        key = (name_key, dimension)
+        item = self._items.get(key)
+        if item is None:
+            item = AggregatedIngredient(
+                name=display_name,
+                dimension=dimension,
+                unit=(unit or "").strip() or None,
+                category=category
+            )
+            self._items[key] = item
+        elif item.category is None and category:
+            item.category = category
+
+        if amount is not None:
+            item.amount = (item.amount or 0) + amount * factor
+        if note and note not in item.notes:
+            item.notes.append(note)
+        if recipe_id and recipe_id not in item.recipe_ids:
+            item.recipe_ids.append(recipe_id)
+        if plan_id and plan_id not in item.plan_ids:
+            item.plan_ids.append(plan_id)
+
+    def add_recipe(
+        self,
+        recipe: Dict[str, Any],
+        servings: Optional[float],
+        recipe_id: Optional[str] = None,
+        plan_id: Optional[str] = None
+    ) -> None:
+        """
+        按份数比例加入菜谱的全部非可选食材
+
+        Args:
+            recipe: 菜谱(包含ingredients和servings)
+            servings: 菜品份数
+            recipe_id: 菜谱ID
+            plan_id: 菜单计划ID
+        """
+        recipe_servings = recipe.get("servings") or 1
+        ratio = (servings or recipe_servings) / recipe_servings
+
+        for ingredient in recipe.get("ingredients", []) or []:
+            if ingredient.get("optional", False):
+                continue
+            amount = ingredient.get("amount")
+            self.add(
+                ingredient.get("name"),
+                amount * ratio if amount is not None else None,
+                ingredient.get("unit"),
+                category=ingredient.get("category"),
+                note=ingredient.get("note"),
+                recipe_id=recipe_id,
+                plan_id=plan_id
+            )
+
+    def results(self) -> List[AggregatedIngredient]:
+        """按首次出现的顺序返回汇总结果"""
+        return list(self._items.values())
+
+
+def aggregate_dishes(
+    dishes: List[Tuple[str, str, float]],
+    recipes: Dict[str, Dict[str, Any]]
+) -> List[AggregatedIngredient]:
+    """
+    汇总所有菜品的食材
+
+    Args:
+        dishes: [(菜单计划ID, 菜谱ID, 份数)]
+        recipes: {菜谱ID: 菜谱}
+
+    Returns:
+        汇总后的食材列表
+    """
+    aggregator = IngredientAggregator()
+    for plan_id, recipe_id, servings in dishes:
+        recipe = recipes.get(recipe_id)
+        if recipe:
+            aggregator.add_recipe(recipe, servings, recipe_id=recipe_id, plan_id=plan_id)
+    return aggregator.results()
+
+
+_SYNONYM_INDEX = _build_synonym_index()
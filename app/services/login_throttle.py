@@ -0,0 +1,91 @@
+"""
+按账号限制密码登录尝试次数
+每次密码登录尝试(在计算bcrypt之前)计数，窗口期内超过 LOGIN_MAX_ATTEMPTS 次直接拒绝，
+避免利用密码哈希的计算成本放大拒绝服务攻击；登录成功后清零
+
+计数保存在Redis中(多个进程共享)，Redis不可用时退化为进程内计数
+"""
+import logging
+import time
+from typing import Optional
+
+from app.core.config import settings
+from app.core.exceptions import RateLimitExceededError
+from app.db.redis import get_redis, incr_with_expiry, REDIS_SESSION
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class LoginThrottle:
+    """账号登录尝试计数"""
+
+    REDIS_KEY_PREFIX = "login:attempts:"
+
+    def __init__(self):
+        # 账号 -> (窗口开始时间, 尝试次数)
+        self._local = TTLCache(
+            maxsize=settings.LOGIN_THROTTLE_CACHE_SIZE,
+            ttl=settings.LOGIN_THROTTLE_WINDOW
+        )
+        self.rejected = 0
+
+    @staticmethod
+    def _normalize(account: str) -> str:
+        return account.strip().lower()
+
+    async def _incr_redis(self, account: str) -> Optional[int]:
+        try:
+            return await incr_with_expiry(
+                f"{self.REDIS_KEY_PREFIX}{account}",
+                settings.LOGIN_THROTTLE_WINDOW,
+                REDIS_SESSION
+            )
+        except Exception as e:
+            logger.debug(f"Redis登录计数不可用，使用进程内计数: {str(e)}")
+            return None
+
+    def _incr_local(self, account: str) -> int:
+        now = time.monotonic()
+        started_at, count = self._local.get(account, (now, 0))
+        if now - started_at >= settings.LOGIN_THROTTLE_WINDOW:
+            started_at, count = now, 0
+        count += 1
+        self._local.set(account, (started_at, count))
+        return count
+
+    async def hit(self, account: str) -> None:
+        """
+        记录一次登录尝试
+
+        Args:
+            account: 登录账号
+
+        Raises:
+            RateLimitExceededError: 窗口期内尝试次数超过上限
+        """
+        account = self._normalize(account)
+        count = await self._incr_redis(account)
+        if count is None:
+            count = self._incr_local(account)
+        if count > settings.LOGIN_MAX_ATTEMPTS:
+            self.rejected += 1
+            logger.warning(f"账号登录尝试过于频繁: {account}")
+            raise RateLimitExceededError(
+                detail="登录尝试过于频繁，请稍后再试",
+                headers={"Retry-After": str(settings.LOGIN_THROTTLE_WINDOW)}
+            )
+
+    async def reset(self, account: str) -> None:
+        """登录成功后清除计数"""
+        account = self._normalize(account)
+        self._local.delete(account)
+        try:
+            redis = await get_redis(REDIS_SESSION)
+            await redis.delete(f"{self.REDIS_KEY_PREFIX}{account}")
+        except Exception as e:
+            logger.debug(f"清除Redis登录计数失败: {str(e)}")
+
+
+# 全局登录尝试计数实例
+login_throttle = LoginThrottle()
@@ -0,0 +1,368 @@
+"""
+邮件发送队列
+请求中只把邮件放入进程内队列后立即返回，由后台任务负责实际发送:
+- 后台任务保持SMTP长连接，每次从队列取出一批邮件通过同一连接发送，
+  连接空闲超过 MAIL_SMTP_IDLE_TIMEOUT 秒后关闭
+- smtplib 是阻塞库，整批发送在线程池中执行，不占用事件循环
+- 临时性错误(断线、超时、4xx响应)按指数退避重新入队，超过 MAIL_MAX_ATTEMPTS 次后放弃
+- 发送方式由 MAIL_TRANSPORT 决定: smtp / file(写入本地目录) / memory(保存在内存中，测试用)
+"""
+import asyncio
+import logging
+import smtplib
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    """待发送的邮件"""
+    recipients: List[str]
+    subject: str
+    body: str
+    cc: List[str] = field(default_factory=list)
+    bcc: List[str] = field(default_factory=list)
+    is_html: bool = False
+    # 已尝试发送的次数
+    attempts: int = 0
+
+    @property
+    def all_recipients(self) -> List[str]:
+        """实际投递的全部收件人(含抄送和密送)"""
+        return self.recipients + self.cc + self.bcc
+
+    def to_mime(self, sender: str) -> MIMEMultipart:
+        """构建MIME邮件"""
+        msg = MIMEMultipart()
+        msg["From"] = sender
+        msg["Subject"] = self.subject
+        msg["To"] = ", ".join(self.recipients)
+        if self.cc:
+            msg["Cc"] = ", ".join(self.cc)
+        content_type = "html" if self.is_html else "plain"
+        msg.attach(MIMEText(self.body, content_type, "utf-8"))
+        return msg
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断发送错误是否为临时性错误(可以重试)"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, (smtplib.SMTPRecipientsRefused, smtplib.SMTPNotSupportedError)):
+        return False
+    return isinstance(error, (smtplib.SMTPException, OSError))
+
+
+class MailTransport:
+    """邮件发送方式(方法在线程池中调用，可以阻塞)"""
+
+    name = "base"
+
+    def send_batch(self, messages: List[OutgoingEmail]) -> List[Optional[Exception]]:
+        """
+        发送一批邮件
+
+        Returns:
+            与 messages 一一对应的发送错误，成功时为None
+        """
+        results: List[Optional[Exception]] = []
+        for message in messages:
+            try:
+                self.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    def send(self, message: OutgoingEmail) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """释放连接"""
+        return None
+
+
+class SMTPTransport(MailTransport):
+    """通过SMTP长连接发送"""
+
+    name = "smtp"
+
+    def __init__(self):
+        self._server: Optional[smtplib.SMTP] = None
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(settings.SMTP_SERVER, settings.SMTP_PORT, timeout=settings.SMTP_TIMEOUT)
+        try:
+            if settings.SMTP_TLS:
+                server.starttls()
+            server.login(settings.SMTP_USER, settings.SMTP_PASSWORD)
+        except Exception:
+            server.close()
+            raise
+        logger.debug(f"已连接SMTP服务器: {settings.SMTP_SERVER}:{settings.SMTP_PORT}")
+        return server
+
+    def send_batch(self, messages: List[OutgoingEmail]) -> List[Optional[Exception]]:
+        results: List[Optional[Exception]] = []
+        for index, message in enumerate(messages):
+            try:
+                self.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+                if self._server is None:
+                    # 无法连接服务器时，本批剩余邮件不再逐封尝试
+                    results.extend([e] * (len(messages) - index - 1))
+                    break
+        return results
+
+    def send(self, message: OutgoingEmail) -> None:
+        mime = message.to_mime(settings.SMTP_USER)
+        for retry in (False, True):
+            if self._server is None:
+                self._server = self._connect()
+            try:
+                self._server.send_message(mime, from_addr=settings.SMTP_USER, to_addrs=message.all_recipients)
+                return
+            except (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError):
+                # 长连接已被服务器关闭，重新连接后再发送一次
+                self._server.close()
+                self._server = None
+                if retry:
+                    raise
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+
+class FileTransport(MailTransport):
+    """把邮件写入本地目录(开发环境)"""
+
+    name = "file"
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or settings.MAIL_FILE_DIR)
+
+    def send(self, message: OutgoingEmail) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        file_path = self.directory / f"email_{timestamp}.txt"
+        with open(file_path, "w", encoding="utf-8") as f:
+            f.write(f"收件人: {', '.join(message.recipients)}\n")
+            if message.cc:
+                f.write(f"抄送: {', '.join(message.cc)}\n")
+            if message.bcc:
+                f.write(f"密送: {', '.join(message.bcc)}\n")
+            f.write(f"主题: {message.subject}\n")
+            f.write(f"内容类型: {'HTML' if message.is_html else '纯文本'}\n")
+            f.write(f"内容: \n{message.body}\n")
+        logger.info(f"模拟邮件已保存到: {file_path}")
+
+
+class MemoryTransport(MailTransport):
+    """把邮件保存在内存中(测试用)"""
+
+    name = "memory"
+
+    def __init__(self):
+        self.sent: List[OutgoingEmail] = []
+
+    def send(self, message: OutgoingEmail) -> None:
+        self.sent.append(message)
+
+
+def create_transport(name: Optional[str] = None) -> MailTransport:
+    """
+    根据配置创建发送方式
+
+    未配置 MAIL_TRANSPORT 时，开发环境且没有SMTP密码使用file，否则使用smtp
+    """
+    name = name or settings.MAIL_TRANSPORT
+    if not name:
+        name = "file" if settings.APP_ENV == "development" and not settings.SMTP_PASSWORD else "smtp"
+    if name == "file":
+        return FileTransport()
+    if name == "memory":
+        return MemoryTransport()
+    return SMTPTransport()
+
+
+class MailQueue:
+    """邮件发送队列"""
+
+    def __init__(self, transport: Optional[MailTransport] = None):
+        self._transport = transport
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 等待重试的邮件 {id(邮件): 定时器}
+        self._retry_handles: Dict[int, asyncio.TimerHandle] = {}
+        # 正在线程中执行的SMTP操作(任务被取消后线程仍会继续执行，关闭前需要等待其结束)
+        self._in_flight: Optional[asyncio.Future] = None
+        # 统计
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.batches = 0
+
+    @property
+    def transport(self) -> MailTransport:
+        if self._transport is None:
+            self._transport = create_transport()
+        return self._transport
+
+    def _ensure_queue(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=settings.MAIL_QUEUE_SIZE)
+        return self._queue
+
+    async def enqueue(self, message: OutgoingEmail) -> bool:
+        """
+        放入发送队列(立即返回)
+
+        Args:
+            message: 待发送的邮件
+
+        Returns:
+            是否已放入队列(队列已满时返回False)
+        """
+        queue = self._ensure_queue()
+        if self._task is None:
+            # 未通过应用生命周期启动时(如脚本中)按需启动
+            await self.start()
+        try:
+            queue.put_nowait(message)
+        except asyncio.QueueFull:
+            logger.error(f"邮件队列已满，丢弃邮件: 收件人={', '.join(message.recipients)}, 主题={message.subject}")
+            return False
+        return True
+
+    def _requeue(self, message: OutgoingEmail) -> None:
+        self._retry_handles.pop(id(message), None)
+        try:
+            self._ensure_queue().put_nowait(message)
+        except asyncio.QueueFull:
+            self.failed += 1
+            logger.error(f"邮件队列已满，放弃重试: 收件人={', '.join(message.recipients)}, 主题={message.subject}")
+
+    def _handle_result(self, message: OutgoingEmail, error: Optional[Exception]) -> None:
+        message.attempts += 1
+        if error is None:
+            self.sent += 1
+            logger.info(f"邮件发送成功: 收件人={', '.join(message.recipients)}, 主题={message.subject}")
+            return
+
+        if is_retryable(error) and message.attempts < settings.MAIL_MAX_ATTEMPTS:
+            delay = min(settings.MAIL_RETRY_BASE_DELAY * 2 ** (message.attempts - 1), settings.MAIL_RETRY_MAX_DELAY)
+            logger.warning(f"邮件发送失败，{delay:.0f}秒后第{message.attempts + 1}次尝试: {str(error)}")
+            self.retried += 1
+            self._retry_handles[id(message)] = asyncio.get_running_loop().call_later(delay, self._requeue, message)
+            return
+
+        self.failed += 1
+        logger.error(
+            f"邮件发送失败: 收件人={', '.join(message.recipients)}, 主题={message.subject}, "
+            f"尝试次数={message.attempts}, 错误: {str(error)}"
+        )
+
+    async def _next_batch(self, queue: asyncio.Queue) -> List[OutgoingEmail]:
+        batch = [await asyncio.wait_for(queue.get(), timeout=settings.MAIL_SMTP_IDLE_TIMEOUT)]
+        while len(batch) < settings.MAIL_BATCH_SIZE:
+            try:
+                batch.append(queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run_in_thread(self, func, *args) -> Any:
+        """在线程中执行SMTP操作；发送任务被取消时不等待线程结束，由stop负责等待"""
+        self._in_flight = asyncio.ensure_future(asyncio.to_thread(func, *args))
+        return await asyncio.shield(self._in_flight)
+
+    async def _loop(self) -> None:
+        queue = self._ensure_queue()
+        while True:
+            try:
+                batch = await self._next_batch(queue)
+            except asyncio.TimeoutError:
+                # 空闲时关闭SMTP连接，避免被服务器断开
+                await self._run_in_thread(self.transport.close)
+                continue
+
+            try:
+                results = await self._run_in_thread(self.transport.send_batch, batch)
+            except Exception as e:
+                results = [e] * len(batch)
+            self.batches += 1
+            for message, error in zip(batch, results):
+                self._handle_result(message, error)
+                queue.task_done()
+
+    async def start(self) -> None:
+        """启动发送任务(应用启动时调用)"""
+        if self._task is None:
+            self._ensure_queue()
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """
+        停止发送任务(应用关闭时调用)
+
+        最多等待 MAIL_SHUTDOWN_TIMEOUT 秒发送队列中剩余的邮件，等待重试的邮件会被丢弃；
+        超时时等待正在进行的SMTP操作结束后再关闭连接，避免两个线程同时使用同一个连接
+        """
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout=settings.MAIL_SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(f"关闭时仍有 {self._queue.qsize()} 封邮件未发送")
+        if self._retry_handles:
+            logger.warning(f"关闭时丢弃 {len(self._retry_handles)} 封等待重试的邮件")
+        for handle in self._retry_handles.values():
+            handle.cancel()
+        self._retry_handles.clear()
+
+        self._task.cancel()
+        try:
+            await self._task
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._task = None
+
+        if self._in_flight is not None:
+            try:
+                await self._in_flight
+            except Exception:
+                pass
+            self._in_flight = None
+        await asyncio.to_thread(self.transport.close)
+
+    def stats(self) -> Dict[str, Any]:
+        """发送统计"""
+        return {
+            "transport": self.transport.name,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "retrying": len(self._retry_handles),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "batches": self.batches,
+        }
+
+
+# 全局邮件队列实例
+mail_queue = MailQueue()
@@ -4,6 +4,9 @@ from bson import ObjectId
 from fastapi import HTTPException, status
 
 from app.db.mongodb import get_database
+from app.utils.pagination import fetch_page
+from app.utils.projections import resolve_projection
+from app.services.family_membership import is_member, families_of, require_family_member
 from app.models.menu_plan import (
     MenuPlanCreate, 
     MenuPlanUpdate, 
@@ -27,25 +30,7 @@ async def create_menu_plan(plan_data: MenuPlanCreate, current_user: dict) -> dic
     db = await get_database()
     
     # 验证家庭存在并且用户是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(plan_data.familyId)})
-    if not family:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="家庭不存在"
-        )
-    
-    # 检查用户是否是家庭成员
-    is_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_member = True
-            break
-    
-    if not is_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="用户不是该家庭成员"
-        )
+    await require_family_member(plan_data.familyId, current_user)
     
     # 构建菜单计划文档
     now = datetime.now()
@@ -113,19 +98,8 @@ async def get_menu_plan_by_id(plan_id: str, current_user: dict) -> Optional[dict
                 break
         
         # 检查用户是否是家庭成员
-        if not is_collaborator:
-            family = await db.families.find_one({"_id": ObjectId(plan["familyId"])})
-            if family:
-                is_family_member = False
-                for member in family.get("members", []):
-                    if str(member.get("userId")) == str(current_user["_id"]):
-                        is_family_member = True
-                        break
-                
-                if not is_family_member:
-                    return None
-            else:
-                return None
+        if not is_collaborator and not await is_member(current_user["_id"], plan["familyId"]):
+            return None
     
     # 转换_id为字符串
     plan["id"] = str(plan.pop("_id"))
@@ -303,7 +277,7 @@ async def add_dish_to_menu(plan_id: str, dish_data: DishAdd, current_user: dict)
 async def get_family_menu_plans(
     params: MenuPlanListParams, 
     current_user: dict
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
     """
     获取指定家庭的菜单计划
     
@@ -312,7 +286,7 @@ async def get_family_menu_plans(
         current_user: 当前用户信息
         
     Returns:
-        菜单计划列表和总数
+        菜单计划列表、总数(游标模式下可能为None)和下一页游标
     """
     db = await get_database()
     
@@ -322,38 +296,16 @@ async def get_family_menu_plans(
     # 家庭ID过滤
     if params.familyId:
         # 验证家庭存在并且用户是家庭成员
-        family = await db.families.find_one({"_id": ObjectId(params.familyId)})
-        if not family:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="家庭不存在"
-            )
-        
-        # 检查用户是否是家庭成员
-        is_member = False
-        for member in family.get("members", []):
-            if str(member.get("userId")) == str(current_user["_id"]):
-                is_member = True
-                break
-        
-        if not is_member and "admin" not in current_user.get("roles", []):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="用户不是该家庭成员"
-            )
+        await require_family_member(params.familyId, current_user, allow_admin=True)
         
         query["familyId"] = params.familyId
     else:
         # 获取用户所有家庭的菜单计划
-        families = await db.families.find(
-            {"members.userId": str(current_user["_id"])},
-            {"_id": 1}
-        ).to_list(length=100)
+        family_ids = await families_of(current_user["_id"])
         
-        if not families:
-            return [], 0
+        if not family_ids:
+            return [], 0, None
         
-        family_ids = [str(family["_id"]) for family in families]
         query["familyId"] = {"$in": family_ids}
     
     # 日期范围过滤
@@ -369,23 +321,22 @@ async def get_family_menu_plans(
     if params.status:
         query["status"] = {"$in": params.status}
     
-    # 计算分页参数
-    skip = (params.page - 1) * params.pageSize
-    limit = params.pageSize
-    
-    # 查询总数
-    total = await db.menu_plans.count_documents(query)
-    
-    # 执行查询
-    cursor = db.menu_plans.find(query)
-    cursor = cursor.sort("date", -1)  # 默认按日期降序排序
-    cursor = cursor.skip(skip).limit(limit)
-    
-    # 获取结果
-    plans = await cursor.to_list(length=limit)
+    # 分页查询，默认按日期降序排序
+    plans, total, next_cursor = await fetch_page(
+        db.menu_plans,
+        query,
+        "date",
+        -1,
+        page=params.page,
+        page_size=params.pageSize,
+        cursor=params.cursor,
+        cursor_mode=params.useCursor,
+        include_total=params.includeTotal,
+        projection=resolve_projection("menuPlan", params.fields, required=("date",))
+    )
     
     # 处理结果
     for plan in plans:
         plan["id"] = str(plan.pop("_id"))
     
-    return plans, total 
\ No newline at end of file
+    return plans, total, next_cursor 
\ No newline at end of file
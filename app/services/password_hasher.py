@@ -0,0 +1,131 @@
+"""
+密码哈希服务
+bcrypt 每次计算耗时数百毫秒的CPU时间，直接在事件循环中执行会阻塞同一进程的所有请求:
+- 哈希与校验在专用的有界线程池中执行(bcrypt 计算时释放GIL)
+- 排队数超过 PASSWORD_HASH_MAX_PENDING 时直接拒绝，避免请求无限堆积
+- 登录校验成功时，如果哈希的算法或成本参数与当前配置不一致，返回新的哈希以便透明升级
+- 统计排队数、排队等待时间与计算耗时
+"""
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.core.exceptions import ServiceUnavailableError
+from app.core.security import pwd_context
+
+logger = logging.getLogger(__name__)
+
+
+def _percentile(samples: Deque[float], percent: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(int(len(ordered) * percent), len(ordered) - 1)
+    return ordered[index]
+
+
+class PasswordHasher:
+    """在专用线程池中执行的密码哈希服务"""
+
+    def __init__(self, max_workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending or settings.PASSWORD_HASH_MAX_PENDING
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 已提交但尚未完成的任务数(含正在执行的)
+        self._pending = 0
+        # 最近的排队等待时间与计算耗时(秒)
+        self._wait_times: Deque[float] = deque(maxlen=1000)
+        self._run_times: Deque[float] = deque(maxlen=1000)
+        # 统计
+        self.completed = 0
+        self.rejected = 0
+        self.rehashed = 0
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="password-hash")
+        return self._executor
+
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if self._pending >= self.max_pending:
+            self.rejected += 1
+            logger.warning(f"密码哈希排队数已达上限({self.max_pending})，拒绝请求")
+            raise ServiceUnavailableError(detail="服务繁忙，请稍后重试")
+
+        def job() -> Tuple[Any, float, float]:
+            started = time.perf_counter()
+            result = func(*args)
+            return result, started, time.perf_counter()
+
+        self._pending += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await asyncio.get_running_loop().run_in_executor(self.executor, job)
+        finally:
+            self._pending -= 1
+        self._wait_times.append(started - submitted)
+        self._run_times.append(finished - started)
+        self.completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        """生成密码哈希"""
+        return await self._run(pwd_context.hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        """校验密码"""
+        valid, _ = await self.verify_and_update(password, hashed_password)
+        return valid
+
+    async def verify_and_update(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        """
+        校验密码，哈希参数已过时时同时生成新的哈希
+
+        Args:
+            password: 明文密码
+            hashed_password: 已保存的哈希
+
+        Returns:
+            (是否正确, 新的哈希或None)
+        """
+        if not hashed_password:
+            return False, None
+        try:
+            valid, new_hash = await self._run(pwd_context.verify_and_update, password, hashed_password)
+        except ValueError as e:
+            # 无法识别的哈希格式
+            logger.warning(f"无法校验密码哈希: {str(e)}")
+            return False, None
+        if valid and new_hash:
+            self.rehashed += 1
+        return valid, new_hash
+
+    def shutdown(self) -> None:
+        """关闭线程池(应用关闭时调用)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """排队与耗时统计(毫秒)"""
+        return {
+            "workers": self.max_workers,
+            "pending": self._pending,
+            "queued": max(self._pending - self.max_workers, 0),
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "rehashed": self.rehashed,
+            "wait_ms_p50": round(_percentile(self._wait_times, 0.5) * 1000, 1),
+            "wait_ms_p95": round(_percentile(self._wait_times, 0.95) * 1000, 1),
+            "hash_ms_p50": round(_percentile(self._run_times, 0.5) * 1000, 1),
+            "hash_ms_p95": round(_percentile(self._run_times, 0.95) * 1000, 1),
+        }
+
+
+# 全局密码哈希服务实例
+password_hasher = PasswordHasher()
@@ -3,12 +3,15 @@ RBAC (Role-Based Access Control) 服务层
 提供角色、权限、菜单的管理功能
 """
 
+import json
 import logging
 from datetime import datetime
-from typing import Dict, List, Optional, Any
+from typing import Dict, FrozenSet, List, Optional, Tuple, Any
 from fastapi import HTTPException, status
 
+from app.core.config import settings
 from app.db.mongodb import get_database
+from app.db.redis import get_redis
 from app.models.rbac import (
     Role, Permission, Menu, UserRole,
     RoleType, PermissionType, MenuType, MenuStatus,
@@ -18,6 +21,7 @@ from app.models.rbac import (
     MenuCreateRequest, MenuUpdateRequest,
     UserRoleAssignRequest
 )
+from app.utils.cache import TTLCache
 from app.utils.mongodb_utils import MongoDBUtils
 
 logger = logging.getLogger(__name__)
@@ -95,7 +99,9 @@ class RoleService:
             # 过滤空值
             update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
             
-            return await MongoDBUtils.update_document(role_collection, role_id, update_dict)
+            updated_role = await MongoDBUtils.update_document(role_collection, role_id, update_dict)
+            await permission_resolver.invalidate_all()
+            return updated_role
         except HTTPException:
             raise
         except Exception as e:
@@ -237,7 +243,9 @@ class PermissionService:
             # 过滤空值
             update_dict = {k: v for k, v in update_data.dict().items() if v is not None}
             
-            return await MongoDBUtils.update_document(permission_collection, perm_id, update_dict)
+            updated_permission = await MongoDBUtils.update_document(permission_collection, perm_id, update_dict)
+            await permission_resolver.invalidate_all()
+            return updated_permission
         except HTTPException:
             raise
         except Exception as e:
@@ -455,6 +463,169 @@ class MenuService:
             return []
 
 
+class PermissionResolver:
+    """
+    用户权限解析器
+
+    通过一次 $lookup 聚合(user_roles -> roles -> permissions)编译出用户的权限代码集合，
+    并按用户缓存: 进程内LRU+TTL为第一级，可选的Redis为第二级。
+    角色分配、角色或权限变更时失效，权限检查因此只是一次集合成员判断。
+    """
+
+    REDIS_KEY_PREFIX = "rbac:permissions:"
+    REDIS_VERSION_KEY = "rbac:permissions:version"
+
+    def __init__(self):
+        self._cache = TTLCache(
+            maxsize=settings.RBAC_PERMISSION_CACHE_SIZE,
+            ttl=settings.RBAC_PERMISSION_CACHE_TTL
+        )
+        # 累计的权限编译(数据库聚合)次数
+        self.db_hits = 0
+
+    @staticmethod
+    def _build_pipeline(user_id: str) -> List[Dict[str, Any]]:
+        """构建权限编译聚合管道(ID以字符串存储，需要转换为ObjectId后关联)"""
+        def to_object_id(expr: Any) -> Dict[str, Any]:
+            return {"$convert": {"input": expr, "to": "objectId", "onError": None, "onNull": None}}
+
+        return [
+            {"$match": {"user_id": user_id, "is_active": True}},
+            {"$lookup": {
+                "from": ROLES_COLLECTION,
+                "let": {"role_oid": to_object_id("$role_id")},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$_id", "$$role_oid"]}, "is_active": True}},
+                    {"$project": {"_id": 0, "permissions": 1}}
+                ],
+                "as": "role"
+            }},
+            {"$unwind": "$role"},
+            {"$unwind": "$role.permissions"},
+            {"$group": {"_id": None, "permission_ids": {"$addToSet": "$role.permissions"}}},
+            {"$lookup": {
+                "from": PERMISSIONS_COLLECTION,
+                "let": {"permission_oids": {
+                    "$map": {"input": "$permission_ids", "in": to_object_id("$$this")}
+                }},
+                "pipeline": [
+                    {"$match": {"$expr": {"$in": ["$_id", "$$permission_oids"]}, "is_active": True}},
+                    {"$project": {"_id": 0, "code": 1}}
+                ],
+                "as": "permissions"
+            }},
+            {"$project": {"_id": 0, "codes": "$permissions.code"}}
+        ]
+
+    async def compile(self, user_id: str) -> FrozenSet[str]:
+        """从数据库编译用户的权限代码集合"""
+        db = get_database()
+        user_role_collection = db[USER_ROLES_COLLECTION]
+
+        cursor = user_role_collection.aggregate(self._build_pipeline(user_id))
+        results = await cursor.to_list(length=1)
+        if not results:
+            return frozenset()
+        return frozenset(code for code in results[0].get("codes", []) if code)
+
+    async def _redis_version(self, redis) -> int:
+        version = await redis.get(self.REDIS_VERSION_KEY)
+        return int(version) if version else 0
+
+    async def _get_from_redis(self, user_id: str) -> Optional[FrozenSet[str]]:
+        if not settings.RBAC_PERMISSION_CACHE_REDIS:
+            return None
+        try:
+            redis = await get_redis()
+            version = await self._redis_version(redis)
+            cached = await redis.get(f"{self.REDIS_KEY_PREFIX}{version}:{user_id}")
+            if cached is None:
+                return None
+            return frozenset(json.loads(cached))
+        except Exception as e:
+            logger.warning(f"读取Redis权限缓存失败: {str(e)}")
+            return None
+
+    async def _set_to_redis(self, user_id: str, permissions: FrozenSet[str]) -> None:
+        if not settings.RBAC_PERMISSION_CACHE_REDIS:
+            return
+        try:
+            redis = await get_redis()
+            version = await self._redis_version(redis)
+            await redis.set(
+                f"{self.REDIS_KEY_PREFIX}{version}:{user_id}",
+                json.dumps(sorted(permissions)),
+                ex=settings.RBAC_PERMISSION_CACHE_REDIS_TTL
+            )
+        except Exception as e:
+            logger.warning(f"写入Redis权限缓存失败: {str(e)}")
+
+    async def resolve(self, user_id: str) -> Tuple[FrozenSet[str], bool]:
+        """
+        获取用户的权限代码集合(带缓存)
+
+        Args:
+            user_id: 用户ID
+
+        Returns:
+            (权限代码集合, 是否访问了数据库)
+        """
+        permissions = self._cache.get(user_id)
+        if permissions is not None:
+            return permissions, False
+
+        hit_db = False
+        permissions = await self._get_from_redis(user_id)
+        if permissions is None:
+            permissions = await self.compile(user_id)
+            self.db_hits += 1
+            hit_db = True
+            await self._set_to_redis(user_id, permissions)
+
+        self._cache.set(user_id, permissions)
+        return permissions, hit_db
+
+    async def get_permissions(self, user_id: str) -> FrozenSet[str]:
+        """获取用户的权限代码集合(带缓存)"""
+        permissions, _ = await self.resolve(user_id)
+        return permissions
+
+    async def invalidate_user(self, user_id: str) -> None:
+        """失效单个用户的权限缓存(角色分配变更时调用)"""
+        self._cache.delete(user_id)
+        if not settings.RBAC_PERMISSION_CACHE_REDIS:
+            return
+        try:
+            redis = await get_redis()
+            version = await self._redis_version(redis)
+            await redis.delete(f"{self.REDIS_KEY_PREFIX}{version}:{user_id}")
+        except Exception as e:
+            logger.warning(f"删除Redis权限缓存失败: {str(e)}")
+
+    async def invalidate_all(self) -> None:
+        """
+        失效所有用户的权限缓存(角色或权限定义变更时调用)
+
+        Redis中通过递增版本号使旧的缓存键整体作废，由过期时间自然清理
+        """
+        self._cache.clear()
+        if not settings.RBAC_PERMISSION_CACHE_REDIS:
+            return
+        try:
+            redis = await get_redis()
+            await redis.incr(self.REDIS_VERSION_KEY)
+        except Exception as e:
+            logger.warning(f"更新Redis权限缓存版本失败: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """进程内缓存命中统计"""
+        return {**self._cache.stats(), "db_hits": self.db_hits}
+
+
+# 全局权限解析器实例
+permission_resolver = PermissionResolver()
+
+
 class UserRoleService:
     """用户角色服务"""
     
@@ -478,6 +649,7 @@ class UserRoleService:
                 }
                 await MongoDBUtils.create_document(user_role_collection, user_role_data)
             
+            await permission_resolver.invalidate_user(assign_data.user_id)
             return True
         except Exception as e:
             logger.error(f"分配用户角色失败: {str(e)}")
@@ -509,42 +681,24 @@ class UserRoleService:
             return []
     
     @staticmethod
-    async def get_user_permissions(user_id: str) -> List[str]:
-        """获取用户权限代码列表"""
+    async def get_user_permission_set(user_id: str) -> FrozenSet[str]:
+        """获取用户权限代码集合(编译并缓存)"""
         try:
-            # 获取用户角色
-            user_roles = await UserRoleService.get_user_roles(user_id)
-            
-            # 收集所有权限ID
-            permission_ids = set()
-            for role in user_roles:
-                if role.get("is_active"):
-                    permission_ids.update(role.get("permissions", []))
-            
-            # 获取权限详情
-            db = get_database()
-            permission_collection = db[PERMISSIONS_COLLECTION]
-            
-            permission_codes = []
-            for perm_id in permission_ids:
-                perm = await MongoDBUtils.get_document_by_id(permission_collection, perm_id)
-                if perm and perm.get("is_active"):
-                    permission_codes.append(perm["code"])
-            
-            return permission_codes
+            return await permission_resolver.get_permissions(user_id)
         except Exception as e:
             logger.error(f"获取用户权限失败: {str(e)}")
-            return []
+            return frozenset()
+    
+    @staticmethod
+    async def get_user_permissions(user_id: str) -> List[str]:
+        """获取用户权限代码列表"""
+        return sorted(await UserRoleService.get_user_permission_set(user_id))
     
     @staticmethod
     async def check_permission(user_id: str, permission_code: str) -> bool:
         """检查用户是否有指定权限"""
-        try:
-            user_permissions = await UserRoleService.get_user_permissions(user_id)
-            return permission_code in user_permissions
-        except Exception as e:
-            logger.error(f"检查用户权限失败: {str(e)}")
-            return False
+        user_permissions = await UserRoleService.get_user_permission_set(user_id)
+        return permission_code in user_permissions
     
     @staticmethod
     async def check_user_permission(user_id: str, permission_code: str) -> bool:
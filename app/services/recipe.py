@@ -5,6 +5,13 @@ from fastapi import HTTPException, status
 
 from app.db.mongodb import get_collection
 from app.models.recipe import RecipeCreate, RecipeUpdate, RecipeSearchParams, RecipeCreator
+from app.services.favorite import annotate_favorites
+from app.services.recipe_search import get_search_backend, search_source_changed, SEARCH_INDEX_FIELD
+from app.services.recipe_rating import apply_rating_average
+from app.services.view_counter import view_counter
+from app.services.recipe_cache import recipe_cache
+from app.utils.pagination import fetch_page
+from app.utils.projections import resolve_projection
 
 
 async def create_recipe(recipe_data: RecipeCreate, current_user: dict) -> dict:
@@ -58,14 +65,20 @@ async def create_recipe(recipe_data: RecipeCreate, current_user: dict) -> dict:
             "commentCount": 0,
             "cookCount": 0,
             "ratingAvg": 0.0,
+            "ratingSum": 0,
             "ratingCount": 0
         },
         "createdAt": now,
         "updatedAt": now
     }
     
+    # 写入时完成分词，检索字段随菜谱文档一起保存
+    search_backend = get_search_backend()
+    recipe_doc.update(search_backend.build_index_fields(recipe_doc))
+    
     # 插入菜谱文档
     result = await recipes_collection.insert_one(recipe_doc)
+    await search_backend.index_recipe(str(result.inserted_id), recipe_doc)
     
     # 更新用户的菜谱计数
     await users_collection.update_one(
@@ -74,7 +87,10 @@ async def create_recipe(recipe_data: RecipeCreate, current_user: dict) -> dict:
     )
     
     # 获取创建的菜谱
-    created_recipe = await recipes_collection.find_one({"_id": result.inserted_id})
+    created_recipe = await recipes_collection.find_one(
+        {"_id": result.inserted_id},
+        {SEARCH_INDEX_FIELD: 0}
+    )
     
     # 转换_id为字符串
     created_recipe["id"] = str(created_recipe.pop("_id"))
@@ -95,7 +111,6 @@ async def get_recipe_by_id(recipe_id: str, current_user: Optional[dict] = None)
     """
     # 获取集合
     recipes_collection = get_collection("recipes")
-    favorites_collection = get_collection("favorites")
     
     try:
         # 转换字符串ID为ObjectId
@@ -105,33 +120,32 @@ async def get_recipe_by_id(recipe_id: str, current_user: Optional[dict] = None)
         print(f"无效的ObjectId格式: {recipe_id}, 错误: {str(e)}")
         return None
     
-    # 查询菜谱
+    # 查询菜谱(优先读取缓存)
     try:
-        recipe = await recipes_collection.find_one({"_id": recipe_object_id})
+        recipe = await recipe_cache.get(recipe_id)
         
-        if not recipe:
-            return None
+        if recipe is None:
+            recipe = await recipes_collection.find_one(
+                {"_id": recipe_object_id},
+                {SEARCH_INDEX_FIELD: 0}
+            )
+            
+            if not recipe:
+                return None
+            
+            # 转换_id为字符串
+            recipe["id"] = str(recipe.pop("_id"))
+            await recipe_cache.set(recipe_id, recipe)
         
         # 所有菜谱都允许公开访问，不再检查isPublic字段
         
-        # 增加浏览次数
-        await recipes_collection.update_one(
-            {"_id": recipe_object_id},
-            {"$inc": {"stats.viewCount": 1}}
-        )
+        # 增加浏览次数(写回缓冲，定期批量写入数据库)
+        await view_counter.record(recipe_id)
         
-        # 如果用户已登录，检查是否已收藏
-        if current_user:
-            favorite = await favorites_collection.find_one({
-                "userId": str(current_user["_id"]),
-                "recipeId": recipe_id
-            })
-            recipe["is_favorite"] = favorite is not None
-        else:
-            recipe["is_favorite"] = False
+        apply_rating_average(recipe)
         
-        # 转换_id为字符串
-        recipe["id"] = str(recipe.pop("_id"))
+        # 如果用户已登录，检查是否已收藏
+        await annotate_favorites([recipe], current_user)
         
         return recipe
     except Exception as e:
@@ -189,6 +203,13 @@ async def update_recipe(recipe_id: str, recipe_data: RecipeUpdate, current_user:
                 else:
                     update_doc[field] = value
     
+    # 检索字段有变化时重新分词
+    search_backend = get_search_backend()
+    if search_source_changed(update_doc):
+        search_source = {**recipe, **update_doc}
+        update_doc.update(search_backend.build_index_fields(search_source))
+        await search_backend.index_recipe(recipe_id, search_source)
+    
     # 添加更新时间
     update_doc["updatedAt"] = datetime.now()
     
@@ -197,9 +218,13 @@ async def update_recipe(recipe_id: str, recipe_data: RecipeUpdate, current_user:
         {"_id": recipe_object_id},
         {"$set": update_doc}
     )
+    await recipe_cache.invalidate(recipe_id)
     
     # 获取更新后的菜谱
-    updated_recipe = await recipes_collection.find_one({"_id": recipe_object_id})
+    updated_recipe = await recipes_collection.find_one(
+        {"_id": recipe_object_id},
+        {SEARCH_INDEX_FIELD: 0}
+    )
     
     # 转换_id为字符串
     updated_recipe["id"] = str(updated_recipe.pop("_id"))
@@ -260,6 +285,7 @@ async def favorite_recipe(recipe_id: str, current_user: dict) -> dict:
             {"_id": recipe_object_id},
             {"$inc": {"stats.favoriteCount": -1}}
         )
+        await recipe_cache.invalidate(recipe_id)
         
         # 减少用户收藏计数
         await users_collection.update_one(
@@ -281,6 +307,7 @@ async def favorite_recipe(recipe_id: str, current_user: dict) -> dict:
             {"_id": recipe_object_id},
             {"$inc": {"stats.favoriteCount": 1}}
         )
+        await recipe_cache.invalidate(recipe_id)
         
         # 增加用户收藏计数
         await users_collection.update_one(
@@ -294,7 +321,7 @@ async def favorite_recipe(recipe_id: str, current_user: dict) -> dict:
 async def search_recipes(
     params: RecipeSearchParams, 
     current_user: Optional[dict] = None
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
     """
     搜索菜谱
     
@@ -303,11 +330,10 @@ async def search_recipes(
         current_user: 当前用户信息(可选)
         
     Returns:
-        菜谱列表和总数
+        菜谱列表、总数(游标模式下可能为None)和下一页游标
     """
-    # 获取集合
-    recipes_collection = get_collection("recipes")
-    favorites_collection = get_collection("favorites")
+    # 获取集合(关键词检索读取从节点，允许有限的复制延迟)
+    recipes_collection = get_collection("recipes", profile="search" if params.keyword else None)
     
     # 构建查询条件
     query: Dict[str, Any] = {}
@@ -320,15 +346,13 @@ async def search_recipes(
         query["isPublic"] = True
         query["status"] = "published"
     
-    # 根据关键词搜索标题和描述
+    # 根据关键词检索标题、描述和标签(走检索索引，不再做正则全表扫描)
+    search_clause = None
     if params.keyword:
-        # 使用文本索引或正则表达式
-        text_query = {"$regex": params.keyword, "$options": "i"}
-        query["$or"] = [
-            {"title": text_query},
-            {"description": text_query},
-            {"tags": params.keyword}
-        ]
+        search_clause = await get_search_backend().build_clause(params.keyword)
+        if search_clause is None:
+            return [], 0, None
+        query.update(search_clause.filter)
     
     # 标签过滤
     if params.tags:
@@ -354,10 +378,6 @@ async def search_recipes(
     if params.creatorId:
         query["creator.userId"] = params.creatorId
     
-    # 计算分页参数
-    skip = (params.page - 1) * params.pageSize
-    limit = params.pageSize
-    
     # 确定排序方式
     sort_field = "createdAt"
     if params.sortBy == "popularity":
@@ -366,30 +386,47 @@ async def search_recipes(
         sort_field = "stats.ratingAvg"
     
     sort_direction = -1 if params.sortDirection == "desc" else 1
+    # 摘要视图只读取列表需要的字段，否则读取完整菜谱(不含检索字段)
+    projection: Dict[str, Any] = (
+        resolve_projection("recipe", params.fields, required=(sort_field,))
+        or {SEARCH_INDEX_FIELD: 0}
+    )
     
-    # 查询总数
-    total = await recipes_collection.count_documents(query)
-    
-    # 执行查询
-    cursor = recipes_collection.find(query)
-    cursor = cursor.sort(sort_field, sort_direction)
-    cursor = cursor.skip(skip).limit(limit)
-    
-    # 获取结果
-    recipes = await cursor.to_list(length=limit)
+    # 按相关度排序(关键词检索时可用)，相关度得分无法作为游标，始终使用偏移分页
+    by_relevance = search_clause is not None and params.sortBy == "relevance"
+    if by_relevance and search_clause.sort:
+        skip = (params.page - 1) * params.pageSize
+        limit = params.pageSize
+        total = await recipes_collection.count_documents(query)
+        cursor = recipes_collection.find(query, {**projection, **search_clause.projection})
+        cursor = cursor.sort(search_clause.sort).skip(skip).limit(limit)
+        recipes = await cursor.to_list(length=limit)
+        next_cursor = None
+    else:
+        recipes, total, next_cursor = await fetch_page(
+            recipes_collection,
+            query,
+            sort_field,
+            sort_direction,
+            page=params.page,
+            page_size=params.pageSize,
+            cursor=None if by_relevance else params.cursor,
+            cursor_mode=params.useCursor and not by_relevance,
+            include_total=params.includeTotal,
+            projection=projection
+        )
     
     # 处理结果
     for recipe in recipes:
         recipe["id"] = str(recipe.pop("_id"))
-        
-        # 如果用户已登录，检查是否已收藏
-        if current_user:
-            favorite = await favorites_collection.find_one({
-                "userId": str(current_user["_id"]),
-                "recipeId": recipe["id"]
-            })
-            recipe["is_favorite"] = favorite is not None
-        else:
-            recipe["is_favorite"] = False
-    
-    return recipes, total 
\ No newline at end of file
+        recipe.pop("score", None)
+        apply_rating_average(recipe)
+    
+    # 后端只在进程内给出得分时，对当前页按相关度排序
+    if by_relevance and not search_clause.sort:
+        recipes.sort(key=lambda item: search_clause.scores.get(item["id"], 0), reverse=True)
+    
+    # 如果用户已登录，一次查询批量标注整页的收藏状态
+    await annotate_favorites(recipes, current_user)
+    
+    return recipes, total, next_cursor 
\ No newline at end of file
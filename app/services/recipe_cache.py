@@ -0,0 +1,131 @@
+"""
+菜谱详情缓存
+菜谱详情(食材、步骤、营养信息等)很少变化，按菜谱ID缓存读取结果:
+- 进程内LRU缓存(有容量上限和过期时间)
+- 可选的Redis缓存，保存预先序列化好的JSON字节，多个进程共享
+
+缓存内容不包含与当前用户相关的字段(如is_favorite)。
+菜谱更新、评论评分或收藏数变化时显式失效；其他进程的进程内缓存依靠较短的过期时间收敛，
+浏览次数由写回缓冲定期写入，缓存中的viewCount允许短暂滞后
+"""
+import logging
+from typing import Any, Dict, Optional
+
+from bson import json_util
+
+from app.core.config import settings
+from app.db.redis import get_redis
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeCache:
+    """菜谱详情读穿缓存"""
+
+    REDIS_KEY_PREFIX = "recipe:doc:"
+
+    def __init__(self):
+        self._cache = TTLCache(
+            maxsize=settings.RECIPE_CACHE_SIZE,
+            ttl=settings.RECIPE_CACHE_TTL
+        )
+        # 统计: 进程内命中 / Redis命中 / 未命中
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def serialize(recipe: Dict[str, Any]) -> bytes:
+        """序列化为JSON字节(保留ObjectId、datetime等BSON类型)"""
+        return json_util.dumps(recipe).encode("utf-8")
+
+    @staticmethod
+    def deserialize(data: bytes) -> Dict[str, Any]:
+        """从JSON字节还原菜谱文档"""
+        return json_util.loads(data)
+
+    async def _get_from_redis(self, recipe_id: str) -> Optional[bytes]:
+        if not settings.RECIPE_CACHE_REDIS:
+            return None
+        try:
+            redis = await get_redis()
+            return await redis.get(f"{self.REDIS_KEY_PREFIX}{recipe_id}")
+        except Exception as e:
+            logger.warning(f"读取Redis菜谱缓存失败: {str(e)}")
+            return None
+
+    async def _set_to_redis(self, recipe_id: str, data: bytes) -> None:
+        if not settings.RECIPE_CACHE_REDIS:
+            return
+        try:
+            redis = await get_redis()
+            await redis.set(f"{self.REDIS_KEY_PREFIX}{recipe_id}", data, ex=settings.RECIPE_CACHE_REDIS_TTL)
+        except Exception as e:
+            logger.warning(f"写入Redis菜谱缓存失败: {str(e)}")
+
+    async def get(self, recipe_id: str) -> Optional[Dict[str, Any]]:
+        """
+        读取缓存的菜谱文档
+
+        Args:
+            recipe_id: 菜谱ID
+
+        Returns:
+            菜谱文档(每次返回新的对象，调用方可以修改)，未缓存时返回None
+        """
+        data = self._cache.get(recipe_id)
+        if data is not None:
+            self.local_hits += 1
+            return self.deserialize(data)
+
+        data = await self._get_from_redis(recipe_id)
+        if data is not None:
+            self.redis_hits += 1
+            self._cache.set(recipe_id, data)
+            return self.deserialize(data)
+
+        self.misses += 1
+        return None
+
+    async def set(self, recipe_id: str, recipe: Dict[str, Any]) -> None:
+        """
+        缓存菜谱文档
+
+        Args:
+            recipe_id: 菜谱ID
+            recipe: 菜谱文档(不含用户相关字段)
+        """
+        data = self.serialize(recipe)
+        self._cache.set(recipe_id, data)
+        await self._set_to_redis(recipe_id, data)
+
+    async def invalidate(self, recipe_id: Any) -> None:
+        """失效单个菜谱的缓存(菜谱内容或统计数据变化时调用)"""
+        recipe_id = str(recipe_id)
+        self._cache.delete(recipe_id)
+        if not settings.RECIPE_CACHE_REDIS:
+            return
+        try:
+            redis = await get_redis()
+            await redis.delete(f"{self.REDIS_KEY_PREFIX}{recipe_id}")
+        except Exception as e:
+            logger.warning(f"删除Redis菜谱缓存失败: {str(e)}")
+
+    def clear(self) -> None:
+        """清空进程内缓存"""
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """缓存命中统计"""
+        return {
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+        }
+
+
+# 全局菜谱缓存实例
+recipe_cache = RecipeCache()
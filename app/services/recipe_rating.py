@@ -0,0 +1,282 @@
+"""
+菜谱评分汇总
+菜谱的 stats 中保存评分总和 ratingSum 与评分次数 ratingCount:
+- 发表/删除评论时用一次聚合管道更新原子地累加，不再读取菜谱后在Python中计算平均分
+- 平均分在读取时由 ratingSum / ratingCount 得出；stats.ratingAvg 由同一次更新顺带写入，仅用于排序
+- 后台校准任务定期从 comments 集合批量重算各菜谱的评分统计，修正历史数据或异常中断造成的偏差
+  (多进程部署时每个周期只由一个进程执行，统计值在校准期间变化的菜谱不会被覆盖)
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import get_collection, RECIPES_COLLECTION
+from app.db.redis import get_redis
+from app.services.recipe_cache import recipe_cache
+
+logger = logging.getLogger(__name__)
+
+COMMENTS_COLLECTION = "comments"
+
+
+def _rating_update_pipeline(rating_delta: float, count_delta: int) -> List[Dict[str, Any]]:
+    """
+    构建评分累加的聚合管道更新
+
+    旧数据只有 ratingAvg/ratingCount 时，先用两者的乘积还原出 ratingSum
+    """
+    current_count = {"$ifNull": ["$stats.ratingCount", 0]}
+    current_sum = {
+        "$ifNull": [
+            "$stats.ratingSum",
+            {"$multiply": [{"$ifNull": ["$stats.ratingAvg", 0]}, current_count]}
+        ]
+    }
+    return [
+        {
+            "$set": {
+                "stats.ratingSum": {"$max": [{"$add": [current_sum, rating_delta]}, 0]},
+                "stats.ratingCount": {"$max": [{"$add": [current_count, count_delta]}, 0]},
+                "stats.commentCount": {
+                    "$max": [{"$add": [{"$ifNull": ["$stats.commentCount", 0]}, count_delta]}, 0]
+                }
+            }
+        },
+        {
+            "$set": {
+                "stats.ratingAvg": {
+                    "$cond": [
+                        {"$gt": ["$stats.ratingCount", 0]},
+                        {"$divide": ["$stats.ratingSum", "$stats.ratingCount"]},
+                        0
+                    ]
+                },
+                "updated_at": "$$NOW"
+            }
+        }
+    ]
+
+
+async def add_rating(recipe_object_id: Any, rating: float) -> bool:
+    """
+    累加一条评分(发表评论时调用)
+
+    Args:
+        recipe_object_id: 菜谱ObjectId
+        rating: 评分
+
+    Returns:
+        菜谱是否存在
+    """
+    recipes_collection = get_collection(RECIPES_COLLECTION)
+    result = await recipes_collection.update_one(
+        {"_id": recipe_object_id},
+        _rating_update_pipeline(rating, 1)
+    )
+    await recipe_cache.invalidate(recipe_object_id)
+    return result.matched_count > 0
+
+
+async def remove_rating(recipe_object_id: Any, rating: float) -> bool:
+    """
+    扣除一条评分(删除评论时调用)
+
+    Args:
+        recipe_object_id: 菜谱ObjectId
+        rating: 评分
+
+    Returns:
+        菜谱是否存在
+    """
+    recipes_collection = get_collection(RECIPES_COLLECTION)
+    result = await recipes_collection.update_one(
+        {"_id": recipe_object_id},
+        _rating_update_pipeline(-rating, -1)
+    )
+    await recipe_cache.invalidate(recipe_object_id)
+    return result.matched_count > 0
+
+
+def rating_average(stats: Optional[Dict[str, Any]]) -> float:
+    """由评分总和与评分次数计算平均分，旧数据没有ratingSum时使用已保存的ratingAvg"""
+    if not stats:
+        return 0.0
+    count = stats.get("ratingCount") or 0
+    if count <= 0:
+        return 0.0
+    if stats.get("ratingSum") is None:
+        return float(stats.get("ratingAvg") or 0.0)
+    return stats["ratingSum"] / count
+
+
+def apply_rating_average(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """在返回菜谱前用读取时计算的平均分填充 stats.ratingAvg"""
+    stats = recipe.get("stats")
+    if isinstance(stats, dict):
+        stats["ratingAvg"] = rating_average(stats)
+    return recipe
+
+
+class RatingReconciler:
+    """
+    评分统计校准任务
+
+    - 重算前先读取各菜谱当前的统计值作为快照，只有统计值仍与快照一致时才写入重算结果，
+      校准期间发生的评论增删不会被覆盖(这些菜谱留到下一轮校准)
+    - 多进程部署时通过Redis锁保证每个校准周期只有一个进程执行
+    """
+
+    LOCK_KEY = "rating:reconcile:lock"
+    STAT_FIELDS = ("ratingSum", "ratingCount", "commentCount")
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self.last_updated = 0
+        self.skipped_runs = 0
+
+    async def _snapshot(self, recipes_collection) -> Dict[Any, Dict[str, Any]]:
+        """读取已有统计数据的菜谱的当前统计值 {菜谱ID: {字段: 值}}"""
+        snapshot = {}
+        cursor = recipes_collection.find(
+            {"stats": {"$exists": True}},
+            {f"stats.{name}": 1 for name in self.STAT_FIELDS}
+        )
+        async for recipe in cursor:
+            stats = recipe.get("stats") or {}
+            snapshot[recipe["_id"]] = {name: stats.get(name) for name in self.STAT_FIELDS}
+        return snapshot
+
+    def _conditional_update(self, recipe_id: Any, previous: Dict[str, Any], values: Dict[str, Any]) -> UpdateOne:
+        """统计值与快照一致时才写入(快照中为None的字段匹配缺失或为null)"""
+        update_filter = {"_id": recipe_id}
+        for name in self.STAT_FIELDS:
+            update_filter[f"stats.{name}"] = previous.get(name)
+        count = values["ratingCount"]
+        return UpdateOne(update_filter, {"$set": {
+            "stats.ratingSum": values["ratingSum"],
+            "stats.ratingCount": count,
+            "stats.ratingAvg": values["ratingSum"] / count if count else 0.0,
+            "stats.commentCount": values["commentCount"]
+        }})
+
+    async def reconcile(self, batch_size: int = 500) -> int:
+        """
+        从 comments 集合重算所有菜谱的评分统计(仅统计顶层评论，回复不计入评分)
+
+        Returns:
+            更新的菜谱数量
+        """
+        comments_collection = get_collection(COMMENTS_COLLECTION)
+        recipes_collection = get_collection(RECIPES_COLLECTION)
+
+        # 快照必须在聚合之前读取: 之后新增的评论会同时改变统计值，使条件写入失效
+        snapshot = await self._snapshot(recipes_collection)
+
+        pipeline = [
+            {"$match": {"parent_id": {"$exists": False}}},
+            {
+                "$group": {
+                    "_id": "$recipe_id",
+                    "ratingSum": {"$sum": {"$ifNull": ["$rating", 0]}},
+                    "ratingCount": {"$sum": {"$cond": [{"$gt": ["$rating", None]}, 1, 0]}},
+                    "commentCount": {"$sum": 1}
+                }
+            },
+            {"$match": {"_id": {"$type": "string"}}},
+            {
+                "$addFields": {
+                    "recipeObjectId": {
+                        "$convert": {"input": "$_id", "to": "objectId", "onError": None, "onNull": None}
+                    }
+                }
+            },
+            {"$match": {"recipeObjectId": {"$ne": None}}}
+        ]
+
+        operations = []
+        changed_ids = []
+        updated = 0
+        seen = set()
+        async for row in comments_collection.aggregate(pipeline):
+            recipe_id = row["recipeObjectId"]
+            seen.add(recipe_id)
+            values = {name: row[name] for name in self.STAT_FIELDS}
+            previous = snapshot.get(recipe_id, {})
+            if previous == values:
+                continue
+            operations.append(self._conditional_update(recipe_id, previous, values))
+            changed_ids.append(recipe_id)
+            if len(operations) >= batch_size:
+                updated += await self._flush(recipes_collection, operations)
+                operations = []
+
+        # 已没有任何评论但统计不为零的菜谱
+        zero = {name: 0 for name in self.STAT_FIELDS}
+        for recipe_id, previous in snapshot.items():
+            if recipe_id in seen or not (previous.get("ratingCount") or previous.get("commentCount")):
+                continue
+            operations.append(self._conditional_update(recipe_id, previous, zero))
+            changed_ids.append(recipe_id)
+            if len(operations) >= batch_size:
+                updated += await self._flush(recipes_collection, operations)
+                operations = []
+
+        if operations:
+            updated += await self._flush(recipes_collection, operations)
+
+        self.last_updated = updated
+        # 逐个失效(同时删除多个进程共享的Redis缓存)；其他进程的进程内缓存依靠过期时间收敛
+        for recipe_id in changed_ids:
+            await recipe_cache.invalidate(recipe_id)
+        logger.info(f"菜谱评分统计校准完成，修正 {updated} 个菜谱")
+        return updated
+
+    @staticmethod
+    async def _flush(recipes_collection, operations: List[UpdateOne]) -> int:
+        result = await recipes_collection.bulk_write(operations, ordered=False)
+        return result.modified_count
+
+    async def _acquire_run(self) -> bool:
+        """获取本轮校准的执行权(锁在一个校准周期后自动过期，不主动释放)"""
+        try:
+            redis = await get_redis()
+            ttl = max(settings.RATING_RECONCILE_INTERVAL - 1, 1)
+            return bool(await redis.set(self.LOCK_KEY, "1", nx=True, ex=ttl))
+        except Exception as e:
+            logger.warning(f"获取评分校准锁失败，本轮跳过: {str(e)}")
+            return False
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.RATING_RECONCILE_INTERVAL)
+            if not await self._acquire_run():
+                self.skipped_runs += 1
+                continue
+            try:
+                await self.reconcile()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"菜谱评分统计校准失败: {str(e)}")
+
+    async def start(self) -> None:
+        """启动定期校准(应用启动时调用，间隔为0时不启动)"""
+        if self._task is None and settings.RATING_RECONCILE_INTERVAL > 0:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止定期校准(应用关闭时调用)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+
+
+# 全局评分校准任务实例
+rating_reconciler = RatingReconciler()
@@ -0,0 +1,329 @@
+"""
+菜谱全文检索模块
+写入时对标题、描述、标签做中文友好的分词(单字+二元组)，查询时走索引而不是无锚点的正则扫描
+
+支持可插拔的检索后端:
+- mongo: 将分词结果写入菜谱文档的searchIndex字段，并在其上建立MongoDB文本索引(按textScore排序)
+- memory: 进程内倒排索引，用于测试或无MongoDB文本索引的环境
+
+多个词条的查询要求全部词条都匹配。应用启动时为尚未建立索引的菜谱补建索引，
+也可以单独执行全量重建:
+    python -m app.services.recipe_search
+"""
+import asyncio
+import logging
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import ObjectId
+
+from app.core.config import settings
+from app.db.mongodb import get_collection, connect_to_mongo, close_mongo_connection, RECIPES_COLLECTION
+
+logger = logging.getLogger(__name__)
+
+# 菜谱文档中存放分词结果的字段名
+SEARCH_INDEX_FIELD = "searchIndex"
+
+# MongoDB文本索引名称及字段权重
+SEARCH_TEXT_INDEX_NAME = "recipe_search_text"
+SEARCH_FIELD_WEIGHTS = {
+    "title": 10,
+    "tags": 5,
+    "description": 2,
+}
+
+# 匹配连续的中日韩统一表意文字，或连续的字母数字
+_TOKEN_SEGMENT_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[a-z0-9]+")
+_CJK_RE = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def _is_cjk(segment: str) -> bool:
+    return bool(_CJK_RE.match(segment))
+
+
+def tokenize(text: Optional[str], for_query: bool = False) -> List[str]:
+    """
+    中文友好的分词
+
+    中文片段切分为二元组(bigram)，英文和数字按单词切分并转小写。
+    建立索引时额外保留中文单字，使单字查询(如"鱼")也能命中；
+    查询时只使用二元组，以保证多字关键词的精确度。
+
+    Args:
+        text: 待分词文本
+        for_query: 是否为查询分词
+
+    Returns:
+        去重后保持原顺序的词条列表
+    """
+    if not text:
+        return []
+
+    tokens: List[str] = []
+    for segment in _TOKEN_SEGMENT_RE.findall(text.lower()):
+        if not _is_cjk(segment):
+            tokens.append(segment)
+            continue
+
+        if len(segment) == 1:
+            tokens.append(segment)
+            continue
+
+        if not for_query:
+            tokens.extend(segment)
+        tokens.extend(segment[i:i + 2] for i in range(len(segment) - 1))
+
+    return list(dict.fromkeys(tokens))
+
+
+def build_search_fields(recipe: Dict[str, Any]) -> Dict[str, str]:
+    """
+    根据菜谱文档构建各检索字段的分词文本
+
+    Args:
+        recipe: 菜谱文档(至少包含title/description/tags中的部分字段)
+
+    Returns:
+        {字段名: 以空格分隔的词条}
+    """
+    tags = recipe.get("tags") or []
+    sources = {
+        "title": recipe.get("title") or "",
+        "tags": " ".join(str(tag) for tag in tags),
+        "description": recipe.get("description") or "",
+    }
+    return {name: " ".join(tokenize(text)) for name, text in sources.items()}
+
+
+def search_source_changed(update_doc: Dict[str, Any]) -> bool:
+    """判断更新内容是否涉及检索字段"""
+    return any(name in update_doc for name in SEARCH_FIELD_WEIGHTS)
+
+
+@dataclass
+class SearchClause:
+    """检索后端为一次关键词查询生成的查询片段"""
+    # 合并到find查询条件中的过滤条件
+    filter: Dict[str, Any] = field(default_factory=dict)
+    # 按相关度排序时使用的排序规则(为None表示后端不支持数据库内排序)
+    sort: Optional[List[Tuple[str, Any]]] = None
+    # 按相关度排序时需要附加的投影
+    projection: Optional[Dict[str, Any]] = None
+    # 后端在进程内计算出的相关度得分 {菜谱ID: 得分}
+    scores: Dict[str, float] = field(default_factory=dict)
+
+
+class SearchBackend:
+    """检索后端基类"""
+
+    name = "base"
+
+    def build_index_fields(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        """返回需要随菜谱文档一起写入的索引字段"""
+        return {}
+
+    async def index_recipe(self, recipe_id: str, recipe: Dict[str, Any]) -> None:
+        """菜谱写入后更新外部索引"""
+        return None
+
+    async def remove_recipe(self, recipe_id: str) -> None:
+        """从索引中移除菜谱"""
+        return None
+
+    async def build_clause(self, keyword: str) -> Optional[SearchClause]:
+        """为关键词生成查询片段，关键词无有效词条时返回None"""
+        raise NotImplementedError
+
+    async def ensure_indexes(self) -> None:
+        """创建后端需要的数据库索引"""
+        return None
+
+    def unindexed_filter(self) -> Dict[str, Any]:
+        """尚未建立检索索引的菜谱的查询条件(进程内索引每次启动都需要全部重建)"""
+        return {}
+
+
+class MongoTextSearchBackend(SearchBackend):
+    """
+    基于MongoDB文本索引的检索后端
+
+    分词结果写入searchIndex子文档，文本索引使用language "none"，
+    因此预先分好的中文二元组会被原样当作词条处理
+    """
+
+    name = "mongo"
+
+    def build_index_fields(self, recipe: Dict[str, Any]) -> Dict[str, Any]:
+        return {SEARCH_INDEX_FIELD: build_search_fields(recipe)}
+
+    async def build_clause(self, keyword: str) -> Optional[SearchClause]:
+        terms = tokenize(keyword, for_query=True)
+        if not terms:
+            return None
+        # 每个词条作为短语加引号，$text 要求所有短语都匹配(不加引号时任一词条匹配即可)
+        return SearchClause(
+            filter={"$text": {"$search": " ".join(f'"{term}"' for term in terms)}},
+            sort=[("score", {"$meta": "textScore"})],
+            projection={"score": {"$meta": "textScore"}},
+        )
+
+    async def ensure_indexes(self) -> None:
+        recipes_collection = get_collection(RECIPES_COLLECTION)
+        await recipes_collection.create_index(
+            [(f"{SEARCH_INDEX_FIELD}.{name}", "text") for name in SEARCH_FIELD_WEIGHTS],
+            name=SEARCH_TEXT_INDEX_NAME,
+            weights={f"{SEARCH_INDEX_FIELD}.{name}": weight for name, weight in SEARCH_FIELD_WEIGHTS.items()},
+            default_language="none",
+        )
+
+    def unindexed_filter(self) -> Dict[str, Any]:
+        return {SEARCH_INDEX_FIELD: {"$exists": False}}
+
+
+class InMemorySearchBackend(SearchBackend):
+    """
+    进程内倒排索引检索后端
+
+    词条 -> {菜谱ID: 权重}，查询时累加各词条权重作为相关度得分
+    """
+
+    name = "memory"
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._documents: Dict[str, List[str]] = {}
+
+    async def index_recipe(self, recipe_id: str, recipe: Dict[str, Any]) -> None:
+        await self.remove_recipe(recipe_id)
+        indexed_terms = set()
+        for name, text in build_search_fields(recipe).items():
+            weight = SEARCH_FIELD_WEIGHTS[name]
+            for term in text.split():
+                postings = self._postings[term]
+                postings[recipe_id] = postings.get(recipe_id, 0) + weight
+                indexed_terms.add(term)
+        self._documents[recipe_id] = list(indexed_terms)
+
+    async def remove_recipe(self, recipe_id: str) -> None:
+        for term in self._documents.pop(recipe_id, []):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(recipe_id, None)
+            if not postings:
+                del self._postings[term]
+
+    def score(self, keyword: str) -> Dict[str, float]:
+        """计算关键词对各菜谱的相关度得分(只包含匹配全部词条的菜谱)"""
+        terms = set(tokenize(keyword, for_query=True))
+        scores: Dict[str, float] = defaultdict(float)
+        matched: Dict[str, int] = defaultdict(int)
+        for term in terms:
+            for recipe_id, weight in self._postings.get(term, {}).items():
+                scores[recipe_id] += weight
+                matched[recipe_id] += 1
+        return {recipe_id: score for recipe_id, score in scores.items() if matched[recipe_id] == len(terms)}
+
+    async def build_clause(self, keyword: str) -> Optional[SearchClause]:
+        if not tokenize(keyword, for_query=True):
+            return None
+        scores = self.score(keyword)
+        object_ids = [ObjectId(recipe_id) for recipe_id in scores if ObjectId.is_valid(recipe_id)]
+        return SearchClause(filter={"_id": {"$in": object_ids}}, scores=scores)
+
+    def clear(self) -> None:
+        self._postings.clear()
+        self._documents.clear()
+
+
+_SEARCH_BACKENDS = {
+    MongoTextSearchBackend.name: MongoTextSearchBackend,
+    InMemorySearchBackend.name: InMemorySearchBackend,
+}
+
+# 全局检索后端实例
+_search_backend: Optional[SearchBackend] = None
+
+
+def get_search_backend() -> SearchBackend:
+    """
+    获取当前检索后端实例，根据settings.SEARCH_BACKEND延迟创建
+    """
+    global _search_backend
+
+    if _search_backend is None:
+        backend_cls = _SEARCH_BACKENDS.get(settings.SEARCH_BACKEND)
+        if backend_cls is None:
+            logger.warning(f"未知的检索后端 {settings.SEARCH_BACKEND}，使用mongo后端")
+            backend_cls = MongoTextSearchBackend
+        _search_backend = backend_cls()
+    return _search_backend
+
+
+def set_search_backend(backend: SearchBackend) -> None:
+    """替换当前检索后端(主要用于测试)"""
+    global _search_backend
+    _search_backend = backend
+
+
+async def rebuild_search_index(batch_size: int = 500, query: Optional[Dict[str, Any]] = None) -> int:
+    """
+    为已有菜谱重建检索索引
+
+    Args:
+        batch_size: 每批读取的菜谱数量
+        query: 只处理符合条件的菜谱，默认处理全部
+
+    Returns:
+        处理的菜谱数量
+    """
+    backend = get_search_backend()
+    recipes_collection = get_collection(RECIPES_COLLECTION)
+    projection = {"title": 1, "description": 1, "tags": 1}
+
+    count = 0
+    cursor = recipes_collection.find(query or {}, projection).batch_size(batch_size)
+    async for recipe in cursor:
+        recipe_id = str(recipe["_id"])
+        index_fields = backend.build_index_fields(recipe)
+        if index_fields:
+            await recipes_collection.update_one({"_id": recipe["_id"]}, {"$set": index_fields})
+        await backend.index_recipe(recipe_id, recipe)
+        count += 1
+
+    logger.info(f"检索索引重建完成，共处理 {count} 个菜谱")
+    return count
+
+
+async def ensure_search_index() -> int:
+    """
+    为尚未建立检索索引的菜谱补建索引(可重复执行，应用启动时调用)
+
+    Returns:
+        处理的菜谱数量
+    """
+    backend = get_search_backend()
+    query = backend.unindexed_filter()
+    if query:
+        recipes_collection = get_collection(RECIPES_COLLECTION)
+        if await recipes_collection.count_documents(query, limit=1) == 0:
+            return 0
+    return await rebuild_search_index(query=query)
+
+
+async def main():
+    """命令行入口: 为全部菜谱重建检索索引"""
+    logging.basicConfig(level=logging.INFO)
+    await connect_to_mongo()
+    try:
+        await get_search_backend().ensure_indexes()
+        await rebuild_search_index()
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -4,6 +4,11 @@ from bson import ObjectId
 from fastapi import HTTPException, status
 
 from app.db.mongodb import get_database
+from app.utils.pagination import fetch_page
+from app.utils.projections import resolve_projection
+from app.services.family_membership import is_member, families_of, require_family_member
+from app.services.ingredient_aggregation import aggregate_dishes
+from app.services.shopping_list_generation import load_generation_sources
 from app.models.shopping_list import (
     ShoppingListCreate,
     ShoppingListUpdate,
@@ -32,25 +37,7 @@ async def create_shopping_list(list_data: ShoppingListCreate, current_user: dict
     db = await get_database()
     
     # 验证家庭存在并且用户是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(list_data.familyId)})
-    if not family:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="家庭不存在"
-        )
-    
-    # 检查用户是否是家庭成员
-    is_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_member = True
-            break
-    
-    if not is_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="用户不是该家庭成员"
-        )
+    await require_family_member(list_data.familyId, current_user)
     
     # 如果指定了关联的菜单计划，验证其存在
     if list_data.planId:
@@ -132,26 +119,18 @@ async def get_shopping_list_by_id(list_id: str, current_user: dict) -> Optional[
     
     # 检查访问权限
     # 1. 用户是否是创建者(通过家庭成员关系)
-    family = await db.families.find_one({"_id": ObjectId(shopping_list["familyId"])})
-    if family:
-        is_family_member = False
-        for member in family.get("members", []):
-            if str(member.get("userId")) == str(current_user["_id"]):
-                is_family_member = True
+    is_family_member = await is_member(current_user["_id"], shopping_list["familyId"])
+    
+    if not is_family_member:
+        # 2. 用户是否在共享列表中
+        is_shared = False
+        for share in shopping_list.get("sharedWith", []):
+            if str(share.get("userId")) == str(current_user["_id"]):
+                is_shared = True
                 break
         
-        if not is_family_member:
-            # 2. 用户是否在共享列表中
-            is_shared = False
-            for share in shopping_list.get("sharedWith", []):
-                if str(share.get("userId")) == str(current_user["_id"]):
-                    is_shared = True
-                    break
-            
-            if not is_shared:
-                return None
-    else:
-        return None
+        if not is_shared:
+            return None
     
     # 转换_id为字符串
     shopping_list["id"] = str(shopping_list.pop("_id"))
@@ -188,16 +167,7 @@ async def update_shopping_list(list_id: str, list_data: ShoppingListUpdate, curr
     
     # 检查更新权限
     # 1. 用户是否是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(shopping_list["familyId"])})
-    
-    if not family:
-        return None
-    
-    is_family_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_family_member = True
-            break
+    is_family_member = await is_member(current_user["_id"], shopping_list["familyId"])
     
     if not is_family_member:
         # 2. 用户是否在共享列表中且有写权限
@@ -285,16 +255,7 @@ async def add_item_to_shopping_list(list_id: str, item_data: ShoppingItemAdd, cu
     
     # 检查权限
     # 1. 用户是否是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(shopping_list["familyId"])})
-    
-    if not family:
-        return None
-    
-    is_family_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_family_member = True
-            break
+    is_family_member = await is_member(current_user["_id"], shopping_list["familyId"])
     
     if not is_family_member:
         # 2. 用户是否在共享列表中且有写权限
@@ -389,16 +350,7 @@ async def update_shopping_item(
     
     # 检查权限
     # 1. 用户是否是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(shopping_list["familyId"])})
-    
-    if not family:
-        return None
-    
-    is_family_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_family_member = True
-            break
+    is_family_member = await is_member(current_user["_id"], shopping_list["familyId"])
     
     if not is_family_member:
         # 2. 用户是否在共享列表中且有写权限
@@ -500,16 +452,7 @@ async def batch_update_items(
     
     # 检查权限
     # 1. 用户是否是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(shopping_list["familyId"])})
-    
-    if not family:
-        return None
-    
-    is_family_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_family_member = True
-            break
+    is_family_member = await is_member(current_user["_id"], shopping_list["familyId"])
     
     if not is_family_member:
         # 2. 用户是否在共享列表中且有写权限
@@ -559,123 +502,32 @@ async def generate_shopping_list(generate_data: ShoppingListGenerateRequest, cur
     db = await get_database()
     
     # 验证家庭存在并且用户是家庭成员
-    family = await db.families.find_one({"_id": ObjectId(generate_data.familyId)})
-    if not family:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="家庭不存在"
-        )
-    
-    is_member = False
-    for member in family.get("members", []):
-        if str(member.get("userId")) == str(current_user["_id"]):
-            is_member = True
-            break
-    
-    if not is_member:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="用户不是该家庭成员"
-        )
+    await require_family_member(generate_data.familyId, current_user)
     
-    # 收集所有指定菜单计划中的菜品和食材
-    all_ingredients = []
-    
-    for plan_id in generate_data.planIds:
-        try:
-            plan = await db.menu_plans.find_one({"_id": ObjectId(plan_id)})
-            if not plan:
-                continue
-            
-            # 确保菜单计划属于指定家庭
-            if plan["familyId"] != generate_data.familyId:
-                continue
-            
-            # 遍历所有餐点和菜品
-            for meal in plan.get("meals", []):
-                for dish in meal.get("dishes", []):
-                    # 获取菜谱详情
-                    recipe = await db.recipes.find_one({"_id": ObjectId(dish["recipeId"])})
-                    if not recipe:
-                        continue
-                    
-                    # 计算食材数量
-                    servings_ratio = dish["servings"] / recipe.get("servings", 1)
-                    
-                    # 收集食材
-                    for ingredient in recipe.get("ingredients", []):
-                        # 跳过可选食材
-                        if ingredient.get("optional", False):
-                            continue
-                        
-                        # 计算调整后的食材数量
-                        adjusted_amount = None
-                        if ingredient.get("amount") is not None:
-                            adjusted_amount = ingredient["amount"] * servings_ratio
-                        
-                        # 创建购物项目
-                        shopping_item = {
-                            "name": ingredient["name"],
-                            "recipeId": dish["recipeId"],
-                            "planId": plan_id,
-                            "category": ingredient.get("category"),
-                            "amount": adjusted_amount,
-                            "unit": ingredient.get("unit"),
-                            "price": None,
-                            "note": ingredient.get("note"),
-                            "status": ShoppingItemStatus.PENDING,
-                            "checked": False
-                        }
-                        
-                        all_ingredients.append(shopping_item)
-        except Exception as e:
-            # 如果处理某个菜单计划出错，继续处理下一个
-            continue
-    
-    # 合并相同食材
-    merged_ingredients = {}
-    
-    for item in all_ingredients:
-        key = f"{item['name']}_{item.get('unit')}"
-        
-        if key in merged_ingredients:
-            # 合并数量
-            if item["amount"] is not None:
-                if merged_ingredients[key]["amount"] is None:
-                    merged_ingredients[key]["amount"] = item["amount"]
-                else:
-                    merged_ingredients[key]["amount"] += item["amount"]
-            
-            # 合并来源
-            source_recipes = merged_ingredients[key].get("recipeIds", [])
-            if item["recipeId"] not in source_recipes:
-                source_recipes.append(item["recipeId"])
-                merged_ingredients[key]["recipeIds"] = source_recipes
-            
-            # 合并备注
-            if item.get("note") and item["note"] not in merged_ingredients[key].get("notes", []):
-                merged_ingredients[key].setdefault("notes", []).append(item["note"])
-        else:
-            # 新项目
-            merged_item = item.copy()
-            merged_item["recipeIds"] = [item["recipeId"]] if item["recipeId"] else []
-            merged_item["notes"] = [item["note"]] if item.get("note") else []
-            merged_ingredients[key] = merged_item
+    # 批量读取菜单计划(仅限指定家庭)和去重后的菜谱食材
+    plans, dishes, recipes = await load_generation_sources(
+        db,
+        generate_data.planIds,
+        plan_query={"familyId": generate_data.familyId}
+    )
     
-    # 处理合并后的食材列表
+    # 合并相同食材(名称同义词归一、单位换算后累加)
     processed_items = []
     
-    for key, item in merged_ingredients.items():
-        # 删除临时字段
-        if "recipeIds" in item:
-            del item["recipeIds"]
-        
-        # 合并备注
-        if "notes" in item:
-            item["note"] = "; ".join(item["notes"])
-            del item["notes"]
-        
-        processed_items.append(item)
+    for ingredient in aggregate_dishes(dishes, recipes):
+        amount, unit = ingredient.display()
+        processed_items.append({
+            "name": ingredient.name,
+            "recipeId": ingredient.recipe_ids[0] if ingredient.recipe_ids else None,
+            "planId": ingredient.plan_ids[0] if ingredient.plan_ids else None,
+            "category": ingredient.category,
+            "amount": round(amount, 2) if amount is not None else None,
+            "unit": unit,
+            "price": None,
+            "note": "; ".join(ingredient.notes),
+            "status": ShoppingItemStatus.PENDING,
+            "checked": False
+        })
     
     # 创建购物清单
     now = datetime.now()
@@ -715,7 +567,7 @@ async def generate_shopping_list(generate_data: ShoppingListGenerateRequest, cur
 async def get_family_shopping_lists(
     params: ShoppingListListParams, 
     current_user: dict
-) -> Tuple[List[dict], int]:
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
     """
     获取家庭的购物清单列表
     
@@ -724,7 +576,7 @@ async def get_family_shopping_lists(
         current_user: 当前用户信息
         
     Returns:
-        购物清单列表和总数
+        购物清单列表、总数(游标模式下可能为None)和下一页游标
     """
     db = await get_database()
     
@@ -734,35 +586,12 @@ async def get_family_shopping_lists(
     # 家庭ID过滤
     if params.familyId:
         # 验证家庭存在并且用户是家庭成员
-        family = await db.families.find_one({"_id": ObjectId(params.familyId)})
-        if not family:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="家庭不存在"
-            )
-        
-        # 检查用户是否是家庭成员
-        is_member = False
-        for member in family.get("members", []):
-            if str(member.get("userId")) == str(current_user["_id"]):
-                is_member = True
-                break
-        
-        if not is_member and "admin" not in current_user.get("roles", []):
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail="用户不是该家庭成员"
-            )
+        await require_family_member(params.familyId, current_user, allow_admin=True)
         
         query["familyId"] = params.familyId
     else:
         # 获取用户所有家庭的购物清单，以及用户有权访问的共享购物清单
-        families = await db.families.find(
-            {"members.userId": str(current_user["_id"])},
-            {"_id": 1}
-        ).to_list(length=100)
-        
-        family_ids = [str(family["_id"]) for family in families]
+        family_ids = await families_of(current_user["_id"])
         
         if family_ids:
             query["$or"] = [
@@ -785,23 +614,22 @@ async def get_family_shopping_lists(
     if date_filter:
         query["date"] = date_filter
     
-    # 计算分页参数
-    skip = (params.page - 1) * params.pageSize
-    limit = params.pageSize
-    
-    # 查询总数
-    total = await db.shopping_lists.count_documents(query)
-    
-    # 执行查询
-    cursor = db.shopping_lists.find(query)
-    cursor = cursor.sort("date", -1)  # 默认按日期降序排序
-    cursor = cursor.skip(skip).limit(limit)
-    
-    # 获取结果
-    lists = await cursor.to_list(length=limit)
+    # 分页查询，默认按日期降序排序
+    lists, total, next_cursor = await fetch_page(
+        db.shopping_lists,
+        query,
+        "date",
+        -1,
+        page=params.page,
+        page_size=params.pageSize,
+        cursor=params.cursor,
+        cursor_mode=params.useCursor,
+        include_total=params.includeTotal,
+        projection=resolve_projection("shoppingList", params.fields, required=("date",))
+    )
     
     # 处理结果
     for shopping_list in lists:
         shopping_list["id"] = str(shopping_list.pop("_id"))
     
-    return lists, total 
\ No newline at end of file
+    return lists, total, next_cursor 
\ No newline at end of file
@@ -0,0 +1,136 @@
+"""
+购物清单生成数据准备
+从菜单计划生成购物清单时，批量读取菜单计划和菜谱食材:
+所有菜单计划一次 $in 查询，所有去重后的菜谱一次带投影的 $in 查询，之后在内存中汇总
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+
+logger = logging.getLogger(__name__)
+
+# 生成购物清单只需要的菜单计划字段
+PLAN_DISH_PROJECTION = {
+    "familyId": 1,
+    "family_id": 1,
+    "meals.dishes.recipeId": 1,
+    "meals.dishes.servings": 1,
+}
+
+# 生成购物清单只需要的菜谱字段
+RECIPE_INGREDIENT_PROJECTION = {
+    "ingredients": 1,
+    "servings": 1,
+}
+
+
+def _to_object_ids(ids: Iterable[str]) -> List[ObjectId]:
+    """转换为ObjectId列表，跳过无效ID并去重(保持顺序)"""
+    object_ids = []
+    seen = set()
+    for value in ids:
+        value = str(value) if value is not None else ""
+        if value in seen or not ObjectId.is_valid(value):
+            continue
+        seen.add(value)
+        object_ids.append(ObjectId(value))
+    return object_ids
+
+
+async def fetch_plans(
+    menu_plans_collection,
+    plan_ids: List[str],
+    extra_query: Optional[Dict[str, Any]] = None,
+    projection: Optional[Dict[str, Any]] = None
+) -> List[Dict[str, Any]]:
+    """
+    一次查询批量获取菜单计划，按plan_ids的顺序返回
+
+    Args:
+        menu_plans_collection: 菜单计划集合
+        plan_ids: 菜单计划ID列表
+        extra_query: 额外的过滤条件(如家庭或权限限制)
+        projection: 字段投影，默认只取菜品相关字段
+
+    Returns:
+        菜单计划列表(已将_id转换为字符串id)
+    """
+    object_ids = _to_object_ids(plan_ids)
+    if not object_ids:
+        return []
+
+    query: Dict[str, Any] = {"_id": {"$in": object_ids}}
+    if extra_query:
+        query.update(extra_query)
+
+    cursor = menu_plans_collection.find(query, projection or PLAN_DISH_PROJECTION)
+    plans = await cursor.to_list(length=len(object_ids))
+
+    plans_by_id = {}
+    for plan in plans:
+        plan["id"] = str(plan.pop("_id"))
+        plans_by_id[plan["id"]] = plan
+    return [plans_by_id[str(oid)] for oid in object_ids if str(oid) in plans_by_id]
+
+
+def collect_dishes(plans: List[Dict[str, Any]]) -> List[Tuple[str, str, float]]:
+    """
+    展开菜单计划中的所有菜品
+
+    Returns:
+        [(菜单计划ID, 菜谱ID, 份数)]
+    """
+    dishes = []
+    for plan in plans:
+        for meal in plan.get("meals", []) or []:
+            for dish in meal.get("dishes", []) or []:
+                recipe_id = dish.get("recipeId")
+                if recipe_id:
+                    dishes.append((plan["id"], str(recipe_id), dish.get("servings", 1)))
+    return dishes
+
+
+async def fetch_recipe_ingredients(
+    recipes_collection,
+    recipe_ids: Iterable[str]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    一次查询批量获取去重后的菜谱食材
+
+    Args:
+        recipes_collection: 菜谱集合
+        recipe_ids: 菜谱ID(可重复)
+
+    Returns:
+        {菜谱ID: 菜谱(仅包含ingredients和servings)}
+    """
+    object_ids = _to_object_ids(recipe_ids)
+    if not object_ids:
+        return {}
+
+    cursor = recipes_collection.find({"_id": {"$in": object_ids}}, RECIPE_INGREDIENT_PROJECTION)
+    recipes = await cursor.to_list(length=len(object_ids))
+    return {str(recipe.pop("_id")): recipe for recipe in recipes}
+
+
+async def load_generation_sources(
+    db,
+    plan_ids: List[str],
+    plan_query: Optional[Dict[str, Any]] = None
+) -> Tuple[List[Dict[str, Any]], List[Tuple[str, str, float]], Dict[str, Dict[str, Any]]]:
+    """
+    读取生成购物清单所需的全部数据(两次查询)
+
+    Args:
+        db: 数据库连接
+        plan_ids: 菜单计划ID列表
+        plan_query: 菜单计划的额外过滤条件
+
+    Returns:
+        (菜单计划列表, 菜品列表, {菜谱ID: 菜谱})
+    """
+    plans = await fetch_plans(db.menu_plans, plan_ids, plan_query)
+    dishes = collect_dishes(plans)
+    recipes = await fetch_recipe_ingredients(db.recipes, (recipe_id for _, recipe_id, _ in dishes))
+    return plans, dishes, recipes
@@ -10,8 +10,11 @@ from app.models.shopping_list import (
     ShoppingListItemCreate,
     ShoppingListItemUpdate,
     ShoppingListStatus,
-    ShoppingListItemResponse
+    ShoppingListItemResponse,
+    ShoppingItemCategory
 )
+from app.services.ingredient_aggregation import aggregate_dishes
+from app.services.shopping_list_generation import load_generation_sources
 
 
 class ShoppingListService:
@@ -528,6 +531,14 @@ class ShoppingListService:
         
         return updated_list
     
+    @staticmethod
+    def _item_category(category: Optional[str]) -> ShoppingItemCategory:
+        """Map a recipe ingredient category onto a shopping item category."""
+        try:
+            return ShoppingItemCategory((category or "").lower())
+        except ValueError:
+            return ShoppingItemCategory.OTHER
+    
     async def generate_shopping_list_from_menu(
         self,
         name: str,
@@ -549,25 +560,17 @@ class ShoppingListService:
         Returns:
             Created shopping list
         """
-        # First, retrieve all the menu plans
-        menu_plans_collection = db.menu_plans
-        
-        menu_plans = []
-        for plan_id in plan_ids:
-            try:
-                plan = await menu_plans_collection.find_one({
-                    "_id": ObjectId(plan_id),
-                    "$or": [
-                        {"creator_id": user_id},
-                        {"collaborators.userId": user_id}
-                    ]
-                })
-                if plan:
-                    plan["id"] = str(plan.pop("_id"))
-                    menu_plans.append(plan)
-            except:
-                # Skip invalid IDs
-                continue
+        # Fetch all accessible plans in one query and all distinct recipes in another
+        menu_plans, dishes, recipes = await load_generation_sources(
+            db,
+            plan_ids,
+            plan_query={
+                "$or": [
+                    {"creator_id": user_id},
+                    {"collaborators.userId": user_id}
+                ]
+            }
+        )
         
         if not menu_plans:
             return None
@@ -576,80 +579,16 @@ class ShoppingListService:
         if not family_id and menu_plans:
             family_id = menu_plans[0].get("family_id")
         
-        # Extract all recipes from the menu plans
-        recipe_ids = []
-        for plan in menu_plans:
-            for meal in plan.get("meals", []):
-                for dish in meal.get("dishes", []):
-                    recipe_id = dish.get("recipeId")
-                    servings = dish.get("servings", 1)
-                    if recipe_id:
-                        recipe_ids.append((recipe_id, servings))
-        
-        # Get recipe details to extract ingredients
-        recipes_collection = db.recipes
-        
-        # Aggregate ingredients from all recipes
-        ingredients_map = {}  # Map of ingredient name to details
-        
-        for recipe_id, servings in recipe_ids:
-            try:
-                recipe = await recipes_collection.find_one({"_id": ObjectId(recipe_id)})
-                if not recipe:
-                    continue
-                
-                # Calculate servings ratio
-                recipe_servings = recipe.get("servings", 1)
-                ratio = servings / recipe_servings if recipe_servings > 0 else 1
-                
-                # Add ingredients with adjusted quantities
-                for ingredient in recipe.get("ingredients", []):
-                    name = ingredient.get("name", "").strip().lower()
-                    if not name:
-                        continue
-                    
-                    # Skip optional ingredients
-                    if ingredient.get("optional", False):
-                        continue
-                    
-                    # Adjust quantity by servings ratio
-                    amount = ingredient.get("amount", 0) * ratio
-                    
-                    # Initialize or update ingredient in the map
-                    if name in ingredients_map:
-                        ingredients_map[name]["amount"] += amount
-                    else:
-                        ingredients_map[name] = {
-                            "name": name,
-                            "amount": amount,
-                            "unit": ingredient.get("unit", ""),
-                            "category": ingredient.get("category", "Other"),
-                            "checked": False,
-                            "note": "",
-                            "sources": []
-                        }
-                    
-                    # Add source info
-                    ingredients_map[name]["sources"].append({
-                        "recipe_id": str(recipe["_id"]),
-                        "title": recipe.get("title", "Unknown Recipe"),
-                        "amount": amount,
-                        "unit": ingredient.get("unit", "")
-                    })
-            except:
-                # Skip problematic recipes
-                continue
-        
-        # Convert ingredients map to list
+        # Merge ingredients across all dishes (name synonyms and unit conversion)
         items = []
-        for ingredient in ingredients_map.values():
+        for ingredient in aggregate_dishes(dishes, recipes):
+            amount, unit = ingredient.display()
             item = ShoppingListItemCreate(
-                name=ingredient["name"].capitalize(),
-                amount=round(ingredient["amount"], 2),
-                unit=ingredient["unit"],
-                category=ingredient["category"],
-                checked=False,
-                note=ingredient.get("note", ""),
+                name=ingredient.name,
+                quantity=round(amount or 0, 2),
+                unit=unit or "",
+                category=self._item_category(ingredient.category),
+                note="; ".join(ingredient.notes),
                 priority="medium"  # Default priority
             )
             items.append(item)
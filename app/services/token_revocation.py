@@ -0,0 +1,231 @@
+"""
+令牌吊销服务
+在Redis黑名单前增加进程内布隆过滤器，绝大多数未吊销的令牌无需访问Redis
+
+- 权威数据仍是Redis中的 token:blacklist:{jti} 键(带过期时间)
+- 吊销记录同时写入有序集合 token:revoked (score为令牌过期时间)，用于各进程定期重建布隆过滤器
+- 登出时通过Redis发布/订阅通知所有进程，立即加入本地布隆过滤器并失效认证用户缓存
+- 只有布隆过滤器命中时才查询Redis确认；过滤器尚未完成同步时退化为每次查询Redis
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.db.redis import get_redis, REDIS_SESSION
+from app.services.user_cache import invalidate_token
+
+logger = logging.getLogger(__name__)
+
+BLACKLIST_KEY_PREFIX = "token:blacklist:"
+REVOKED_SET_KEY = "token:revoked"
+REVOCATION_CHANNEL = "token:revocations"
+
+
+class BloomFilter:
+    """基于bytearray的布隆过滤器(双重哈希)"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.hash_count = max(int(round(self.size / capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.hash_count):
+            yield (h1 + i * h2) % self.size
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class TokenRevocationRegistry:
+    """令牌吊销登记表"""
+
+    def __init__(self):
+        self._bloom = BloomFilter(
+            settings.TOKEN_REVOCATION_BLOOM_CAPACITY,
+            settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE
+        )
+        # 布隆过滤器是否已与Redis完成同步，以及吊销订阅是否在线
+        # 两者都满足时本地判定才可信
+        self._synced = False
+        self._subscribed = False
+        # 正在进行的重建各自记录期间新增的吊销标识，重建完成后并入新过滤器
+        self._pending_syncs: List[set] = []
+        # 定期同步与订阅重连都会调用sync，同一时间只执行一次重建
+        self._sync_lock = asyncio.Lock()
+        self._sync_task: Optional[asyncio.Task] = None
+        self._subscribe_task: Optional[asyncio.Task] = None
+        # 统计: 本地判定未吊销 / 查询Redis 的次数
+        self.local_negatives = 0
+        self.redis_lookups = 0
+
+    async def revoke(self, key: str, expires_at: float, token_id: Optional[str] = None) -> None:
+        """
+        吊销令牌
+
+        Args:
+            key: 吊销标识(jti，旧令牌为完整令牌)
+            expires_at: 令牌过期时间戳，过期后吊销记录自动清理
+            token_id: 认证用户缓存中的令牌标识
+        """
+        ttl = max(int(expires_at - time.time()), 0)
+        redis = await get_redis(REDIS_SESSION)
+        await redis.set(f"{BLACKLIST_KEY_PREFIX}{key}", "1", ex=ttl)
+
+        try:
+            # 先写入有序集合再加入本地过滤器，之后开始的重建一定能读到这条记录
+            await redis.zadd(REVOKED_SET_KEY, {key: expires_at})
+        except Exception as e:
+            logger.warning(f"记录令牌吊销失败: {str(e)}")
+
+        self._add_local(key)
+        if token_id:
+            invalidate_token(token_id)
+
+        try:
+            await redis.publish(REVOCATION_CHANNEL, json.dumps({"key": key, "token_id": token_id}))
+        except Exception as e:
+            # 其他进程会在下一次定期同步时补上
+            logger.warning(f"广播令牌吊销失败: {str(e)}")
+
+    def _add_local(self, key: str) -> None:
+        self._bloom.add(key)
+        for added in self._pending_syncs:
+            added.add(key)
+
+    async def is_revoked(self, key: str) -> bool:
+        """
+        检查令牌是否已吊销，布隆过滤器未命中时直接返回False
+
+        Args:
+            key: 吊销标识
+
+        Returns:
+            是否已吊销
+        """
+        if self._synced and self._subscribed and key not in self._bloom:
+            self.local_negatives += 1
+            return False
+
+        self.redis_lookups += 1
+        redis = await get_redis(REDIS_SESSION)
+        return await redis.get(f"{BLACKLIST_KEY_PREFIX}{key}") is not None
+
+    async def sync(self) -> None:
+        """从Redis有序集合重建布隆过滤器，并清理已过期的吊销记录"""
+        async with self._sync_lock:
+            await self._rebuild()
+
+    async def _rebuild(self) -> None:
+        redis = await get_redis(REDIS_SESSION)
+        now = time.time()
+        added = set()
+        self._pending_syncs.append(added)
+        try:
+            await redis.zremrangebyscore(REVOKED_SET_KEY, "-inf", now)
+            keys = await redis.zrangebyscore(REVOKED_SET_KEY, now, "+inf")
+
+            capacity = max(settings.TOKEN_REVOCATION_BLOOM_CAPACITY, len(keys) * 2)
+            bloom = BloomFilter(capacity, settings.TOKEN_REVOCATION_BLOOM_ERROR_RATE)
+            for key in keys:
+                bloom.add(key.decode("utf-8") if isinstance(key, bytes) else key)
+            # 替换过滤器之前不再等待，期间新增的标识全部在added中
+            for key in added:
+                bloom.add(key)
+            self._bloom = bloom
+            self._synced = True
+        finally:
+            self._pending_syncs.remove(added)
+
+        logger.debug(f"令牌吊销布隆过滤器已同步，共 {len(keys)} 条记录")
+
+    async def _sync_loop(self) -> None:
+        while True:
+            try:
+                await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 同步失败时退化为逐次查询Redis，保证不会放过已吊销的令牌
+                self._synced = False
+                logger.warning(f"同步令牌吊销列表失败: {str(e)}")
+            await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_INTERVAL)
+
+    async def _subscribe_loop(self) -> None:
+        while True:
+            pubsub = None
+            try:
+                redis = await get_redis(REDIS_SESSION)
+                pubsub = redis.pubsub()
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                # 订阅建立后重新同步一次，补上订阅中断期间的吊销记录
+                await self.sync()
+                self._subscribed = True
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    self._handle_message(message.get("data"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"令牌吊销订阅中断: {str(e)}")
+                await asyncio.sleep(settings.TOKEN_REVOCATION_SYNC_INTERVAL)
+            finally:
+                self._subscribed = False
+                if pubsub is not None:
+                    try:
+                        await pubsub.close()
+                    except Exception:
+                        pass
+
+    def _handle_message(self, data) -> None:
+        try:
+            if isinstance(data, bytes):
+                data = data.decode("utf-8")
+            payload = json.loads(data)
+        except Exception:
+            logger.warning(f"无效的令牌吊销消息: {data!r}")
+            return
+
+        if payload.get("key"):
+            self._add_local(payload["key"])
+        if payload.get("token_id"):
+            invalidate_token(payload["token_id"])
+
+    async def start(self) -> None:
+        """启动定期同步和吊销订阅(应用启动时调用)"""
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+        if self._subscribe_task is None:
+            self._subscribe_task = asyncio.create_task(self._subscribe_loop())
+
+    async def stop(self) -> None:
+        """停止后台任务(应用关闭时调用)"""
+        for task in (self._sync_task, self._subscribe_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._sync_task = None
+        self._subscribe_task = None
+        self._synced = False
+        self._subscribed = False
+
+
+# 全局令牌吊销登记表实例
+token_revocation = TokenRevocationRegistry()
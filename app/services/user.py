@@ -8,6 +8,8 @@ from app.core.exceptions import NotFoundError, DatabaseError
 from app.db.mongodb import get_collection, USERS_COLLECTION, get_database
 from app.models.user import User, UserProfile, Gender,UserCreate, UserUpdate
 from app.utils.mongodb_utils import MongoDBUtils
+from app.services.user_cache import invalidate_user as invalidate_cached_user
+from app.services.comment_authors import invalidate_author
 
 logger = logging.getLogger(__name__)
 
@@ -182,6 +184,8 @@ async def update_user(user_id: str, update_data: Dict[str, Any]) -> Optional[Dic
         {"_id": user_id},
         {"$set": update_data}
     )
+    invalidate_cached_user(user_id)
+    invalidate_author(user_id)
     
     # 返回更新后的用户信息
     updated_user = await user_collection.find_one({"_id": user_id})
@@ -235,6 +239,8 @@ async def delete_user(user_id: str) -> bool:
         
         # 执行删除
         result = await user_collection.delete_one({"_id": ObjectId(user_id)})
+        invalidate_cached_user(user_id)
+        invalidate_author(user_id)
         return result.deleted_count > 0
     except NotFoundError:
         raise
@@ -257,6 +263,34 @@ async def update_user_last_login(user_id: str) -> None:
         print(f"更新用户最后登录时间失败: {str(e)}")
 
 
+async def update_password_hash(user_id: Any, old_hash: str, new_hash: str) -> bool:
+    """
+    升级用户的密码哈希(登录时哈希参数已调整)
+
+    只在已保存的哈希仍为 old_hash 时写入，避免覆盖并发修改的密码
+
+    Args:
+        user_id: 用户ID(ObjectId)
+        old_hash: 登录时读取的哈希
+        new_hash: 新的哈希
+
+    Returns:
+        是否已更新
+    """
+    try:
+        user_collection = get_collection(USERS_COLLECTION)
+        result = await user_collection.update_one(
+            {"_id": user_id, "password_hash": old_hash},
+            {"$set": {"password_hash": new_hash}}
+        )
+        invalidate_cached_user(user_id)
+        return result.modified_count > 0
+    except Exception as e:
+        # 升级失败不影响登录，下次登录时重试
+        logger.warning(f"升级密码哈希失败: {str(e)}")
+        return False
+
+
 async def update_user_stats(user_id: str, stat_type: str, value: int = 1) -> Dict[str, Any]:
     """
     更新用户统计数据
@@ -383,4 +417,7 @@ async def update_user_profile(user_id: str, profile_data: Dict[str, Any]) -> Dic
         "updated_at": datetime.utcnow()
     }
     
-    return await MongoDBUtils.update_document(user_collection, user_id, update_data) 
\ No newline at end of file
+    updated_user = await MongoDBUtils.update_document(user_collection, user_id, update_data)
+    invalidate_cached_user(user_id)
+    invalidate_author(user_id)
+    return updated_user 
\ No newline at end of file
@@ -0,0 +1,73 @@
+"""
+已认证用户上下文缓存
+按 (用户ID, 令牌jti) 缓存认证通过的用户文档，避免每个请求都查询黑名单和用户集合
+
+用户信息变更、删除或令牌登出时需要显式失效
+"""
+import hashlib
+import logging
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# 缓存键: (用户ID, 令牌标识)
+UserCacheKey = Tuple[str, str]
+
+_user_cache = TTLCache(
+    maxsize=settings.AUTH_USER_CACHE_SIZE,
+    ttl=settings.AUTH_USER_CACHE_TTL
+)
+
+
+def token_identifier(token: str, payload: Dict[str, Any]) -> str:
+    """
+    获取令牌标识，优先使用jti，旧令牌没有jti时使用令牌摘要
+
+    Args:
+        token: 原始令牌
+        payload: 已解码的令牌内容
+
+    Returns:
+        令牌标识
+    """
+    jti = payload.get("jti")
+    if jti:
+        return str(jti)
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def get_cached_user(user_id: str, token_id: str) -> Optional[Dict[str, Any]]:
+    """读取缓存的用户文档(返回浅拷贝，避免调用方修改缓存内容)"""
+    user = _user_cache.get((str(user_id), token_id))
+    return dict(user) if user is not None else None
+
+
+def cache_user(user_id: str, token_id: str, user: Dict[str, Any]) -> None:
+    """缓存认证通过的用户文档"""
+    _user_cache.set((str(user_id), token_id), dict(user))
+
+
+def invalidate_user(user_id: Any) -> None:
+    """失效某个用户的全部缓存条目(用户信息更新或删除时调用)"""
+    user_id = str(user_id)
+    removed = _user_cache.delete_where(lambda key: key[0] == user_id)
+    if removed:
+        logger.debug(f"已失效用户 {user_id} 的 {removed} 条认证缓存")
+
+
+def invalidate_token(token_id: str) -> None:
+    """失效某个令牌对应的缓存条目(登出时调用)"""
+    _user_cache.delete_where(lambda key: key[1] == token_id)
+
+
+def clear_user_cache() -> None:
+    """清空用户缓存"""
+    _user_cache.clear()
+
+
+def user_cache_stats() -> Dict[str, int]:
+    """用户缓存命中统计"""
+    return _user_cache.stats()
@@ -0,0 +1,172 @@
+"""
+菜谱浏览计数(写回缓冲)
+菜谱详情的浏览次数先在内存(或Redis哈希 HINCRBY)中累加，
+由后台任务按固定间隔以一次 bulk_write 的 $inc 操作批量写回 MongoDB，
+详情接口不再为每次浏览单独执行一次更新
+
+- memory: 每个进程各自累加，进程异常退出时会丢失未写回的计数
+- redis: 所有进程累加到同一个哈希，写回时先 RENAME 为临时键再读取，避免与新的累加相互覆盖
+"""
+import asyncio
+import logging
+import time
+import uuid
+from collections import defaultdict
+from typing import Dict, Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.core.config import settings
+from app.db.mongodb import get_collection, RECIPES_COLLECTION
+from app.db.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+PENDING_VIEWS_KEY = "recipe:views:pending"
+FLUSHING_VIEWS_KEY_PREFIX = "recipe:views:flushing:"
+
+
+class ViewCounter:
+    """菜谱浏览次数写回缓冲"""
+
+    def __init__(self, backend: str = "memory"):
+        self.backend = backend
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        # 统计
+        self.recorded_total = 0
+        self.flushed_total = 0
+        self.flush_count = 0
+        self.flush_failures = 0
+        self.last_flush_at: Optional[float] = None
+
+    async def record(self, recipe_id: str) -> None:
+        """
+        记录一次浏览
+
+        Args:
+            recipe_id: 菜谱ID
+        """
+        self.recorded_total += 1
+        if self.backend == "redis":
+            try:
+                redis = await get_redis()
+                await redis.hincrby(PENDING_VIEWS_KEY, recipe_id, 1)
+                return
+            except Exception as e:
+                # Redis不可用时暂存在本进程内存中，下次写回时一并处理
+                logger.warning(f"记录菜谱浏览次数到Redis失败: {str(e)}")
+        self._pending[recipe_id] += 1
+
+    async def _drain_redis(self) -> Dict[str, int]:
+        redis = await get_redis()
+        flushing_key = f"{FLUSHING_VIEWS_KEY_PREFIX}{uuid.uuid4().hex}"
+        if not await redis.exists(PENDING_VIEWS_KEY):
+            return {}
+        await redis.rename(PENDING_VIEWS_KEY, flushing_key)
+        values = await redis.hgetall(flushing_key)
+        await redis.delete(flushing_key)
+
+        deltas = {}
+        for key, value in values.items():
+            key = key.decode("utf-8") if isinstance(key, bytes) else key
+            deltas[key] = int(value)
+        return deltas
+
+    async def flush(self) -> int:
+        """
+        将累加的浏览次数写回MongoDB
+
+        Returns:
+            写回的浏览次数
+        """
+        async with self._lock:
+            deltas, self._pending = dict(self._pending), defaultdict(int)
+            if self.backend == "redis":
+                try:
+                    for recipe_id, delta in (await self._drain_redis()).items():
+                        deltas[recipe_id] = deltas.get(recipe_id, 0) + delta
+                except Exception as e:
+                    logger.warning(f"读取Redis中的菜谱浏览次数失败: {str(e)}")
+
+            operations = [
+                UpdateOne({"_id": ObjectId(recipe_id)}, {"$inc": {"stats.viewCount": delta}})
+                for recipe_id, delta in deltas.items()
+                if delta and ObjectId.is_valid(recipe_id)
+            ]
+            if not operations:
+                return 0
+
+            try:
+                recipes_collection = get_collection(RECIPES_COLLECTION, profile="relaxed")
+                await recipes_collection.bulk_write(operations, ordered=False)
+            except Exception as e:
+                # 写回失败时放回缓冲区，下次重试
+                self.flush_failures += 1
+                for recipe_id, delta in deltas.items():
+                    self._pending[recipe_id] += delta
+                logger.error(f"写回菜谱浏览次数失败: {str(e)}")
+                return 0
+
+            flushed = sum(deltas.values())
+            self.flushed_total += flushed
+            self.flush_count += 1
+            self.last_flush_at = time.time()
+            logger.debug(f"已写回 {len(operations)} 个菜谱的 {flushed} 次浏览")
+            return flushed
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(settings.VIEW_COUNTER_FLUSH_INTERVAL)
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"菜谱浏览次数写回任务出错: {str(e)}")
+
+    async def start(self) -> None:
+        """启动定期写回(应用启动时调用)"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        """停止定期写回并写回剩余计数(应用关闭时调用)"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, Exception):
+                pass
+            self._task = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Optional[float]]:
+        """浏览计数统计(待写回的数量仅包含本进程内存中的部分)"""
+        return {
+            "backend": self.backend,
+            "pending_recipes": len(self._pending),
+            "pending_views": sum(self._pending.values()),
+            "recorded_total": self.recorded_total,
+            "flushed_total": self.flushed_total,
+            "flush_count": self.flush_count,
+            "flush_failures": self.flush_failures,
+            "last_flush_at": self.last_flush_at,
+        }
+
+    async def metrics(self) -> Dict[str, Optional[float]]:
+        """浏览计数统计，redis模式下额外包含Redis中待写回的菜谱数量"""
+        metrics = self.stats()
+        if self.backend == "redis":
+            try:
+                redis = await get_redis()
+                metrics["redis_pending_recipes"] = await redis.hlen(PENDING_VIEWS_KEY)
+            except Exception:
+                metrics["redis_pending_recipes"] = None
+        return metrics
+
+
+# 全局浏览计数实例
+view_counter = ViewCounter(settings.VIEW_COUNTER_BACKEND)
@@ -58,7 +58,10 @@ class MongoDBUtils:
     @staticmethod
     def serialize_document(document: Dict[str, Any]) -> Dict[str, Any]:
         """
-        完整的MongoDB文档序列化
+        MongoDB文档序列化
+        
+        只做一次遍历将ObjectId转换为字符串(供Pydantic模型和业务代码使用)；
+        datetime保持原样，由orjson响应类在编码时直接输出ISO格式
         
         Args:
             document: MongoDB文档
@@ -74,12 +77,7 @@ class MongoDBUtils:
             document["id"] = str(document["_id"])
         
         # 转换ObjectId
-        document = MongoDBUtils.convert_objectid_to_str(document)
-        
-        # 转换时间字段
-        document = MongoDBUtils.serialize_datetime(document)
-        
-        return document
+        return MongoDBUtils.convert_objectid_to_str(document)
     
     @staticmethod
     def validate_object_id(id_string: str) -> bool:
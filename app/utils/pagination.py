@@ -0,0 +1,228 @@
+"""
+列表分页工具
+为菜谱、菜单计划、购物清单等列表查询提供统一的偏移分页和游标(keyset)分页
+
+游标模式下不再使用skip，而是以"排序字段值 + _id"作为定位条件继续向后读取，
+深翻页的开销与页码无关；总数可以跳过，或者使用带过期时间的缓存计数
+"""
+import base64
+import logging
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from bson import json_util
+from fastapi import HTTPException, Response, status
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 分页信息响应头
+TOTAL_COUNT_HEADER = "X-Total-Count"
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+# 计数缓存 {缓存键: (过期时间戳, 总数)}
+_count_cache: Dict[str, Tuple[float, int]] = {}
+_COUNT_CACHE_MAX_ENTRIES = 1024
+
+
+def encode_cursor(sort_field: str, sort_direction: int, sort_value: Any, last_id: Any) -> str:
+    """
+    将最后一条记录的排序值和_id编码为不透明的游标
+
+    Args:
+        sort_field: 排序字段
+        sort_direction: 排序方向(1升序, -1降序)
+        sort_value: 最后一条记录的排序字段值
+        last_id: 最后一条记录的_id
+
+    Returns:
+        URL安全的游标字符串
+    """
+    payload = json_util.dumps({
+        "f": sort_field,
+        "d": sort_direction,
+        "v": sort_value,
+        "id": last_id,
+    })
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_field: str, sort_direction: int) -> Tuple[Any, Any]:
+    """
+    解析游标，并校验其与当前排序方式一致
+
+    Args:
+        cursor: 游标字符串
+        sort_field: 当前排序字段
+        sort_direction: 当前排序方向
+
+    Returns:
+        (排序字段值, _id)
+
+    Raises:
+        HTTPException: 游标无效或与排序方式不匹配
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode("ascii")).decode("utf-8"))
+        if payload["f"] != sort_field or payload["d"] != sort_direction:
+            raise ValueError("排序方式不匹配")
+        return payload["v"], payload["id"]
+    except Exception as e:
+        logger.warning(f"无效的分页游标: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="无效的分页游标"
+        )
+
+
+def _get_field(document: Dict[str, Any], dotted_field: str) -> Any:
+    """按点号路径读取文档字段"""
+    value: Any = document
+    for part in dotted_field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def build_keyset_filter(sort_field: str, sort_direction: int, sort_value: Any, last_id: Any) -> Dict[str, Any]:
+    """
+    构建"位于游标之后"的查询条件
+
+    排序为 (sort_field, _id) 的组合；MongoDB中null排在所有值之前，
+    因此排序值为空时需要单独处理
+
+    Args:
+        sort_field: 排序字段
+        sort_direction: 排序方向(1升序, -1降序)
+        sort_value: 游标中的排序字段值
+        last_id: 游标中的_id
+
+    Returns:
+        keyset查询条件
+    """
+    op = "$gt" if sort_direction == 1 else "$lt"
+    same_value_after = {sort_field: sort_value, "_id": {op: last_id}}
+
+    if sort_value is None:
+        if sort_direction == 1:
+            return {"$or": [{sort_field: {"$ne": None}}, same_value_after]}
+        return same_value_after
+
+    after_value = {sort_field: {op: sort_value}}
+    if sort_direction == 1:
+        return {"$or": [after_value, same_value_after]}
+    # 降序时null排在最后，游标之后的空值记录也需要包含
+    return {"$or": [after_value, same_value_after, {sort_field: None}]}
+
+
+def _count_cache_key(collection, query: Dict[str, Any]) -> str:
+    return f"{getattr(collection, 'name', '')}:{json_util.dumps(query, sort_keys=True)}"
+
+
+async def cached_count(collection, query: Dict[str, Any]) -> int:
+    """
+    获取带缓存的近似总数
+
+    在PAGINATION_COUNT_CACHE_TTL秒内相同查询直接复用上次的计数结果
+
+    Args:
+        collection: MongoDB集合
+        query: 查询条件(不含游标条件)
+
+    Returns:
+        文档总数
+    """
+    ttl = settings.PAGINATION_COUNT_CACHE_TTL
+    if ttl <= 0:
+        return await collection.count_documents(query)
+
+    key = _count_cache_key(collection, query)
+    now = time.monotonic()
+    cached = _count_cache.get(key)
+    if cached and cached[0] > now:
+        return cached[1]
+
+    total = await collection.count_documents(query)
+    if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+        # 先清理过期项，仍然过多时整体清空
+        for expired_key in [k for k, (expires_at, _) in _count_cache.items() if expires_at <= now]:
+            del _count_cache[expired_key]
+        if len(_count_cache) >= _COUNT_CACHE_MAX_ENTRIES:
+            _count_cache.clear()
+    _count_cache[key] = (now + ttl, total)
+    return total
+
+
+async def fetch_page(
+    collection,
+    query: Dict[str, Any],
+    sort_field: str,
+    sort_direction: int,
+    page: int = 1,
+    page_size: int = 10,
+    cursor: Optional[str] = None,
+    cursor_mode: bool = False,
+    include_total: bool = True,
+    projection: Optional[Dict[str, Any]] = None
+) -> Tuple[List[dict], Optional[int], Optional[str]]:
+    """
+    按统一的排序规则读取一页数据
+
+    偏移模式: skip/limit + 精确总数(与原有行为一致)
+    游标模式(cursor_mode为True或传入cursor): 按(排序字段, _id)定位，
+    总数来自缓存计数，include_total为False时不计算总数
+
+    Args:
+        collection: MongoDB集合
+        query: 查询条件
+        sort_field: 排序字段
+        sort_direction: 排序方向(1升序, -1降序)
+        page: 页码(偏移模式)
+        page_size: 每页数量
+        cursor: 上一页返回的nextCursor(游标模式)
+        cursor_mode: 是否启用游标模式
+        include_total: 游标模式下是否返回总数
+        projection: 字段投影
+
+    Returns:
+        (文档列表, 总数, 下一页游标)，没有下一页时游标为None
+    """
+    sort_spec = [(sort_field, sort_direction), ("_id", sort_direction)]
+
+    if not (cursor_mode or cursor):
+        total = await collection.count_documents(query)
+        find_cursor = collection.find(query, projection).sort(sort_spec)
+        find_cursor = find_cursor.skip((page - 1) * page_size).limit(page_size)
+        documents = await find_cursor.to_list(length=page_size)
+        return documents, total, None
+
+    total = await cached_count(collection, query) if include_total else None
+
+    page_query = query
+    if cursor:
+        sort_value, last_id = decode_cursor(cursor, sort_field, sort_direction)
+        keyset_filter = build_keyset_filter(sort_field, sort_direction, sort_value, last_id)
+        page_query = {"$and": [query, keyset_filter]} if query else keyset_filter
+
+    # 多取一条用于判断是否还有下一页
+    find_cursor = collection.find(page_query, projection).sort(sort_spec).limit(page_size + 1)
+    documents = await find_cursor.to_list(length=page_size + 1)
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor(sort_field, sort_direction, _get_field(last, sort_field), last["_id"])
+
+    return documents, total, next_cursor
+
+
+def set_pagination_headers(response: Response, total: Optional[int], next_cursor: Optional[str]) -> None:
+    """将总数和下一页游标写入响应头(列表接口直接返回数组，分页信息通过响应头传递)"""
+    if total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(total)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
@@ -0,0 +1,123 @@
+"""
+列表摘要视图(字段投影)
+列表页只展示标题、封面和少量统计数据，按集合定义命名投影，在 find() 时只读取需要的字段，
+减少MongoDB传输的数据量、Python对象分配和JSON编码开销
+
+客户端通过 fields 查询参数选择:
+- 不传: 完整文档
+- card: 使用集合的卡片视图(如 recipe.card)
+- 逗号分隔的字段列表: 只返回这些顶层字段(必须是该集合允许的字段)
+"""
+from typing import Any, Dict, FrozenSet, Optional
+
+from fastapi import HTTPException, status
+
+# 卡片视图名称
+CARD_VIEW = "card"
+
+# 命名投影
+SUMMARY_VIEWS: Dict[str, Dict[str, Any]] = {
+    "recipe.card": {
+        "title": 1,
+        "coverImage": 1,
+        "description": 1,
+        "tags": 1,
+        "category": 1,
+        "cuisine": 1,
+        "difficulty": 1,
+        "totalTime": 1,
+        "servings": 1,
+        "creator": 1,
+        "isPublic": 1,
+        "status": 1,
+        "stats": 1,
+        "createdAt": 1,
+    },
+    "menuPlan.card": {
+        "name": 1,
+        "familyId": 1,
+        "creatorId": 1,
+        "date": 1,
+        "status": 1,
+        "guestCount": 1,
+        "shoppingListId": 1,
+        "createdAt": 1,
+        "updatedAt": 1,
+        "dishCount": {"$sum": {"$map": {
+            "input": {"$ifNull": ["$meals", []]},
+            "as": "meal",
+            "in": {"$size": {"$ifNull": ["$$meal.dishes", []]}}
+        }}},
+    },
+    "shoppingList.card": {
+        "name": 1,
+        "status": 1,
+        "family_id": 1,
+        "familyId": 1,
+        "creator_id": 1,
+        "date": 1,
+        "created_at": 1,
+        "updated_at": 1,
+        "completed_at": 1,
+        "itemCount": {"$size": {"$ifNull": ["$items", []]}},
+    },
+}
+
+# 自定义字段列表时允许的顶层字段
+ALLOWED_FIELDS: Dict[str, FrozenSet[str]] = {
+    "recipe": frozenset({
+        "title", "coverImage", "description", "tags", "category", "cuisine", "difficulty",
+        "prepTime", "cookTime", "totalTime", "servings", "creator", "ingredients", "steps",
+        "nutrition", "tips", "isPublic", "isOrigin", "sourceId", "status", "stats",
+        "createdAt", "updatedAt",
+    }),
+    "menuPlan": frozenset({
+        "name", "familyId", "creatorId", "date", "meals", "guestCount", "specialNeeds",
+        "status", "shoppingListId", "collaborators", "createdAt", "updatedAt", "confirmedAt",
+    }),
+    "shoppingList": frozenset({
+        "name", "description", "status", "family_id", "familyId", "creator_id", "items",
+        "shared_with", "date", "created_at", "updated_at", "completed_at",
+    }),
+}
+
+
+def resolve_projection(
+    collection: str,
+    fields: Optional[str],
+    required: tuple = ()
+) -> Optional[Dict[str, Any]]:
+    """
+    根据 fields 参数解析字段投影
+
+    Args:
+        collection: 集合视图前缀(recipe / menuPlan / shoppingList)
+        fields: 客户端传入的fields参数
+        required: 必须包含的字段(如游标分页的排序字段)
+
+    Returns:
+        投影字典，返回完整文档时为None
+
+    Raises:
+        HTTPException: 字段不在允许范围内
+    """
+    if not fields or not fields.strip():
+        return None
+
+    if fields.strip() == CARD_VIEW:
+        projection = dict(SUMMARY_VIEWS[f"{collection}.{CARD_VIEW}"])
+    else:
+        names = [name.strip() for name in fields.split(",") if name.strip()]
+        invalid = [name for name in names if name not in ALLOWED_FIELDS[collection]]
+        if invalid:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"不支持的字段: {', '.join(invalid)}"
+            )
+        projection = {name: 1 for name in names}
+
+    for name in required:
+        # 已包含该字段或其上级字段时不再添加，避免路径冲突
+        if not any(name == path or name.startswith(f"{path}.") for path in projection):
+            projection[name] = 1
+    return projection
@@ -1,60 +1,295 @@
+"""
+微信小程序服务端API客户端
+- 所有请求共用一个 httpx.AsyncClient(长连接复用、超时控制)，网络错误按指数退避重试；
+  code2session 的 js_code 只能使用一次，只在请求确定未发出(连接失败)时重试
+- access_token 缓存在进程内和Redis中(多个进程共享)，到期前提前刷新；
+  同一进程内并发请求只刷新一次
+- 接口地址可通过 WECHAT_API_BASE_URL 配置，测试时可以指向本地桩服务
+"""
+import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, Tuple
+import time
+from typing import Dict, Any, Optional, Tuple, Type, Union
 
-import requests
+import httpx
+from tenacity import AsyncRetrying, retry_if_exception_type, stop_after_attempt, wait_exponential
 from wechatpy.exceptions import WeChatClientException
 
 from app.core.config import settings
 from app.core.exceptions import WechatAPIError
+from app.db.redis import get_redis
 
-# 微信小程序API基础URL
-WECHAT_API_URL = "https://api.weixin.qq.com"
+logger = logging.getLogger(__name__)
 
+# access_token 无效或已过期的错误码(刷新令牌后重试一次)
+_TOKEN_EXPIRED_ERRCODES = {40001, 40014, 42001}
 
-def code2session(code: str) -> Dict[str, Any]:
-    """
-    使用临时登录凭证获取用户的openid和session_key
-    
-    微信小程序登录接口: https://developers.weixin.qq.com/miniprogram/dev/api-backend/open-api/login/auth.code2Session.html
-    """
-    try:
-        api_url = f"{WECHAT_API_URL}/sns/jscode2session"
+# 请求未发送到微信服务器的网络错误(非幂等请求只在这些错误时重试)
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class WechatClient:
+    """微信小程序服务端API客户端"""
+
+    REDIS_TOKEN_KEY_PREFIX = "wechat:access_token:"
+
+    def __init__(
+        self,
+        app_id: Optional[str] = None,
+        app_secret: Optional[str] = None,
+        base_url: Optional[str] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.app_id = app_id or settings.WECHAT_MINI_APP_ID
+        self.app_secret = app_secret or settings.WECHAT_MINI_APP_SECRET
+        self.base_url = (base_url or settings.WECHAT_API_BASE_URL).rstrip("/")
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+        # 进程内缓存的 access_token 及其过期时间(时间戳，已扣除提前刷新的余量)
+        self._access_token: Optional[str] = None
+        self._token_expires_at = 0.0
+        self._token_lock = asyncio.Lock()
+        # 统计
+        self.token_refreshes = 0
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """共享的HTTP客户端(首次使用时创建)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(settings.WECHAT_HTTP_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.WECHAT_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.WECHAT_HTTP_MAX_CONNECTIONS
+                ),
+                transport=self._transport
+            )
+        return self._client
+
+    async def close(self) -> None:
+        """关闭HTTP客户端(应用关闭时调用)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _request(
+        self,
+        method: str,
+        path: str,
+        retry_on: Union[Type[Exception], Tuple[Type[Exception], ...]] = httpx.TransportError,
+        **kwargs
+    ) -> httpx.Response:
+        """
+        发送请求，出现 retry_on 指定的网络错误时重试
+
+        默认任何网络错误(包括读取超时)都重试，只适用于幂等请求
+        """
+        async for attempt in AsyncRetrying(
+            retry=retry_if_exception_type(retry_on),
+            stop=stop_after_attempt(settings.WECHAT_HTTP_RETRIES),
+            wait=wait_exponential(multiplier=0.2, max=2),
+            reraise=True
+        ):
+            with attempt:
+                return await self.client.request(method, path, **kwargs)
+
+    @staticmethod
+    def _check_result(result: Dict[str, Any], action: str) -> Dict[str, Any]:
+        if result.get("errcode", 0) != 0:
+            error_msg = f"{action}失败: {result.get('errmsg', '未知错误')}"
+            logger.error(f"{error_msg}, 错误码: {result.get('errcode')}")
+            raise WechatAPIError(detail=error_msg)
+        return result
+
+    async def code2session(self, code: str) -> Dict[str, Any]:
+        """
+        使用临时登录凭证获取用户的openid和session_key
+
+        微信小程序登录接口: https://developers.weixin.qq.com/miniprogram/dev/api-backend/open-api/login/auth.code2Session.html
+        """
         params = {
-            "appid": settings.WECHAT_MINI_APP_ID,
-            "secret": settings.WECHAT_MINI_APP_SECRET,
+            "appid": self.app_id,
+            "secret": self.app_secret,
             "js_code": code,
             "grant_type": "authorization_code"
         }
-        
-        response = requests.get(api_url, params=params)
-        result = response.json()
-        
-        if 'errcode' in result and result['errcode'] != 0:
-            error_msg = f"微信登录失败: {result.get('errmsg', '未知错误')}"
-            logging.error(f"{error_msg}, 错误码: {result.get('errcode')}")
+        try:
+            # 读取超时时微信可能已经消费了js_code，重试只会得到"code been used"
+            response = await self._request(
+                "GET", "/sns/jscode2session", retry_on=_NOT_SENT_ERRORS, params=params
+            )
+            result = response.json()
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            error_msg = f"微信API调用异常: {str(e)}"
+            logger.error(error_msg)
             raise WechatAPIError(detail=error_msg)
-        
         # 成功返回包含openid和session_key
-        return result
-    except (requests.RequestException, WeChatClientException, json.JSONDecodeError) as e:
-        error_msg = f"微信API调用异常: {str(e)}"
-        logging.error(error_msg)
-        raise WechatAPIError(detail=error_msg)
+        return self._check_result(result, "微信登录")
+
+    def _token_redis_key(self) -> str:
+        return f"{self.REDIS_TOKEN_KEY_PREFIX}{self.app_id}"
+
+    async def _load_token_from_redis(self) -> bool:
+        try:
+            redis = await get_redis()
+            data = await redis.get(self._token_redis_key())
+        except Exception as e:
+            logger.warning(f"读取Redis中的access_token失败: {str(e)}")
+            return False
+        if not data:
+            return False
+        cached = json.loads(data)
+        if cached.get("expires_at", 0) <= time.time():
+            return False
+        self._access_token = cached["access_token"]
+        self._token_expires_at = cached["expires_at"]
+        return True
+
+    async def _save_token_to_redis(self) -> None:
+        ttl = int(self._token_expires_at - time.time())
+        if ttl <= 0:
+            return
+        data = json.dumps({"access_token": self._access_token, "expires_at": self._token_expires_at})
+        try:
+            redis = await get_redis()
+            await redis.set(self._token_redis_key(), data.encode("utf-8"), ex=ttl)
+        except Exception as e:
+            logger.warning(f"写入Redis中的access_token失败: {str(e)}")
+
+    async def _fetch_token(self, force_refresh: bool) -> None:
+        """
+        从微信获取 access_token
+
+        使用稳定版接口(stable_token): 普通模式下有效期内重复获取返回同一个令牌，
+        多个进程各自刷新时不会使对方持有的令牌失效
+        """
+        data = {
+            "grant_type": "client_credential",
+            "appid": self.app_id,
+            "secret": self.app_secret,
+            "force_refresh": force_refresh
+        }
+        try:
+            response = await self._request("POST", "/cgi-bin/stable_token", json=data)
+            result = response.json()
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
+            error_msg = f"获取access_token异常: {str(e)}"
+            logger.error(error_msg)
+            raise WechatAPIError(detail=error_msg)
+        self._check_result(result, "获取access_token")
+
+        expires_in = int(result.get("expires_in", 7200))
+        margin = min(settings.WECHAT_TOKEN_REFRESH_MARGIN, expires_in // 2)
+        self._access_token = result["access_token"]
+        self._token_expires_at = time.time() + expires_in - margin
+        self.token_refreshes += 1
+        await self._save_token_to_redis()
+
+    def _token_valid(self) -> bool:
+        return self._access_token is not None and time.time() < self._token_expires_at
+
+    async def get_access_token(self, force_refresh: bool = False) -> str:
+        """
+        获取微信小程序全局接口调用凭证
+
+        微信小程序获取access_token: https://developers.weixin.qq.com/miniprogram/dev/OpenApiDoc/mp-access-token/getStableAccessToken.html
+
+        Args:
+            force_refresh: 是否忽略缓存强制刷新(令牌已被微信判定无效时使用)
+
+        Returns:
+            access_token
+        """
+        if not force_refresh and self._token_valid():
+            return self._access_token
+
+        stale_token = self._access_token
+
+        def usable() -> bool:
+            # 强制刷新时，与调用方手中相同的令牌不能再用
+            return self._token_valid() and not (force_refresh and self._access_token == stale_token)
+
+        async with self._token_lock:
+            # 等待锁期间其他请求可能已经刷新
+            if usable():
+                return self._access_token
+            # 其他进程刷新的令牌
+            if await self._load_token_from_redis() and usable():
+                return self._access_token
+            await self._fetch_token(force_refresh)
+            return self._access_token
+
+    async def generate_mini_qrcode(self, scene: str, path: Optional[str] = None) -> bytes:
+        """
+        生成小程序码
+
+        微信小程序码生成: https://developers.weixin.qq.com/miniprogram/dev/api-backend/open-api/qr-code/wxacode.getUnlimited.html
+        """
+        data = {
+            "scene": scene,
+            "check_path": False,
+            "env_version": "release"  # 正式版
+        }
+        if path:
+            data["page"] = path
+
+        force_refresh = False
+        for _ in range(2):
+            access_token = await self.get_access_token(force_refresh=force_refresh)
+            try:
+                response = await self._request(
+                    "POST", "/wxa/getwxacodeunlimit", params={"access_token": access_token}, json=data
+                )
+                # 判断返回是否为图片
+                if response.headers.get("Content-Type", "").startswith("image/"):
+                    return response.content
+                # 不是图片，可能是错误信息
+                result = response.json()
+            except (httpx.HTTPError, json.JSONDecodeError) as e:
+                error_msg = f"生成小程序码异常: {str(e)}"
+                logger.error(error_msg)
+                raise WechatAPIError(detail=error_msg)
+
+            if result.get("errcode") in _TOKEN_EXPIRED_ERRCODES and not force_refresh:
+                # 令牌已失效(如被其他服务刷新)，强制刷新后重试一次
+                force_refresh = True
+                continue
+            self._check_result(result, "生成小程序码")
+            break
+
+        raise WechatAPIError(detail="生成小程序码失败: 返回内容不是图片")
+
+    def stats(self) -> Dict[str, Any]:
+        """客户端统计"""
+        return {
+            "token_refreshes": self.token_refreshes,
+            "token_ttl": max(0, int(self._token_expires_at - time.time())) if self._access_token else 0,
+        }
+
+
+# 全局微信客户端实例
+wechat_client = WechatClient()
+
+
+async def code2session(code: str) -> Dict[str, Any]:
+    """使用临时登录凭证获取用户的openid和session_key"""
+    return await wechat_client.code2session(code)
 
 
 def decrypt_user_info(session_key: str, encrypted_data: str, iv: str) -> Dict[str, Any]:
     """
     解密用户信息
-    
+
     微信小程序解密用户信息: https://developers.weixin.qq.com/miniprogram/dev/framework/open-ability/signature.html#解密算法
     """
     try:
         from wechatpy.crypto import WeChatCrypto
-        
+
         # 创建加密对象
         crypto = WeChatCrypto(settings.WECHAT_MINI_APP_ID, session_key, settings.WECHAT_MINI_APP_ID)
-        
+
         # 解密数据
         decrypted_data = crypto.decrypt_message(encrypted_data, iv)
         return json.loads(decrypted_data)
@@ -64,67 +299,11 @@ def decrypt_user_info(session_key: str, encrypted_data: str, iv: str) -> Dict[st
         raise WechatAPIError(detail=error_msg)
 
 
-def get_access_token() -> str:
-    """
-    获取微信小程序全局接口调用凭证
-    
-    微信小程序获取access_token: https://developers.weixin.qq.com/miniprogram/dev/api-backend/open-api/access-token/auth.getAccessToken.html
-    """
-    try:
-        api_url = f"{WECHAT_API_URL}/cgi-bin/token"
-        params = {
-            "grant_type": "client_credential",
-            "appid": settings.WECHAT_MINI_APP_ID,
-            "secret": settings.WECHAT_MINI_APP_SECRET
-        }
-        
-        response = requests.get(api_url, params=params)
-        result = response.json()
-        
-        if 'errcode' in result and result['errcode'] != 0:
-            error_msg = f"获取access_token失败: {result.get('errmsg', '未知错误')}"
-            logging.error(f"{error_msg}, 错误码: {result.get('errcode')}")
-            raise WechatAPIError(detail=error_msg)
-        
-        # 成功返回
-        return result.get("access_token")
-    except (requests.RequestException, WeChatClientException, json.JSONDecodeError) as e:
-        error_msg = f"获取access_token异常: {str(e)}"
-        logging.error(error_msg)
-        raise WechatAPIError(detail=error_msg)
+async def get_access_token() -> str:
+    """获取微信小程序全局接口调用凭证(缓存)"""
+    return await wechat_client.get_access_token()
 
 
-def generate_mini_qrcode(scene: str, path: Optional[str] = None) -> bytes:
-    """
-    生成小程序码
-    
-    微信小程序码生成: https://developers.weixin.qq.com/miniprogram/dev/api-backend/open-api/qr-code/wxacode.getUnlimited.html
-    """
-    try:
-        access_token = get_access_token()
-        api_url = f"{WECHAT_API_URL}/wxa/getwxacodeunlimit?access_token={access_token}"
-        
-        data = {
-            "scene": scene,
-            "check_path": False,
-            "env_version": "release"  # 正式版
-        }
-        
-        if path:
-            data["page"] = path
-        
-        response = requests.post(api_url, json=data)
-        
-        # 判断返回是否为图片
-        if response.headers.get("Content-Type").startswith("image/"):
-            return response.content
-        
-        # 不是图片，可能是错误信息
-        result = response.json()
-        error_msg = f"生成小程序码失败: {result.get('errmsg', '未知错误')}"
-        logging.error(f"{error_msg}, 错误码: {result.get('errcode')}")
-        raise WechatAPIError(detail=error_msg)
-    except (requests.RequestException, WeChatClientException, json.JSONDecodeError) as e:
-        error_msg = f"生成小程序码异常: {str(e)}"
-        logging.error(error_msg)
-        raise WechatAPIError(detail=error_msg) 
\ No newline at end of file
+async def generate_mini_qrcode(scene: str, path: Optional[str] = None) -> bytes:
+    """生成小程序码"""
+    return await wechat_client.generate_mini_qrcode(scene, path)
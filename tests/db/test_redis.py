@@ -0,0 +1,138 @@
+"""
+测试Redis连接管理
+使用fakeredis代替真实Redis，通过 FakeServer.connected 模拟连接中断与恢复
+"""
+import asyncio
+
+import fakeredis
+import fakeredis.aioredis
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.core.config import settings
+from app.db import redis as redis_module
+from app.db.redis import DegradedRedis, RedisManager, REDIS_CACHE, REDIS_SESSION
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def manager(server, monkeypatch):
+    """使用fakeredis的Redis连接管理实例(替换全局实例)"""
+    manager = RedisManager()
+    manager.use_client(fakeredis.aioredis.FakeRedis(server=server))
+    monkeypatch.setattr(redis_module, "redis_manager", manager)
+    return manager
+
+
+@pytest.mark.asyncio
+async def test_get_returns_client_when_healthy(manager):
+    client = await manager.get(REDIS_CACHE)
+    assert not isinstance(client, DegradedRedis)
+    await client.set("key", b"value")
+    assert await client.get("key") == b"value"
+
+
+@pytest.mark.asyncio
+async def test_degraded_mode_when_connection_lost(manager, server):
+    """连接失败后返回降级实现: 读取返回None，写入被忽略，其他命令抛出ConnectionError"""
+    server.connected = False
+    assert await manager._check(REDIS_CACHE) is False
+
+    client = await manager.get(REDIS_CACHE)
+    assert isinstance(client, DegradedRedis)
+    assert await client.get("key") is None
+    assert await client.set("key", b"value") is True
+    assert await client.delete("key") == 1
+    with pytest.raises(RedisConnectionError):
+        await client.incr("counter")
+    assert manager.failures == 1
+    assert manager.stats()["pools"][REDIS_CACHE]["healthy"] is False
+
+
+@pytest.mark.asyncio
+async def test_recovers_after_check_interval(manager, server, monkeypatch):
+    """未启动健康检查任务时，降级期间按检查间隔在请求中重新检查"""
+    server.connected = False
+    await manager._check(REDIS_CACHE)
+    server.connected = True
+
+    # 检查间隔未到，仍然降级
+    assert isinstance(await manager.get(REDIS_CACHE), DegradedRedis)
+
+    monkeypatch.setattr(settings, "REDIS_HEALTH_CHECK_INTERVAL", 0)
+    client = await manager.get(REDIS_CACHE)
+    assert not isinstance(client, DegradedRedis)
+    assert manager.recoveries == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_run_single_inline_check(manager, server, monkeypatch):
+    """多个请求同时到达时只有一个请求执行PING"""
+    server.connected = False
+    await manager._check(REDIS_CACHE)
+    monkeypatch.setattr(settings, "REDIS_HEALTH_CHECK_INTERVAL", 60)
+    manager._checked_at[REDIS_CACHE] = 0.0
+
+    checks = 0
+    original_check = manager._check
+
+    async def counting_check(role):
+        nonlocal checks
+        checks += 1
+        await asyncio.sleep(0.01)
+        return await original_check(role)
+
+    monkeypatch.setattr(manager, "_check", counting_check)
+    clients = await asyncio.gather(*(manager.get(REDIS_CACHE) for _ in range(10)))
+    assert checks == 1
+    assert all(isinstance(client, DegradedRedis) for client in clients)
+
+
+@pytest.mark.asyncio
+async def test_no_inline_check_while_health_task_running(manager, server, monkeypatch):
+    """健康检查任务运行时由其负责恢复，请求中不执行PING"""
+    server.connected = False
+    await manager._check(REDIS_CACHE)
+    server.connected = True
+    monkeypatch.setattr(settings, "REDIS_HEALTH_CHECK_INTERVAL", 0)
+
+    manager._health_task = asyncio.create_task(asyncio.sleep(3600))
+    try:
+        assert isinstance(await manager.get(REDIS_CACHE), DegradedRedis)
+    finally:
+        manager._health_task.cancel()
+        manager._health_task = None
+
+
+@pytest.mark.asyncio
+async def test_use_client_per_role(server):
+    manager = RedisManager()
+    session_client = fakeredis.aioredis.FakeRedis(server=fakeredis.FakeServer())
+    manager.use_client(fakeredis.aioredis.FakeRedis(server=server))
+    manager.use_client(session_client, REDIS_SESSION)
+    assert await manager.get(REDIS_SESSION) is session_client
+    assert await manager.get(REDIS_CACHE) is not session_client
+
+
+@pytest.mark.asyncio
+async def test_incr_with_expiry_sets_ttl_once(manager):
+    """首次计数时设置过期时间，之后的计数不刷新过期时间"""
+    assert await redis_module.incr_with_expiry("counter", 60) == 1
+    client = await manager.get(REDIS_CACHE)
+    assert 0 < await client.ttl("counter") <= 60
+
+    await client.expire("counter", 30)
+    assert await redis_module.incr_with_expiry("counter", 60) == 2
+    assert 0 < await client.ttl("counter") <= 30
+
+
+@pytest.mark.asyncio
+async def test_pipeline_helpers(manager):
+    await redis_module.pipeline_set({"a": b"1", "b": b"2"}, ex=60)
+    assert await redis_module.pipeline_get(["a", "missing", "b"]) == [b"1", None, b"2"]
+    assert await redis_module.pipeline_delete(["a", "b"]) == 2
+    assert await redis_module.pipeline_get([]) == []
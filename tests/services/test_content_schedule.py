@@ -0,0 +1,121 @@
+"""
+测试首页内容上下线调度
+生效规则需与原MongoDB查询一致:
+{"$or": [{"start_time": {"$exists": False}}, {"end_time": {"$exists": False}},
+         {"start_time": {"$lte": now}, "end_time": {"$gte": now}}]}
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.content_schedule import ContentScheduler, is_visible, next_transition
+
+START = datetime(2024, 5, 1, 8, 0, 0)
+END = datetime(2024, 5, 31, 20, 0, 0)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+def scheduled(start=START, end=END, **extra):
+    return {"start_time": start, "end_time": end, **extra}
+
+
+class TestIsVisible:
+    def test_missing_fields_always_visible(self):
+        assert is_visible({}, START)
+        assert is_visible({"start_time": START}, START - timedelta(days=1))
+        assert is_visible({"end_time": END}, END + timedelta(days=1))
+
+    def test_null_field_never_visible(self):
+        # 字段存在但为null时原查询的区间条件不成立
+        assert not is_visible({"start_time": None, "end_time": END}, START)
+        assert not is_visible({"start_time": START, "end_time": None}, START)
+
+    def test_start_and_end_inclusive(self):
+        content = scheduled()
+        assert not is_visible(content, START - ONE_MICROSECOND)
+        assert is_visible(content, START)
+        assert is_visible(content, END)
+        assert not is_visible(content, END + ONE_MICROSECOND)
+
+    def test_iso_string_times(self):
+        content = scheduled("2024-05-01T08:00:00", "2024-05-31T20:00:00Z")
+        assert is_visible(content, START)
+        assert is_visible(content, END)
+        assert not is_visible(content, END + ONE_MICROSECOND)
+
+    def test_aware_times_normalized_to_utc(self):
+        beijing = timezone(timedelta(hours=8))
+        content = scheduled(START.replace(hour=16, tzinfo=beijing), END.replace(tzinfo=timezone.utc))
+        assert not is_visible(content, START - ONE_MICROSECOND)
+        assert is_visible(content, START)
+
+    def test_unparseable_times_not_visible(self):
+        assert not is_visible(scheduled("not a date", END), START)
+        assert not is_visible(scheduled(START, 12345), START)
+
+
+class TestNextTransition:
+    def test_before_start_returns_start(self):
+        assert next_transition(scheduled(), START - timedelta(hours=1)) == START
+
+    def test_during_window_returns_just_after_end(self):
+        assert next_transition(scheduled(), START) == END + ONE_MICROSECOND
+        assert next_transition(scheduled(), END) == END + ONE_MICROSECOND
+
+    def test_after_end_returns_none(self):
+        assert next_transition(scheduled(), END + ONE_MICROSECOND) is None
+
+    def test_unscheduled_content_has_no_transition(self):
+        assert next_transition({}, START) is None
+        assert next_transition({"start_time": None, "end_time": END}, START) is None
+        assert next_transition(scheduled("bad", END), START) is None
+
+    def test_string_times(self):
+        content = scheduled("2024-05-01T08:00:00", "2024-05-31T20:00:00")
+        assert next_transition(content, START - timedelta(hours=1)) == START
+
+
+class TestContentScheduler:
+    @staticmethod
+    def make_scheduler(contents, now):
+        scheduler = ContentScheduler("home_contents")
+        scheduler._contents = contents
+        scheduler._loaded_at = time.monotonic()
+        scheduler._recompute(now)
+        return scheduler
+
+    @pytest.mark.asyncio
+    async def test_transitions_without_reload(self):
+        always = {"_id": "always"}
+        window = scheduled(_id="window")
+        later = scheduled(END, END + timedelta(days=1), _id="later")
+        scheduler = self.make_scheduler([always, window, later], START - timedelta(hours=1))
+
+        ids = lambda contents: [content["_id"] for content in contents]
+        assert ids(await scheduler.active_contents(now=START - timedelta(hours=1))) == ["always"]
+        assert ids(await scheduler.active_contents(now=START)) == ["always", "window"]
+        # 结束时间当刻两个区间都生效
+        assert ids(await scheduler.active_contents(now=END)) == ["always", "window", "later"]
+        assert ids(await scheduler.active_contents(now=END + ONE_MICROSECOND)) == ["always", "later"]
+        assert scheduler.reloads == 0
+
+    @pytest.mark.asyncio
+    async def test_recompute_only_at_transition(self):
+        scheduler = self.make_scheduler([scheduled(_id="window")], START)
+        recomputes = scheduler.recomputes
+        await scheduler.active_contents(now=START + timedelta(days=1))
+        assert scheduler.recomputes == recomputes
+        await scheduler.active_contents(now=END + ONE_MICROSECOND)
+        assert scheduler.recomputes == recomputes + 1
+        assert scheduler.stats()["next_transition"] is None
+
+    @pytest.mark.asyncio
+    async def test_mixed_time_types_do_not_raise(self):
+        contents = [
+            scheduled("2024-05-01T08:00:00Z", END, _id="string"),
+            scheduled(START, "garbage", _id="garbage"),
+            {"_id": "null", "start_time": None, "end_time": None},
+        ]
+        scheduler = self.make_scheduler(contents, START)
+        assert [content["_id"] for content in await scheduler.active_contents(now=START)] == ["string"]
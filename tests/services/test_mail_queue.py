@@ -0,0 +1,92 @@
+"""
+测试邮件发送队列
+通过 MemoryTransport 验证邮件经由队列发送，而不是在请求中直接连接SMTP
+"""
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import auth
+from app.services.mail_queue import MailQueue, MemoryTransport, OutgoingEmail
+from app.utils import email as email_utils
+
+
+@pytest.fixture
+def memory_queue(monkeypatch):
+    """替换全局邮件队列为使用内存发送方式的队列"""
+    transport = MemoryTransport()
+    queue = MailQueue(transport)
+    monkeypatch.setattr(email_utils, "mail_queue", queue)
+    return queue, transport
+
+
+@pytest.mark.asyncio
+async def test_send_password_reset_email_enqueues_message(memory_queue, monkeypatch):
+    """密码重置邮件放入队列，由后台任务通过发送方式发出"""
+    queue, transport = memory_queue
+
+    async def fake_get_user_by_email(email):
+        return {"_id": "507f1f77bcf86cd799439011", "email": email}
+
+    monkeypatch.setattr(auth, "get_user_by_email", fake_get_user_by_email)
+
+    result = await auth.send_password_reset_email("user@example.com")
+    assert result["success"] is True
+
+    # 等待队列发送完剩余邮件并停止后台任务
+    await queue.stop()
+
+    assert len(transport.sent) == 1
+    message = transport.sent[0]
+    assert message.recipients == ["user@example.com"]
+    assert message.is_html is True
+    assert f"{settings.FRONTEND_URL}/reset-password?token=" in message.body
+
+
+@pytest.mark.asyncio
+async def test_send_password_reset_email_unknown_user(memory_queue, monkeypatch):
+    """邮箱不存在时不发送邮件"""
+    queue, transport = memory_queue
+
+    async def fake_get_user_by_email(email):
+        return None
+
+    monkeypatch.setattr(auth, "get_user_by_email", fake_get_user_by_email)
+
+    result = await auth.send_password_reset_email("missing@example.com")
+    assert result["success"] is False
+
+    await queue.stop()
+    assert transport.sent == []
+
+
+@pytest.mark.asyncio
+async def test_queue_retries_transient_failures(monkeypatch):
+    """临时性发送失败按退避时间重试"""
+    monkeypatch.setattr(settings, "MAIL_RETRY_BASE_DELAY", 0)
+
+    class FlakyTransport(MemoryTransport):
+        def __init__(self):
+            super().__init__()
+            self.calls = 0
+
+        def send(self, message):
+            self.calls += 1
+            if self.calls == 1:
+                raise ConnectionError("连接中断")
+            super().send(message)
+
+    transport = FlakyTransport()
+    queue = MailQueue(transport)
+    await queue.enqueue(OutgoingEmail(recipients=["user@example.com"], subject="测试", body="内容"))
+
+    for _ in range(100):
+        if transport.sent:
+            break
+        await asyncio.sleep(0.01)
+    await queue.stop()
+
+    assert len(transport.sent) == 1
+    assert queue.retried == 1
+    assert queue.sent == 1
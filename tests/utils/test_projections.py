@@ -0,0 +1,77 @@
+"""
+测试列表摘要视图的字段投影解析
+"""
+import pytest
+from fastapi import HTTPException
+
+from app.utils.projections import SUMMARY_VIEWS, resolve_projection
+
+
+@pytest.mark.parametrize("fields", [None, "", "   "])
+def test_no_fields_returns_full_document(fields):
+    assert resolve_projection("recipe", fields) is None
+
+
+@pytest.mark.parametrize("collection", ["recipe", "menuPlan", "shoppingList"])
+def test_card_view(collection):
+    projection = resolve_projection(collection, "card")
+    assert projection == SUMMARY_VIEWS[f"{collection}.card"]
+    # 返回副本，调用方修改不影响命名投影
+    projection["extra"] = 1
+    assert "extra" not in SUMMARY_VIEWS[f"{collection}.card"]
+
+
+def test_card_view_ignores_surrounding_whitespace():
+    assert resolve_projection("recipe", " card ") == SUMMARY_VIEWS["recipe.card"]
+
+
+def test_field_list():
+    assert resolve_projection("recipe", "title, coverImage,,stats") == {
+        "title": 1,
+        "coverImage": 1,
+        "stats": 1,
+    }
+
+
+def test_unknown_fields_rejected():
+    with pytest.raises(HTTPException) as exc_info:
+        resolve_projection("recipe", "title,password,secret")
+    assert exc_info.value.status_code == 400
+    assert "password" in exc_info.value.detail
+    assert "secret" in exc_info.value.detail
+    assert "title" not in exc_info.value.detail
+
+
+def test_fields_are_checked_per_collection():
+    # familyId 是菜单计划的字段，不是菜谱的字段
+    assert resolve_projection("menuPlan", "familyId") == {"familyId": 1}
+    with pytest.raises(HTTPException):
+        resolve_projection("recipe", "familyId")
+
+
+def test_required_sort_field_added():
+    projection = resolve_projection("recipe", "title", required=("createdAt",))
+    assert projection == {"title": 1, "createdAt": 1}
+
+
+def test_required_field_already_present():
+    projection = resolve_projection("recipe", "title,createdAt", required=("createdAt",))
+    assert projection == {"title": 1, "createdAt": 1}
+
+
+def test_required_field_under_projected_parent_not_added():
+    """上级字段已投影时不再添加子路径，避免MongoDB的路径冲突错误"""
+    projection = resolve_projection("recipe", "title,stats", required=("stats.viewCount",))
+    assert projection == {"title": 1, "stats": 1}
+
+
+def test_required_field_with_similar_prefix_added():
+    """只有真正的上级路径才算包含(statsExtra 不是 stats 的子路径)"""
+    projection = resolve_projection("recipe", "stats", required=("statsExtra",))
+    assert projection == {"stats": 1, "statsExtra": 1}
+
+
+def test_required_field_added_to_card_view():
+    projection = resolve_projection("recipe", "card", required=("stats.viewCount", "updatedAt"))
+    assert "stats.viewCount" not in projection
+    assert projection["updatedAt"] == 1
@@ -0,0 +1,158 @@
+"""
+测试微信小程序服务端API客户端
+通过 httpx.MockTransport 模拟微信接口，Redis使用fakeredis
+"""
+import asyncio
+import json
+
+import fakeredis.aioredis
+import httpx
+import pytest
+
+from app.core.exceptions import WechatAPIError
+from app.utils import wechat
+from app.utils.wechat import WechatClient
+
+
+@pytest.fixture(autouse=True)
+def fake_redis(monkeypatch):
+    """access_token 的Redis缓存使用fakeredis"""
+    redis = fakeredis.aioredis.FakeRedis()
+
+    async def get_fake_redis(*args, **kwargs):
+        return redis
+
+    monkeypatch.setattr(wechat, "get_redis", get_fake_redis)
+    return redis
+
+
+def make_client(handler) -> WechatClient:
+    return WechatClient(
+        app_id="test-appid",
+        app_secret="test-secret",
+        base_url="http://wechat.test",
+        transport=httpx.MockTransport(handler)
+    )
+
+
+@pytest.mark.asyncio
+async def test_code2session_success():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/sns/jscode2session"
+        assert request.url.params["js_code"] == "code-1"
+        return httpx.Response(200, json={"openid": "openid-1", "session_key": "key-1"})
+
+    client = make_client(handler)
+    result = await client.code2session("code-1")
+    assert result["openid"] == "openid-1"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_code2session_error_code():
+    """微信返回错误码时抛出WechatAPIError"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={"errcode": 40163, "errmsg": "code been used"})
+
+    client = make_client(handler)
+    with pytest.raises(WechatAPIError):
+        await client.code2session("used-code")
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_code2session_does_not_retry_read_timeout():
+    """读取超时时js_code可能已被消费，不重试"""
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    client = make_client(handler)
+    with pytest.raises(WechatAPIError):
+        await client.code2session("code-1")
+    assert calls == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_code2session_retries_connect_error():
+    """连接失败时请求未发出，可以重试"""
+    calls = 0
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            raise httpx.ConnectError("connection refused", request=request)
+        return httpx.Response(200, json={"openid": "openid-1", "session_key": "key-1"})
+
+    client = make_client(handler)
+    result = await client.code2session("code-1")
+    assert result["openid"] == "openid-1"
+    assert calls == 2
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_access_token_refresh_is_single_flight():
+    """并发获取access_token时只请求一次微信接口"""
+    calls = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal calls
+        assert request.url.path == "/cgi-bin/stable_token"
+        calls += 1
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"access_token": "token-1", "expires_in": 7200})
+
+    client = make_client(handler)
+    tokens = await asyncio.gather(*(client.get_access_token() for _ in range(10)))
+    assert set(tokens) == {"token-1"}
+    assert calls == 1
+    assert client.token_refreshes == 1
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_access_token_shared_through_redis(fake_redis):
+    """其他进程已刷新并写入Redis的令牌直接使用"""
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise AssertionError("不应请求微信接口")
+
+    client = make_client(handler)
+    await fake_redis.set(
+        client._token_redis_key(),
+        json.dumps({"access_token": "shared-token", "expires_at": 9999999999}).encode("utf-8")
+    )
+    assert await client.get_access_token() == "shared-token"
+    await client.close()
+
+
+@pytest.mark.asyncio
+async def test_qrcode_forces_token_refresh_on_40001():
+    """令牌被微信判定无效(40001)时强制刷新后重试一次"""
+    token_requests = []
+    qrcode_tokens = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/cgi-bin/stable_token":
+            body = json.loads(request.content)
+            token_requests.append(body["force_refresh"])
+            token = "token-2" if body["force_refresh"] else "token-1"
+            return httpx.Response(200, json={"access_token": token, "expires_in": 7200})
+
+        assert request.url.path == "/wxa/getwxacodeunlimit"
+        access_token = request.url.params["access_token"]
+        qrcode_tokens.append(access_token)
+        if access_token == "token-1":
+            return httpx.Response(200, json={"errcode": 40001, "errmsg": "invalid credential"})
+        return httpx.Response(200, content=b"PNG", headers={"Content-Type": "image/png"})
+
+    client = make_client(handler)
+    assert await client.generate_mini_qrcode("scene=1") == b"PNG"
+    assert token_requests == [False, True]
+    assert qrcode_tokens == ["token-1", "token-2"]
+    await client.close()